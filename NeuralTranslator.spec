@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('D:\\Projects\\translator\\logo.png', '.')],
-    hiddenimports=['ctranslate2', 'sentencepiece', 'huggingface_hub'],
+    hiddenimports=['ctranslate2', 'sentencepiece'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -0,0 +1,139 @@
+import os
+import sys
+import time
+import argparse
+import statistics
+
+from model_registry import MODELS, detect_model, make_prompt
+from translation_cache import model_fingerprint
+
+# Подбор compute_type и числа потоков CTranslate2 под конкретную машину.
+# Результат хранится в settings.json по отпечатку модели:
+#   python autotune.py D:/models/madlad400-3b-ct2 --goal throughput
+
+GOALS = ("latency", "throughput")
+DEFAULT_COMPUTE_TYPES = ("int8", "int8_float32", "float32")
+
+CALIBRATION_CORPUS = [
+    ("en", "Привет! Как дела?"),
+    ("en", "Файл не найден."),
+    ("ru", "Save changes before closing?"),
+    ("ru", "The connection to the server timed out, please try again later."),
+    ("en", "Сегодня хорошая погода, и мы решили прогуляться по парку у реки."),
+    ("ru", "Please make sure that the configuration file is located in the application folder."),
+    ("en", "Neue Version verfügbar. Jetzt aktualisieren?"),
+    ("ru", "Le fichier a été enregistré avec succès dans le dossier de destination."),
+    ("en", "Модель загружается в память только один раз, после чего перевод работает без задержек на диск."),
+    ("ru", "When the application is minimized to the tray, the hotkey still works in every window."),
+]
+
+def cpu_count():
+    return os.cpu_count() or 4
+
+def candidates(goal, compute_types, cores=None):
+    """Набор конфигураций (compute_type, intra_threads, inter_threads) для перебора"""
+    cores = cores or cpu_count()
+    if goal == "latency":
+        # Один запрос за раз: все ядра в intra-потоки одного батча
+        threads = sorted({max(1, cores // 4), max(1, cores // 2), cores, min(4, cores)})
+        configs = [(intra, 1) for intra in threads]
+    else:
+        # Поток запросов: несколько батчей параллельно
+        configs = sorted({(max(1, cores // inter), inter) for inter in (1, 2, 4) if inter <= cores})
+    return [(ct, intra, inter) for ct in compute_types for intra, inter in configs]
+
+def resolve(config, fingerprint):
+    """Итоговые параметры Translator: ручная настройка > автонастройка > по умолчанию"""
+    result = {"compute_type": "default", "intra_threads": min(4, cpu_count()), "inter_threads": 1}
+    tuned = config.get("tuning", {}).get(fingerprint)
+    if tuned:
+        result.update({k: tuned[k] for k in result if k in tuned})
+    if config.get("compute_type", "auto") != "auto":
+        result["compute_type"] = config["compute_type"]
+    if int(config.get("intra_threads", 0)) > 0:
+        result["intra_threads"] = int(config["intra_threads"])
+    if int(config.get("inter_threads", 0)) > 0:
+        result["inter_threads"] = int(config["inter_threads"])
+    return result
+
+def measure(translator, sources, prefixes, goal):
+    if goal == "latency":
+        # Медиана по отдельным коротким запросам, как у хоткея
+        times = []
+        for src, prefix in zip(sources, prefixes):
+            t = time.perf_counter()
+            translator.translate_batch([src], target_prefix=[prefix] if prefix else None, beam_size=1)
+            times.append(time.perf_counter() - t)
+        return statistics.median(times)
+    # Пропускная способность: весь корпус несколько раз, батчи идут параллельно по inter_threads
+    batch = sources * 4
+    batch_prefixes = prefixes * 4
+    t = time.perf_counter()
+    res = translator.translate_batch(batch, target_prefix=batch_prefixes if any(batch_prefixes) else None,
+                                     beam_size=1, max_batch_size=8, batch_type="examples")
+    tokens = sum(len(r.hypotheses[0]) for r in res)
+    return tokens / (time.perf_counter() - t)
+
+def autotune(model_path, goal="latency", compute_types=None, progress=print):
+    """Перебирает конфигурации и возвращает (лучшая, все результаты)"""
+    import ctranslate2
+    import sentencepiece as spm
+
+    name = detect_model(model_path)
+    spec = MODELS[name]
+    prompt = make_prompt(spec)
+    sp = spm.SentencePieceProcessor()
+    sp.load(os.path.join(model_path, spec["tokenizer"]))
+    sources, prefixes = [], []
+    for target, text in CALIBRATION_CORPUS:
+        sources.append(prompt.source(sp.encode(text, out_type=str), text, target))
+        prefixes.append(prompt.target_prefix(target))
+
+    supported = ctranslate2.get_supported_compute_types("cpu")
+    compute_types = [ct for ct in (compute_types or DEFAULT_COMPUTE_TYPES) if ct in supported]
+    results = []
+    for compute_type, intra, inter in candidates(goal, compute_types):
+        label = f"{compute_type}, intra={intra}, inter={inter}"
+        try:
+            translator = ctranslate2.Translator(model_path, device="cpu", compute_type=compute_type,
+                                                intra_threads=intra, inter_threads=inter)
+            # Первый прогон - прогрев кэшей и аллокатора, в зачет не идет
+            translator.translate_batch(sources[:2], target_prefix=prefixes[:2] if prefixes[0] else None)
+            score = measure(translator, sources, prefixes, goal)
+            del translator
+        except Exception as e:
+            progress(f"  {label}: ошибка {e}")
+            continue
+        unit = f"{score * 1000:.0f} мс" if goal == "latency" else f"{score:.0f} ток/с"
+        progress(f"  {label}: {unit}")
+        results.append({"compute_type": compute_type, "intra_threads": intra, "inter_threads": inter,
+                        "goal": goal, "score": score})
+    if not results: return None, results
+    best = min(results, key=lambda r: r["score"]) if goal == "latency" else max(results, key=lambda r: r["score"])
+    return best, results
+
+def save_result(config, model_path, best):
+    config.setdefault("tuning", {})[model_fingerprint(model_path)] = best
+
+def main(argv=None):
+    import translator_engine as te
+    ap = argparse.ArgumentParser(description="Автоподбор compute_type и потоков CTranslate2")
+    ap.add_argument("model", nargs="?", help="папка с моделью (по умолчанию из settings.json)")
+    ap.add_argument("--goal", choices=GOALS, default="latency")
+    ap.add_argument("--compute-types", nargs="+", help="ограничить набор compute_type")
+    args = ap.parse_args(argv)
+
+    config = te.ConfigManager.load()
+    path = args.model or config.get("model_path", "")
+    print(f"Автонастройка ({args.goal}) для {path}, ядер: {cpu_count()}")
+    best, _ = autotune(path, args.goal, args.compute_types)
+    if not best:
+        print("Ни одна конфигурация не запустилась")
+        return 1
+    save_result(config, path, best)
+    te.ConfigManager.save(config)
+    print(f"Лучшее: {best['compute_type']}, intra={best['intra_threads']}, inter={best['inter_threads']} - сохранено")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
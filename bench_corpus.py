@@ -0,0 +1,111 @@
+# Фиксированный корпус для бенчмарков: (язык источника, текст).
+# Менять осторожно - от него зависят сохраненные базовые замеры.
+
+SHORT = [
+    ("ru", "Сохранить изменения?"),
+    ("ru", "Файл не найден."),
+    ("ru", "Нажмите Alt+1, чтобы перевести выделенный текст."),
+    ("en", "Open the file menu"),
+    ("en", "Connection timed out."),
+    ("en", "Settings were saved successfully."),
+    ("en", "Are you sure you want to delete this item?"),
+    ("de", "Neue Version verfügbar."),
+    ("de", "Bitte warten Sie einen Moment."),
+    ("fr", "Le fichier a été enregistré."),
+    ("fr", "Voulez-vous continuer ?"),
+    ("es", "No se pudo conectar al servidor."),
+    ("es", "Gracias por su paciencia."),
+    ("uk", "Перевірте підключення до мережі."),
+    ("uk", "Дякуємо за ваш відгук!"),
+    ("it", "Impossibile aprire il documento."),
+    ("it", "Buongiorno, come stai?"),
+    ("zh", "文件已保存。"),
+    ("zh", "请稍候。"),
+    ("ru", "Ок"),
+]
+
+MEDIUM = [
+    ("ru", "Модель загружается в память только один раз. После этого перевод работает без обращений к диску. "
+           "Если приложение свернуто в трей, горячая клавиша продолжает работать в любом окне."),
+    ("en", "The quick brown fox jumps over the lazy dog. Meanwhile, the translator keeps processing "
+           "requests from several applications. Each request is split into sentences and translated in batches."),
+    ("de", "Die Anwendung speichert alle Einstellungen automatisch. Beim nächsten Start werden sie wieder "
+           "geladen. Eine manuelle Sicherung ist daher nicht notwendig."),
+    ("fr", "Le traducteur fonctionne entièrement hors ligne. Aucune donnée n'est envoyée sur Internet. "
+           "Cela le rend adapté aux documents confidentiels."),
+    ("es", "El programa divide el texto largo en oraciones. Luego las traduce juntas para aprovechar "
+           "todos los núcleos del procesador. Al final, el resultado se vuelve a unir."),
+    ("zh", "该程序在本地运行，不需要互联网连接。模型只加载一次。之后翻译速度很快。"),
+]
+
+def _document(lang_paragraphs, repeats):
+    lines = []
+    for i in range(repeats):
+        lines.append(f"Раздел {i + 1}" if i % 2 == 0 else f"Section {i + 1}")
+        lines.append("")
+        for _, text in lang_paragraphs:
+            lines.append(text)
+        lines.append("")
+    return "\n".join(lines)
+
+LONG = [
+    ("ru", _document(MEDIUM[:1] * 3, 8)),
+    ("en", _document(MEDIUM[1:3], 10)),
+]
+
+CORPUS = {"short": SHORT, "medium": MEDIUM, "long": LONG}
+
+def target_for(source_lang):
+    """Куда переводим при замерах: все на английский, английский - на русский"""
+    return "ru" if source_lang == "en" else "en"
+
+# Технический текст вперемешку с разметкой и кодом (набор markup):
+# Markdown, HTML, трассировка стека, пути, ссылки и подстановки
+TECHNICAL = """# Installing the translator
+
+Download the archive from https://example.com/releases/translator-1.4.2.zip and unpack it to `C:\\Tools\\Translator`.
+Then run `pip install -r requirements.txt` in the project folder.
+
+## Configuration
+
+Open `settings.json` and set `model_path` to the folder with the model, for example ~/models/madlad400-3b.
+See [the model card](https://huggingface.co/google/madlad400-3b-mt "MADLAD") for the list of languages.
+
+```python
+import translator_engine as te
+
+engine = te.TranslatorEngine()
+ok, msg = engine.load("/opt/models/madlad400-3b")
+print(engine.translate("Hello, world!", "ru"))
+```
+
+| Option | Default | Description |
+|--------|---------|-------------|
+| `max_batch_size` | 1024 | Maximum number of tokens in one batch |
+| `use_vmap` | true | Decode only with the vocabulary shortlist of the target language |
+
+<p>The server listens on <b>port 5000</b>; send requests to <code>/translate</code> with <i>q</i>, <i>source</i> and <i>target</i>.</p>
+<p>Contact <a href="mailto:support@example.com">support@example.com</a> if the answer contains &quot;Error&quot;.</p>
+
+If the model fails to load, the log shows a traceback like this:
+
+Traceback (most recent call last):
+  File "C:\\Tools\\Translator\\main.py", line 612, in on_load_done
+    self.lbl_st.setText(m)
+  File "C:\\Tools\\Translator\\translator_engine.py", line 301, in load
+    translator = ctranslate2.Translator(model_path, device="cpu", **options)
+RuntimeError: Unable to open file 'model.bin' in model '/opt/models/madlad400-3b'
+
+In that case check that src/model_registry.py lists the model and that the message "Loaded %s models in %.2f s" appears in the log.
+The Java client prints a similar stack:
+
+java.io.IOException: Connection refused
+    at com.example.translator.Client.send(Client.java:88)
+    at com.example.translator.Main.main(Main.java:12)
+Caused by: java.net.ConnectException: Connection refused
+    ... 2 more
+
+Use the {source} and {target} placeholders in templates, e.g. "Translated {count} lines into {target}".
+- Press Alt+1 to translate the selected text.
+- Press Alt+2 to open the window.
+> Note: the first translation after startup takes longer while the model warms up."""
@@ -0,0 +1,606 @@
+import sys
+import json
+import time
+import argparse
+
+import translator_engine as te
+from bench_corpus import CORPUS, TECHNICAL, target_for
+from stub_backend import StubTokenizer, StubTranslator
+
+# Бенчмарк движка. Без --model работает на детерминированной заглушке:
+#   python benchmark.py suite --stub-cost none --baseline bench_baseline.json
+# (--stub-cost none измеряет только накладные расходы Python - для CI)
+
+BEAM_MODES = [("Турбо", 1), ("Баланс", 2), ("Качество", 4)]
+STUB_COSTS = {
+    "none": {},
+    # Порядок величин CPU-декодера 3B модели
+    "cpu": {"call_overhead": 0.002, "step_cost": 0.0005, "attn_cost": 0.00001},
+}
+# Загрузка, возврат весов после unload_model и первый вызов (страницы, аллокатор)
+STUB_RESIDENCY_COSTS = {
+    "none": {},
+    "cpu": {"open_cost": 0.8, "load_cost": 0.15, "cold_cost": 0.25},
+}
+
+# Выходной слой по всему словарю MADLAD и доля словаря в списках языка
+STUB_VMAP_COSTS = {
+    "none": {},
+    "cpu": {"vocab_cost": 0.0004, "vmap_ratio": 0.1},
+}
+
+# Пауза после копирования с запасом на задержку перевода заранее
+DEBOUNCE_WAIT = 0.5
+# Доля работы декодера, которая не ускоряется потоками (малые батчи, шаги по одному токену)
+STUB_POOL_SERIAL = 0.3
+
+def legacy_translate(engine, text, target_lang_code, beam_size=1):
+    """Старый путь: один вызов translate_batch на каждую строку"""
+    results = []
+    for line in text.split('\n'):
+        if not line.strip():
+            results.append("")
+            continue
+        source_tokens = engine.sp.encode_as_pieces(f"<2{target_lang_code}> {line}")
+        res = engine.translator.translate_batch(
+            [source_tokens], beam_size=beam_size, max_decoding_length=te.MAX_DECODING_LENGTH
+        )
+        results.append(engine.sp.decode(res[0].hypotheses[0]))
+    return "\n".join(results)
+
+def make_text(n_lines):
+    words = "the quick brown fox jumps over the lazy dog while translators batch".split()
+    lines = []
+    for i in range(n_lines):
+        if i % 10 == 9:
+            lines.append("")
+            continue
+        n = 4 + (i * 7) % 25
+        lines.append(" ".join(words[(i + k) % len(words)] for k in range(n)))
+    return "\n".join(lines)
+
+def make_engine(model_path, stub_cost="cpu"):
+    engine = te.TranslatorEngine()
+    if model_path:
+        ok, msg = engine.load(model_path)
+        if not ok:
+            print(f"Не удалось загрузить модель: {msg}")
+            sys.exit(1)
+    else:
+        engine.attach(StubTranslator(**STUB_COSTS[stub_cost]), StubTokenizer())
+    return engine
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values: return 0.0
+    k = (len(values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+def bench_suite(engine, repeats):
+    """Задержки и пропускная способность по классам корпуса и режимам луча"""
+    results = {}
+    print(f"{'режим':10s} {'корпус':7s} {'p50 мс':>9s} {'p90 мс':>9s} {'p99 мс':>9s} {'сегм/с':>9s} {'ток/с':>9s}")
+    for mode, beam in BEAM_MODES:
+        for kind, items in CORPUS.items():
+            latencies, segments, tokens = [], 0, 0
+            for _ in range(repeats):
+                for lang, text in items:
+                    code = target_for(lang)
+                    t = time.perf_counter()
+                    engine.translate(text, code, beam)
+                    latencies.append(time.perf_counter() - t)
+            # Объем работы считаем отдельно, чтобы не влиять на замер
+            for lang, text in items:
+                _, segs = engine.segment_lines(text.split('\n'))
+                segments += len(segs) * repeats
+                tokens += sum(len(t) for t in engine.sp.encode(segs, out_type=str)) * repeats if segs else 0
+            total = sum(latencies)
+            row = {
+                "p50_ms": percentile(latencies, 50) * 1000, "p90_ms": percentile(latencies, 90) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+                "segments_per_sec": segments / total, "tokens_per_sec": tokens / total,
+            }
+            results[f"{mode}/{kind}"] = row
+            print(f"{mode:10s} {kind:7s} {row['p50_ms']:9.2f} {row['p90_ms']:9.2f} {row['p99_ms']:9.2f} "
+                  f"{row['segments_per_sec']:9.0f} {row['tokens_per_sec']:9.0f}")
+    return results
+
+def compare_baseline(results, baseline, tolerance):
+    """Возвращает список регрессий p50 относительно сохраненного замера"""
+    regressions = []
+    for key, row in results.items():
+        old = baseline.get(key)
+        if not old: continue
+        # Сверхмалые значения шумят, даем запас в 0.05 мс
+        limit = old["p50_ms"] * (1 + tolerance) + 0.05
+        if row["p50_ms"] > limit:
+            regressions.append(f"{key}: p50 {row['p50_ms']:.2f} мс > {limit:.2f} мс (было {old['p50_ms']:.2f})")
+    return regressions
+
+def bench_batching(engine, n_lines, code, beam):
+    text = make_text(n_lines)
+    lines = sum(1 for l in text.split('\n') if l.strip())
+
+    t = time.perf_counter()
+    old = legacy_translate(engine, text, code, beam)
+    t_old = time.perf_counter() - t
+
+    t = time.perf_counter()
+    new = engine.translate(text, code, beam)
+    t_new = time.perf_counter() - t
+
+    print(f"Строк: {lines}, beam={beam}")
+    print(f"  по одной строке: {t_old:.3f} сек ({lines / t_old:.1f} строк/сек)")
+    print(f"  батчами:         {t_new:.3f} сек ({lines / t_new:.1f} строк/сек)")
+    print(f"  ускорение: x{t_old / t_new:.2f}, совпадение результатов: {old == new}")
+
+def bench_segmentation(engine, n_sentences, code, beam):
+    sentence = "The quick brown fox jumps over the lazy dog while the translator keeps working."
+    paragraph = " ".join([sentence] * n_sentences)
+
+    t = time.perf_counter()
+    whole = engine.translate_segments([paragraph], code, beam)[0]
+    t_whole = time.perf_counter() - t
+
+    t = time.perf_counter()
+    segmented = engine.translate(paragraph, code, beam)
+    t_seg = time.perf_counter() - t
+
+    print(f"Абзац из {n_sentences} предложений одной строкой:")
+    print(f"  целиком:         {t_whole:.3f} сек, длина перевода {len(whole)} (лимит {te.MAX_DECODING_LENGTH} токенов)")
+    print(f"  по предложениям: {t_seg:.3f} сек, длина перевода {len(segmented)}")
+
+def bench_streaming(engine, n_lines, code, beam):
+    text = make_text(n_lines)
+    t = time.perf_counter()
+    first, count = None, 0
+    for line, final in engine.translate_stream(text, code, beam, partial=True):
+        if first is None: first = time.perf_counter() - t
+        count += final
+    total = time.perf_counter() - t
+    print(f"Потоковый вывод, {count} строк:")
+    print(f"  первый вывод через {first * 1000:.1f} мс, весь текст за {total * 1000:.1f} мс")
+
+def bench_live(engine, n_lines, code, beam):
+    """Правка одного предложения в длинном тексте: весь текст заново против живого режима"""
+    from scheduler import TranslationScheduler
+    from live_translation import LiveSession
+    text = make_text(n_lines)
+    lines = text.split('\n')
+    lines[len(lines) // 2] += " Добавленное предложение."
+    edited = "\n".join(lines)
+    session = LiveSession(engine, TranslationScheduler(engine))
+    session.update(text, code, beam).result()
+    before = engine.metrics.snapshot()["counters"]["segments_total"]
+    t = time.perf_counter()
+    session.update(edited, code, beam).result()
+    live = time.perf_counter() - t
+    live_segments = engine.metrics.snapshot()["counters"]["segments_total"] - before
+    t = time.perf_counter()
+    engine.translate(edited, code, beam)
+    full = time.perf_counter() - t
+    print(f"Живой перевод, правка 1 предложения из {n_lines} строк:")
+    print(f"  весь текст заново: {full * 1000:.1f} мс")
+    print(f"  только изменения:  {live * 1000:.1f} мс, сегментов в модель: {live_segments}")
+
+def bench_language(engine, repeats):
+    """Скорость определения языка и экономия на смешанном тексте"""
+    import lang_detect
+    samples = [text for items in CORPUS.values() for _, text in items]
+    t = time.perf_counter()
+    for _ in range(repeats):
+        for text in samples: lang_detect._identify.__wrapped__(text[:lang_detect.MAX_CHARS].lower())
+    per = (time.perf_counter() - t) / (repeats * len(samples))
+    correct = sum(lang_detect.detect(text) == lang for items in CORPUS.values() for lang, text in items)
+    print(f"Определение языка: {per * 1e6:.1f} мкс на текст без кэша, верно {correct} из {len(samples)}")
+
+    # Половина строк уже на английском
+    lines = [text for lang, text in CORPUS["medium"]] * 20
+    text = "\n".join(lines)
+    for skip in (False, True):
+        engine.skip_same_language = skip
+        before = engine.metrics.snapshot()["counters"]["segments_total"]
+        t = time.perf_counter()
+        engine.translate(text, "en")
+        spent = time.perf_counter() - t
+        segments = engine.metrics.snapshot()["counters"]["segments_total"] - before
+        print(f"  смешанный текст -> en, пропуск своего языка {'вкл' if skip else 'выкл'}: "
+              f"{spent * 1000:.1f} мс, сегментов в модель: {segments}")
+
+def bench_residency(model_path, stub_cost, code, beam):
+    """Холодный старт, прогретая модель и возврат после выгрузки при простое"""
+    from residency import ResidencyManager
+    engine = te.TranslatorEngine()
+    residency = ResidencyManager(engine, warmup=False)
+    text = "Save changes before closing the document?"
+    t = time.perf_counter()
+    if model_path:
+        ok, msg = engine.load(model_path)
+        if not ok:
+            print(f"Не удалось загрузить модель: {msg}")
+            return
+    else:
+        engine.attach(StubTranslator(**STUB_COSTS[stub_cost], **STUB_RESIDENCY_COSTS[stub_cost]), StubTokenizer())
+        residency.register(engine.model)
+    load = time.perf_counter() - t
+
+    def timed():
+        t = time.perf_counter()
+        engine.translate(text, code, beam)
+        return time.perf_counter() - t
+    cold = timed()
+    warm = sorted(timed() for _ in range(5))[2]
+    residency.unload(engine.model.name)
+    reactivated = timed()
+    print("Жизненный цикл модели (короткая фраза):")
+    print(f"  загрузка:             {load * 1000:8.1f} мс")
+    print(f"  первый перевод:       {cold * 1000:8.1f} мс (без прогрева)")
+    print(f"  прогретая модель:     {warm * 1000:8.1f} мс")
+    print(f"  после выгрузки:       {reactivated * 1000:8.1f} мс (против {(load + cold) * 1000:.1f} мс холодного старта)")
+
+def legacy_hotkey(engine, backend, code):
+    """Старый Alt+1 в GUI-потоке: фиксированные паузы вокруг Ctrl+C/Ctrl+V и опрос буфера по 100 мс"""
+    time.sleep(0.1)
+    backend.set_clipboard("")
+    time.sleep(0.1)
+    backend.send_copy()
+    text = ""
+    for _ in range(5):
+        time.sleep(0.1)
+        text = backend.get_clipboard()
+        if text: break
+    res = engine.translate(text, code)
+    backend.set_clipboard(res)
+    time.sleep(0.1)
+    time.sleep(0.1)
+    backend.send_paste()
+
+def bench_hotkey(engine, repeats, code):
+    """Alt+1 от нажатия до вставки: старый путь с паузами против конвейера на FakeBackend"""
+    from scheduler import TranslationScheduler
+    from hotkey_backends import FakeBackend
+    from hotkey_pipeline import HotkeyPipeline
+    text = "Save changes before closing the document?"
+    print(f"Alt+1 на имитации (буфер доходит через 20 мс), {repeats} повторов:")
+    backend = FakeBackend(text, editable=True, copy_delay=0.02)
+    times = []
+    for _ in range(repeats):
+        t = time.perf_counter()
+        legacy_hotkey(engine, backend, code)
+        times.append(time.perf_counter() - t)
+    print(f"  старый путь:         p50 {percentile(times, 50) * 1000:7.1f} мс, p95 {percentile(times, 95) * 1000:7.1f} мс")
+    pipeline = HotkeyPipeline(engine, TranslationScheduler(engine), backend)
+    pipeline.auto_direction, pipeline.target_code = False, code
+    for editable, label in ((True, "вставка в поле"), (False, "показ в окне")):
+        backend.editable = editable
+        backend.pasted.clear()
+        times = []
+        for _ in range(repeats):
+            t = time.perf_counter()
+            pipeline.run_action(t)
+            times.append(time.perf_counter() - t)
+        ok = len(backend.pasted) == repeats if editable else not backend.pasted
+        print(f"  конвейер, {label:14s} p50 {percentile(times, 50) * 1000:7.1f} мс, p95 {percentile(times, 95) * 1000:7.1f} мс"
+              f"{'' if ok else '  ОШИБКА: вставок ' + str(len(backend.pasted))}")
+
+def bench_speculative(engine, repeats, code):
+    """Alt+1 после копирования: без перевода заранее и с ним при разной паузе до нажатия"""
+    from scheduler import TranslationScheduler
+    from hotkey_backends import FakeBackend
+    from hotkey_pipeline import HotkeyPipeline
+    from speculative import SpeculativeTranslator
+    texts = [line for items in CORPUS.values() for lang, text in items if lang != code
+             for line in text.split('\n') if 20 < len(line) < 200]
+    backend = FakeBackend(editable=True, copy_delay=0.02)
+    pipeline = HotkeyPipeline(engine, TranslationScheduler(engine), backend)
+    pipeline.auto_direction, pipeline.target_code = False, code
+    speculative = SpeculativeTranslator(pipeline)
+    pipeline.speculative = speculative
+    print(f"Alt+1 через паузу после Ctrl+C, {repeats} разных фраз:")
+    n = 0
+    for enabled, pause, label in ((False, 1.0, "без перевода заранее"), (True, 1.0, "заранее, пауза 1 с"),
+                                  (True, 0.15, "заранее, пауза 0.15 с")):
+        speculative.configure({"speculative_mode": enabled})
+        before = engine.metrics.snapshot()["counters"]
+        times = []
+        for _ in range(repeats):
+            # Каждый раз новая фраза: кэш и повтор не помогают
+            backend.selection = texts[n % len(texts)] + f" ({n})"
+            n += 1
+            backend.set_clipboard(backend.selection)
+            time.sleep(pause)
+            t = time.perf_counter()
+            pipeline.run_action(t)
+            times.append(time.perf_counter() - t)
+            time.sleep(DEBOUNCE_WAIT)
+        c = engine.metrics.snapshot()["counters"]
+        hits = c["speculative_hits_total"] - before["speculative_hits_total"]
+        joined = c["speculative_joined_total"] - before["speculative_joined_total"]
+        print(f"  {label:22s} p50 {percentile(times, 50) * 1000:7.1f} мс, p95 {percentile(times, 95) * 1000:7.1f} мс"
+              + (f", готово {hits}, в работе {joined}" if enabled else ""))
+    # Крупное копирование не переводится
+    before = engine.metrics.snapshot()["counters"]["speculative_skipped_total"]
+    backend.set_clipboard(make_text(50))
+    time.sleep(DEBOUNCE_WAIT)
+    skipped = engine.metrics.snapshot()["counters"]["speculative_skipped_total"] - before
+    print(f"  текст {len(make_text(50))} симв. (больше {speculative.max_chars}): {'пропущен' if skipped else 'ОШИБКА: переведен'}")
+
+def bench_vmap(model_path, stub_cost, repeats):
+    """Корпус со словарными списками (vmap.txt) и без них: скорость и доля разошедшихся переводов"""
+    if model_path:
+        engine = make_engine(model_path)
+        if not engine.model.vmap_tag:
+            print(f"Словарные списки: в {model_path} нет vmap.txt (python vocab_map.py {model_path})")
+            return
+    else:
+        engine = te.TranslatorEngine()
+        engine.attach(StubTranslator(**STUB_COSTS[stub_cost], **STUB_VMAP_COSTS[stub_cost]), StubTokenizer())
+        engine.model.vmap_tag = "stub"
+    jobs = {}
+    for items in CORPUS.values():
+        for lang, text in items:
+            _, segments = engine.segment_lines(text.split('\n'))
+            jobs.setdefault(target_for(lang), []).extend(segments)
+    outputs, spent = {}, {}
+    for use_vmap in (False, True):
+        engine.use_vmap = use_vmap
+        times = []
+        for _ in range(repeats):
+            t = time.perf_counter()
+            outputs[use_vmap] = [out for code, segs in jobs.items() for out in engine.translate_segments(segs, code)]
+            times.append(time.perf_counter() - t)
+        spent[use_vmap] = percentile(times, 50)
+    diverged = sum(a != b for a, b in zip(outputs[False], outputs[True]))
+    total = len(outputs[False])
+    print(f"Словарные списки, {total} сегментов корпуса (p50 из {repeats}):")
+    print(f"  полный словарь: {spent[False] * 1000:8.1f} мс")
+    print(f"  vmap.txt:       {spent[True] * 1000:8.1f} мс, ускорение x{spent[False] / spent[True]:.2f}")
+    print(f"  перевод отличается в {diverged} из {total} сегментов ({diverged / total * 100:.1f}%)")
+
+# Трудные слова (жадный поиск ошибается), зацикливание жадного поиска
+# и цена строки батча на шаге (с ней повтор части сегментов дешевле полного прогона)
+STUB_ADAPTIVE = {"hard_ratio": 0.01, "runaway_ratio": 0.03, "row_cost": 0.00005}
+
+def bench_adaptive(model_path, stub_cost, repeats):
+    """Режимы луча и Авто на корпусе: время, совпадение с "Качеством" и доля повторов лучом"""
+    if model_path:
+        engine = make_engine(model_path)
+    else:
+        engine = te.TranslatorEngine()
+        engine.attach(StubTranslator(**STUB_COSTS[stub_cost], **STUB_ADAPTIVE), StubTokenizer())
+    jobs = {}
+    for items in CORPUS.values():
+        for lang, text in items:
+            _, segments = engine.segment_lines(text.split('\n'))
+            jobs.setdefault(target_for(lang), []).extend(segments)
+    total = sum(len(segs) for segs in jobs.values())
+    modes = BEAM_MODES + [("Авто", te.BEAM_AUTO), ("Турбо/300", 1)]
+    outputs, rows = {}, []
+    for mode, beam in modes:
+        # Турбо/300 - прежний постоянный предел длины перевода
+        saved = te.DECODING_LENGTH_RATIO
+        if mode == "Турбо/300": te.DECODING_LENGTH_RATIO = te.MAX_DECODING_LENGTH
+        try:
+            times = []
+            for _ in range(repeats):
+                before = engine.metrics.snapshot()["counters"]
+                t = time.perf_counter()
+                outputs[mode] = [out for code, segs in jobs.items() for out in engine.translate_segments(segs, code, beam)]
+                times.append(time.perf_counter() - t)
+                after = engine.metrics.snapshot()["counters"]
+        finally:
+            te.DECODING_LENGTH_RATIO = saved
+        rows.append((mode, percentile(times, 50), after["output_tokens_total"] - before["output_tokens_total"],
+                     after["escalated_total"] - before["escalated_total"]))
+    best = outputs["Качество"]
+    print(f"Адаптивное декодирование, {total} сегментов корпуса (p50 из {repeats}):")
+    print(f"{'режим':10s} {'мс':>8s} {'ток. вывода':>12s} {'как Качество':>13s} {'заново лучом':>13s}")
+    for mode, spent, out_tokens, escalated in rows:
+        same = sum(a == b for a, b in zip(outputs[mode], best))
+        print(f"{mode:10s} {spent * 1000:8.1f} {out_tokens:12d} {same / total * 100:12.1f}% "
+              f"{escalated / total * 100 if mode == 'Авто' else 0:12.1f}%")
+
+TM_TEMPLATES = [
+    "Ticket INC-{0:05d} was assigned to the support team on {1:02d}.03.2024.",
+    "Your order {0} has shipped and will arrive in {2} days.",
+    "Build {0} failed: see https://ci.example.com/jobs/{1} for details.",
+    "User user_{0} changed the password from IP 10.0.{2}.{1}.",
+    "Invoice #{0} for {1} EUR is due on 2024-05-{2:02d}.",
+]
+
+def tm_corpus(n):
+    """Шаблонные сообщения: отличаются только числами, ссылками и идентификаторами"""
+    return [TM_TEMPLATES[i % len(TM_TEMPLATES)].format(1000 + i * 7, 1 + i % 28, 5 + i % 4) for i in range(n)]
+
+def bench_tm(engine, n_lines, code, beam, entries):
+    """Шаблонный текст с памятью переводов и без; поиск при большой памяти"""
+    import random
+    from translation_memory import TranslationMemory
+    # Свой движок на той же модели: память переводов не достается следующим наборам
+    shared, engine = engine, te.TranslatorEngine()
+    engine.attach(shared.translator, shared.sp, shared.fingerprint or "bench")
+    lines = tm_corpus(n_lines)
+    for tm in (None, TranslationMemory(":memory:")):
+        engine.tm = tm
+        before = engine.metrics.snapshot()["counters"]["segments_total"]
+        t = time.perf_counter()
+        engine.translate_cached(lines, code, beam)
+        spent = time.perf_counter() - t
+        segments = engine.metrics.snapshot()["counters"]["segments_total"] - before
+        print(f"Память переводов {'вкл ' if tm else 'выкл'}: {len(lines)} шаблонных строк за {spent * 1000:8.1f} мс, "
+              f"сегментов в модель: {segments}")
+
+    # Поиск при большой памяти: случайные фразы, чтобы полосы LSH не склеивались
+    words = "the quick brown fox jumps over lazy dog while translators batch open save file menu error".split()
+    rng = random.Random(1)
+    tm = TranslationMemory(":memory:", max_entries=entries * 2)
+    ctx = TranslationMemory.make_ctx("bench", code, beam)
+    t = time.perf_counter()
+    for i in range(0, entries, 1000):
+        tm.add_many(ctx, [(" ".join(rng.choice(words) for _ in range(8 + j % 12)) + f" {rng.choice(words)}{j}", "x")
+                          for j in range(i, min(i + 1000, entries))])
+    fill = time.perf_counter() - t
+    queries = [(" ".join(rng.choice(words) for _ in range(10)), False) for _ in range(200)] + \
+              [(line.replace("1", "9"), True) for line in tm_corpus(200)]
+    tm.add_many(ctx, [(line, line) for line in tm_corpus(200)])
+    times = []
+    for q, _ in queries:
+        t = time.perf_counter()
+        tm.lookup(ctx, q)
+        times.append(time.perf_counter() - t)
+    print(f"  поиск среди {tm.count} сегментов (заполнение {fill:.1f} сек): p50 {percentile(times, 50) * 1e6:.0f} мкс, "
+          f"p95 {percentile(times, 95) * 1e6:.0f} мкс; {tm.stats()}")
+
+def bench_multi(engine, n_lines, codes, beam):
+    """Один текст на несколько языков: по языку за прогон и одним смешанным вызовом"""
+    text = make_text(n_lines)
+    translator = engine.translator
+    calls = translator.calls if hasattr(translator, "calls") else None
+    t = time.perf_counter()
+    one_by_one = {code: engine.translate(text, code, beam) for code in codes}
+    t_seq = time.perf_counter() - t
+    calls_seq = translator.calls - calls if calls is not None else None
+
+    calls = translator.calls if calls is not None else None
+    t = time.perf_counter()
+    together = engine.translate_multi(text, codes, beam)
+    t_multi = time.perf_counter() - t
+    calls_multi = translator.calls - calls if calls is not None else None
+
+    t = time.perf_counter()
+    engine.translate(text, codes[0], beam)
+    t_one = time.perf_counter() - t
+
+    print(f"Перевод на {len(codes)} языка ({', '.join(codes)}), beam={beam}")
+    print(f"  один язык:               {t_one:.3f} сек")
+    print(f"  по языку за прогон:      {t_seq:.3f} сек" + (f", вызовов модели: {calls_seq}" if calls_seq is not None else ""))
+    print(f"  одним смешанным вызовом: {t_multi:.3f} сек" + (f", вызовов модели: {calls_multi}" if calls_multi is not None else ""))
+    print(f"  ускорение: x{t_seq / t_multi:.2f}, к одному языку: x{t_multi / t_one:.2f}, "
+          f"совпадение результатов: {one_by_one == together}")
+
+def bench_markup(engine, code, beam, repeats):
+    """Технический текст: сколько токенов уходит в модель с защитой разметки и без нее"""
+    import markup
+    lines = TECHNICAL.split('\n')
+    protected = markup.protected_lines(lines)
+    # Куски, которые должны дойти до перевода нетронутыми
+    spans = [line.strip() for i, line in enumerate(lines) if i in protected and line.strip()]
+    spans += [s.strip() for i, line in enumerate(lines) if i not in protected
+              for translate, s in markup.split_line(line) if not translate and any(c.isalnum() for c in s)]
+    text = "\n\n".join([TECHNICAL] * repeats)
+    for protect in (False, True):
+        engine.protect_markup = protect
+        before = engine.metrics.snapshot()["counters"]
+        t = time.perf_counter()
+        out = engine.translate(text, code, beam)
+        spent = time.perf_counter() - t
+        after = engine.metrics.snapshot()["counters"]
+        tokens = after["input_tokens_total"] - before["input_tokens_total"]
+        segments = after["segments_total"] - before["segments_total"]
+        if not protect: base = tokens
+        intact = sum(1 for s in spans if s in out)
+        print(f"Разметка {'защищена' if protect else 'в модель '}: {spent * 1000:7.1f} мс, сегментов {segments:4d}, "
+              f"токенов в модель {tokens:6d}, защищенных кусков цело {intact} из {len(spans)}")
+    print(f"  токенов в модель меньше на {100 * (1 - tokens / base):.0f}%")
+
+def bench_pool(model_path, stub_cost, code, beam, n_cores):
+    """Пропускная способность одновременных запросов: реплик x потоков на тех же ядрах"""
+    from engine_pool import available_cores, plan_cores
+    cores = list(range(n_cores)) if n_cores else available_cores()
+    texts = [text for items in CORPUS.values() for _, text in items] * 4
+    engine = make_engine(model_path, stub_cost)
+    factory = None
+    if not model_path:
+        costs = STUB_COSTS[stub_cost]
+        def factory(model, threads):
+            # Заглушка не считает потоками: реплика на части ядер медленнее по Амдалу
+            k = STUB_POOL_SERIAL + (1 - STUB_POOL_SERIAL) * len(cores) / threads
+            return StubTranslator(**{name: v * k for name, v in costs.items()})
+    segments = sum(len(engine.segment_lines(t.split('\n'))[1]) for t in texts)
+    counts = [n for n in (1, 2, 4, 8, 16, 32) if n <= len(cores)]
+    print(f"Пул реплик: {len(texts)} запросов ({segments} сегментов), ядер {len(cores)}, beam={beam}")
+    print(f"{'реплик':>7s} {'потоков':>8s} {'сек':>8s} {'сегм/с':>8s} {'ускорение':>10s}")
+    base = None
+    for n in counts:
+        cpu_sets = plan_cores(n, 0, cores)
+        pool = engine.start_pool(n, len(cpu_sets[0]), factory, pin=not n_cores, cores=cores)
+        pool.wait_idle()
+        while not all(r.ready for r in pool.replicas): time.sleep(0.01)
+        t = time.perf_counter()
+        futures = [pool.translate(text, code, beam) for text in texts]
+        for f in futures: f.result()
+        spent = time.perf_counter() - t
+        engine.stop_pool()
+        base = base or spent
+        print(f"{len(cpu_sets):7d} {len(cpu_sets[0]):8d} {spent:8.2f} {segments / spent:8.1f} {base / spent:9.2f}x")
+    if not model_path:
+        print("  (заглушка: время потоков смоделировано, реальное масштабирование - с --model)")
+
+SUITES = ("suite", "batching", "segmentation", "streaming", "live", "language", "residency", "hotkey", "vmap", "tm", "multi", "markup", "adaptive", "pool", "speculative")
+
+def main():
+    ap = argparse.ArgumentParser(description="Бенчмарк движка перевода")
+    ap.add_argument("suites", nargs="*", help=f"наборы: {', '.join(SUITES)} или all (по умолчанию)")
+    ap.add_argument("--model", help="папка с моделью CT2 (по умолчанию заглушка)")
+    ap.add_argument("--stub-cost", choices=sorted(STUB_COSTS), default="cpu",
+                    help="модель стоимости заглушки: none - только Python, cpu - как у декодера")
+    ap.add_argument("--repeats", type=int, default=5)
+    ap.add_argument("--lines", type=int, default=200)
+    ap.add_argument("--to", default="ru", help="язык перевода синтетического английского текста")
+    ap.add_argument("--beam", type=int, default=1)
+    ap.add_argument("--targets", nargs="+", default=["ru", "de", "fr"], help="языки для набора multi")
+    ap.add_argument("--tm-entries", type=int, default=100000, help="размер памяти переводов для замера поиска")
+    ap.add_argument("--cores", type=int, default=0, help="число ядер для набора pool (0 - доступные процессу, иначе без закрепления)")
+    ap.add_argument("--json", help="сохранить результаты suite в файл")
+    ap.add_argument("--baseline", help="сравнить suite с сохраненным замером")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="допустимый рост p50 (0.25 = 25%%)")
+    args = ap.parse_args()
+    unknown = set(args.suites) - set(SUITES) - {"all"}
+    if unknown: ap.error(f"неизвестные наборы: {', '.join(sorted(unknown))}")
+    suites = SUITES if not args.suites or "all" in args.suites else args.suites
+
+    engine = make_engine(args.model, args.stub_cost)
+    failed = False
+    if "suite" in suites:
+        results = bench_suite(engine, args.repeats)
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f: json.dump(results, f, ensure_ascii=False, indent=1)
+        if args.baseline:
+            with open(args.baseline, 'r', encoding='utf-8') as f: baseline = json.load(f)
+            regressions = compare_baseline(results, baseline, args.tolerance)
+            for r in regressions: print(f"РЕГРЕССИЯ {r}")
+            failed = bool(regressions)
+    if "batching" in suites:
+        bench_batching(engine, args.lines, args.to, args.beam)
+    if "segmentation" in suites:
+        bench_segmentation(engine, 40, args.to, args.beam)
+    if "streaming" in suites:
+        bench_streaming(engine, args.lines, args.to, args.beam)
+    if "live" in suites:
+        bench_live(engine, args.lines, args.to, args.beam)
+    if "language" in suites:
+        bench_language(engine, args.repeats)
+    if "residency" in suites:
+        bench_residency(args.model, args.stub_cost, args.to, args.beam)
+    if "hotkey" in suites:
+        bench_hotkey(engine, args.repeats, args.to)
+    if "vmap" in suites:
+        bench_vmap(args.model, args.stub_cost, args.repeats)
+    if "tm" in suites:
+        bench_tm(engine, args.lines, args.to, args.beam, args.tm_entries)
+    if "multi" in suites:
+        bench_multi(engine, args.lines, args.targets, args.beam)
+    if "markup" in suites:
+        bench_markup(engine, args.to, args.beam, args.repeats)
+    if "adaptive" in suites:
+        bench_adaptive(args.model, args.stub_cost, args.repeats)
+    if "speculative" in suites:
+        bench_speculative(engine, args.repeats, args.to)
+    if "pool" in suites:
+        bench_pool(args.model, args.stub_cost, args.to, args.beam, args.cores)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
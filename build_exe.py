@@ -73,7 +73,6 @@ def build():
         '--windowed',
         '--hidden-import=ctranslate2',
         '--hidden-import=sentencepiece',
-        '--hidden-import=huggingface_hub',
         '--clean',
     ]
 
@@ -0,0 +1,226 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+import translator_engine as te
+from markup import next_fence
+
+# Консольный пакетный перевод файлов без Qt:
+#   python cli.py docs/ -o docs_en --to en --resume
+
+EXTENSIONS = (".txt", ".md", ".srt")
+PROGRESS_FILE = ".translate_progress.json"
+SRT_TIMING_RE = re.compile(r'^\d{2}:\d{2}:\d{2}[,.]\d{3}\s*-->\s*\d{2}:\d{2}:\d{2}[,.]\d{3}')
+
+def collect_files(inputs):
+    """Возвращает [(путь, относительное имя)] для файлов и папок из аргументов"""
+    files = []
+    for inp in inputs:
+        if os.path.isdir(inp):
+            for root, _, names in os.walk(inp):
+                for name in sorted(names):
+                    if name.lower().endswith(EXTENSIONS):
+                        path = os.path.join(root, name)
+                        files.append((path, os.path.relpath(path, inp)))
+        elif os.path.isfile(inp):
+            files.append((inp, os.path.basename(inp)))
+        else:
+            print(f"Пропуск: {inp} не найден")
+    return files
+
+def is_translatable(line, srt):
+    if not line.strip(): return False
+    if srt and (line.strip().isdigit() or SRT_TIMING_RE.match(line.strip())): return False
+    return True
+
+def split_ending(line):
+    body = line.rstrip("\r\n")
+    return body, line[len(body):]
+
+def save_json_atomic(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f: json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+def format_eta(seconds):
+    if seconds is None: return "--:--"
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+class FileJob:
+    """Один входной файл: пишет перевод в .part и атомарно переименовывает по завершении"""
+    def __init__(self, src, out, state, chunk_lines):
+        self.src, self.out = src, out
+        self.part = out + ".part"
+        self.state = state
+        self.chunk_lines = chunk_lines
+        self.srt = src.lower().endswith(".srt")
+        self.size = os.path.getsize(src)
+        self.handle = None
+
+    def chunks(self):
+        """Читает файл кусками по chunk_lines строк, пропуская уже готовые при продолжении"""
+        done = self.state.get("chunks", 0)
+        if done and not os.path.exists(self.part):
+            done = self.state["chunks"] = self.state["bytes"] = 0
+        os.makedirs(os.path.dirname(os.path.abspath(self.out)), exist_ok=True)
+        self.handle = open(self.part, 'r+b' if done and os.path.exists(self.part) else 'wb')
+        if done:
+            # Все, что дописано после последней отметки, могло оборваться - отрезаем
+            self.handle.truncate(self.state.get("bytes", 0))
+            self.handle.seek(0, os.SEEK_END)
+        with open(self.src, 'r', encoding='utf-8', errors='replace', newline='') as f:
+            index, chunk, fence = 0, [], None
+            for line in f:
+                chunk.append(line)
+                fence = next_fence(line, fence)
+                # Блок кода не разрываем: иначе в следующем куске его конец примут за начало
+                if len(chunk) >= self.chunk_lines and not fence:
+                    if index >= done: yield index, chunk
+                    index, chunk = index + 1, []
+            if chunk and index >= done: yield index, chunk
+
+    def write_chunk(self, index, lines):
+        self.handle.write("".join(lines).encode('utf-8'))
+        self.handle.flush()
+        self.state["chunks"] = index + 1
+        self.state["bytes"] = self.handle.tell()
+
+    def finish(self):
+        self.handle.close()
+        os.replace(self.part, self.out)
+        self.state["done"] = True
+
+class BatchRunner:
+    def __init__(self, engine, files, out_dir, code, beam, chunk_lines, batch_lines, resume):
+        self.engine, self.code, self.beam = engine, code, beam
+        self.batch_lines = batch_lines
+        self.progress_path = os.path.join(out_dir, PROGRESS_FILE)
+        progress = {}
+        if resume and os.path.exists(self.progress_path):
+            with open(self.progress_path, 'r', encoding='utf-8') as f: progress = json.load(f)
+            # Другой размер куска или язык - старые отметки не годятся
+            if progress.get("chunk_lines") != chunk_lines or progress.get("target") != code:
+                progress = {}
+        self.progress = progress
+        progress.update({"chunk_lines": chunk_lines, "target": code})
+        files_state = progress.setdefault("files", {})
+
+        self.jobs = []
+        for src, rel in files:
+            st = os.stat(src)
+            state = files_state.get(rel)
+            # Файл изменился с прошлого запуска - переводим заново
+            if not state or state.get("mtime") != int(st.st_mtime) or state.get("size") != st.st_size:
+                state = {"mtime": int(st.st_mtime), "size": st.st_size, "chunks": 0, "bytes": 0, "done": False}
+                files_state[rel] = state
+            if state["done"] and os.path.exists(os.path.join(out_dir, rel)):
+                print(f"Готово ранее: {rel}")
+                continue
+            state["done"] = False
+            self.jobs.append(FileJob(src, os.path.join(out_dir, rel), state, chunk_lines))
+
+        self.total_bytes = sum(j.size for j in self.jobs)
+        self.done_bytes = 0
+        self.tokens = 0
+        self.started = time.time()
+
+    def pending_chunks(self):
+        for job in self.jobs:
+            print(f"Файл: {job.src}")
+            yield from ((job, index, chunk) for index, chunk in job.chunks())
+            yield job, None, None
+
+    def run(self):
+        batch, batch_size = [], 0
+        for job, index, chunk in self.pending_chunks():
+            batch.append((job, index, chunk))
+            if chunk: batch_size += sum(1 for l in chunk if is_translatable(l, job.srt))
+            # Строки разных файлов копятся в общий батч
+            if batch_size >= self.batch_lines:
+                self.flush(batch)
+                batch, batch_size = [], 0
+        self.flush(batch)
+        print(f"Все файлы переведены за {format_eta(time.time() - self.started)}")
+
+    def flush(self, batch):
+        if not batch: return
+        # Каждый кусок размечается отдельно: блок кода, открытый в конце одного файла, не задевает другой
+        groups = []
+        for job, index, chunk in batch:
+            if not chunk: continue
+            groups.append([body for body, _ in map(split_ending, chunk) if is_translatable(body, job.srt)])
+        texts = [t for group in groups for t in group]
+        translated = iter(t for group in self.engine.translate_line_groups(groups, self.code, self.beam) for t in group) \
+            if texts else iter(())
+        if texts:
+            self.tokens += sum(len(t) for t in self.engine.sp.encode(texts, out_type=str))
+
+        for job, index, chunk in batch:
+            if chunk is None:
+                job.finish()
+                print(f"Записан: {job.out}")
+                continue
+            out = []
+            for line in chunk:
+                body, ending = split_ending(line)
+                out.append((next(translated) if is_translatable(body, job.srt) else body) + ending)
+                self.done_bytes += len(line.encode('utf-8'))
+            job.write_chunk(index, out)
+        save_json_atomic(self.progress_path, self.progress)
+        self.report()
+
+    def report(self):
+        elapsed = max(time.time() - self.started, 1e-6)
+        rate = self.done_bytes / elapsed
+        eta = (self.total_bytes - self.done_bytes) / rate if rate > 0 else None
+        pct = 100.0 * self.done_bytes / self.total_bytes if self.total_bytes else 100.0
+        print(f"[{pct:5.1f}%] {self.tokens / elapsed:.0f} ток/с, осталось ~{format_eta(eta)}")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Пакетный перевод .txt/.md/.srt без графического интерфейса")
+    ap.add_argument("inputs", nargs="+", help="файлы или папки")
+    ap.add_argument("-o", "--output", required=True, help="папка для переводов")
+    ap.add_argument("--to", default="en", help="код языка перевода (ru, en, de...)")
+    ap.add_argument("--beam", type=int, default=1, help=f"размер луча, {te.BEAM_AUTO} - авто (жадно, неуверенное - лучом)")
+    ap.add_argument("--model", help="папка с моделью (по умолчанию из settings.json)")
+    ap.add_argument("--resume", action="store_true", help="продолжить прерванный запуск")
+    ap.add_argument("--chunk-lines", type=int, default=200, help="строк в одном куске файла")
+    ap.add_argument("--batch-lines", type=int, default=512, help="строк в одном батче на модель")
+    ap.add_argument("--stub", action="store_true", help="прогон на заглушке вместо модели")
+    ap.add_argument("--metrics", help="выгрузить метрики по этапам (.json или формат Prometheus)")
+    args = ap.parse_args(argv)
+
+    config = te.ConfigManager.load()
+    engine = te.TranslatorEngine()
+    engine.configure(config)
+    if args.stub:
+        from stub_backend import StubTokenizer, StubTranslator
+        engine.attach(StubTranslator(), StubTokenizer())
+    else:
+        ok, msg = engine.load(args.model or config.get("model_path", ""))
+        if not ok:
+            print(f"Модель не загружена: {msg}")
+            return 1
+
+    files = collect_files(args.inputs)
+    if not files:
+        print("Нет файлов для перевода")
+        return 1
+    os.makedirs(args.output, exist_ok=True)
+    runner = BatchRunner(engine, files, args.output, args.to, args.beam,
+                         args.chunk_lines, args.batch_lines, args.resume)
+    runner.run()
+    if engine.cache: print(engine.cache.stats())
+    if engine.tm: print(engine.tm.stats())
+    print(engine.metrics.summary())
+    if args.metrics:
+        engine.metrics.export(args.metrics)
+        print(f"Метрики: {args.metrics}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+import os
+import copy
+import queue
+import threading
+from concurrent.futures import Future
+
+# Пул реплик модели для параллельных запросов (GUI, Alt+1, HTTP API).
+# Каждая реплика - свой ctranslate2.Translator со своими intra-потоками и свой
+# поток-диспетчер, закрепленный за отдельным набором ядер. Translator
+# создается уже в закрепленном потоке, поэтому потоки CTranslate2 наследуют
+# его маску (Linux; в Windows новые потоки берут маску процесса).
+# Веса у реплик свои: число реплик ограничено бюджетом памяти движка.
+
+def available_cores():
+    if hasattr(os, "sched_getaffinity"): return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 4))
+
+def plan_cores(replicas=0, threads=0, cores=None):
+    """Наборы ядер по репликам: [[0, 1, 2, 3], [4, 5, 6, 7], ...]; 0 - подобрать по числу ядер"""
+    cores = cores or available_cores()
+    if not threads: threads = max(1, len(cores) // replicas) if replicas else min(4, len(cores))
+    fit = max(1, len(cores) // threads)
+    replicas = min(replicas, fit) if replicas else fit
+    return [cores[i * threads:(i + 1) * threads] for i in range(replicas)]
+
+def pin_thread(cpus):
+    """Закрепляет текущий поток за ядрами; False - ОС этого не умеет"""
+    if not hasattr(os, "sched_setaffinity"): return False
+    try:
+        os.sched_setaffinity(0, cpus)
+        return True
+    except OSError as e:
+        print(f"Не удалось закрепить поток за ядрами {cpus}: {e}")
+        return False
+
+class Replica:
+    def __init__(self, index, cpus):
+        self.index, self.cpus = index, cpus
+        self.model = None
+        self.ready = False
+        self.pinned = False
+        # Оценка работы в очереди и в обработке (символы текста)
+        self.load = 0
+        self.jobs = 0
+        self.done = 0
+        self.tasks = queue.SimpleQueue()
+        self.thread = None
+
+class EnginePool:
+    """Реплики модели движка: отправка на наименее загруженную, результат - Future"""
+    def __init__(self, engine, model, cpu_sets, factory, pin=True):
+        self.engine = engine
+        self.cond = threading.Condition()
+        self.stopped = False
+        self.replicas = [Replica(i, cpus) for i, cpus in enumerate(cpu_sets)]
+        for r in self.replicas:
+            r.thread = threading.Thread(target=self._run, args=(r, model, factory, pin),
+                                        name=f"engine-replica-{r.index}", daemon=True)
+            r.thread.start()
+
+    def submit(self, fn, weight=1):
+        """fn(модель реплики) выполнится на наименее загруженной реплике; возвращает Future"""
+        future = Future()
+        with self.cond:
+            if self.stopped: raise RuntimeError("пул реплик остановлен")
+            # Готовые реплики раньше загружающихся, дальше - по объему работы
+            r = min(self.replicas, key=lambda r: (not r.ready, r.load, r.jobs, r.index))
+            r.load += weight
+            r.jobs += 1
+        r.tasks.put((fn, weight, future))
+        return future
+
+    def translate(self, text, target_lang_code, beam_size=1):
+        return self.submit(lambda model: self.engine.translate(text, target_lang_code, beam_size, model), len(text))
+
+    def ready(self):
+        """Хоть одна реплика загружена; пока нет, запросы обслуживает основная модель"""
+        with self.cond: return any(r.ready for r in self.replicas)
+
+    def wait_idle(self, timeout=None):
+        """Ждет свободную реплику; планировщик берет задачу из очереди только под нее"""
+        with self.cond:
+            return self.cond.wait_for(lambda: self.stopped or any(r.ready and not r.jobs for r in self.replicas), timeout)
+
+    def _run(self, r, model, factory, pin):
+        if pin: r.pinned = pin_thread(r.cpus)
+        try:
+            replica = copy.copy(model)
+            replica.translator = factory(model, len(r.cpus))
+            # Свое имя: учет простоя (ResidencyManager) не путает реплику с основной моделью
+            replica.name = f"{model.name}#{r.index}"
+        except Exception as e:
+            print(f"Реплика {r.index} не загружена ({e}), запросы пойдут в основную модель")
+            replica = model
+        with self.cond:
+            r.model, r.ready = replica, True
+            self.cond.notify_all()
+        while True:
+            task = r.tasks.get()
+            if task is None: break
+            fn, weight, future = task
+            if future.set_running_or_notify_cancel():
+                try: future.set_result(fn(r.model))
+                except Exception as e: future.set_exception(e)
+            with self.cond:
+                r.load -= weight
+                r.jobs -= 1
+                r.done += 1
+                self.cond.notify_all()
+        r.model = None
+
+    def stop(self):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+        for r in self.replicas: r.tasks.put(None)
+
+    def status(self):
+        with self.cond:
+            parts = [f"#{r.index} ядра {r.cpus[0]}-{r.cpus[-1]}{'' if r.pinned else ' (без закрепления)'}: "
+                     f"в работе {r.jobs}, выполнено {r.done}" for r in self.replicas]
+        return "Пул реплик: " + "; ".join(parts)
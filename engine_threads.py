@@ -0,0 +1,119 @@
+import time
+import traceback
+import threading
+from PySide6.QtCore import QObject, QThread, Signal
+
+from translator_engine import scheduler, DEFAULT_MODEL_REPO
+from scheduler import TranslationCancelled, PRIORITY_WINDOW
+import autotune
+from model_download import download, DownloadCancelled, DEFAULT_CONNECTIONS
+
+# Qt-обертки над движком; сам движок (translator_engine) от Qt не зависит
+
+# === ПОТОКИ ===
+class TranslateJob(QObject):
+    """Задача в общей очереди движка, результат приходит Qt-сигналами в GUI-поток"""
+    result_signal = Signal(str, float)
+    # Текст строки и признак готовности (False - черновик по токенам)
+    line_signal = Signal(str, bool)
+    def __init__(self, text, code, beam, priority=PRIORITY_WINDOW, group=None, stream=True):
+        super().__init__()
+        self.text, self.code, self.beam = text, code, beam
+        self.priority, self.group, self.stream = priority, group, stream
+        self.future = None
+        self.emitted = None
+    def start(self):
+        self.t = time.time()
+        on_line = self.line_signal.emit if self.stream else None
+        self.future = scheduler.submit(self.text, self.code, self.beam, self.priority, self.group, on_line, self.stream)
+        self.future.add_done_callback(self._done)
+    def _done(self, future):
+        if future.cancelled(): return
+        e = future.exception()
+        if isinstance(e, TranslationCancelled): return
+        # Момент отправки сигнала: GUI-поток считает по нему задержку доставки
+        self.emitted = time.perf_counter()
+        if e:
+            self.result_signal.emit(f"Error: {e}", 0)
+        else:
+            self.result_signal.emit(future.result(), time.time() - self.t)
+
+class MultiJob(QObject):
+    """Один текст на несколько языков; результат - словарь {код: перевод}"""
+    result_signal = Signal(dict, float)
+    def __init__(self, text, codes, beam, priority=PRIORITY_WINDOW, group=None):
+        super().__init__()
+        self.text, self.codes, self.beam = text, list(codes), beam
+        self.priority, self.group = priority, group
+        self.future = None
+        self.emitted = None
+    def start(self):
+        self.t = time.time()
+        self.future = scheduler.submit_multi(self.text, self.codes, self.beam, self.priority, self.group)
+        self.future.add_done_callback(self._done)
+    def _done(self, future):
+        if future.cancelled(): return
+        e = future.exception()
+        if isinstance(e, TranslationCancelled): return
+        self.emitted = time.perf_counter()
+        if e:
+            self.result_signal.emit({code: f"Error: {e}" for code in self.codes}, 0)
+        else:
+            self.result_signal.emit(future.result(), time.time() - self.t)
+
+class LiveJob(QObject):
+    """Прогон живого перевода: только измененные сегменты, результат - сигналом"""
+    result_signal = Signal(str, float)
+    def __init__(self, session, text, code, beam):
+        super().__init__()
+        self.session, self.text, self.code, self.beam = session, text, code, beam
+    def start(self):
+        self.session.update(self.text, self.code, self.beam).add_done_callback(self._done)
+    def _done(self, future):
+        e = future.exception()
+        if isinstance(e, TranslationCancelled): return
+        if e:
+            self.result_signal.emit(f"Error: {e}", 0)
+        else:
+            self.result_signal.emit(*future.result())
+
+class DownloaderThread(QThread):
+    finished_signal = Signal(bool, str)
+    # Скачано байт, всего байт, скорость байт/с (float: Signal(int) только 32 бита)
+    progress_signal = Signal(float, float, float)
+    def __init__(self, target_folder, repo_id=DEFAULT_MODEL_REPO, mirror="", connections=DEFAULT_CONNECTIONS):
+        super().__init__()
+        self.target_folder = target_folder
+        self.repo_id = repo_id
+        self.mirror, self.connections = mirror, connections
+        self.cancel = threading.Event()
+    def run(self):
+        print(f"Начинаем скачивание {self.repo_id}" + (f" (зеркало {self.mirror})" if self.mirror else "") + "...")
+        try:
+            download(self.repo_id, self.target_folder, self.mirror, self.connections, self.progress_signal.emit, self.cancel)
+            self.finished_signal.emit(True, "OK")
+        except DownloadCancelled as e:
+            print(str(e))
+            self.finished_signal.emit(False, str(e))
+        except Exception as e:
+            print(f"Ошибка скачивания: {e}")
+            self.finished_signal.emit(False, str(e))
+
+class TuneThread(QThread):
+    # Успех, сообщение и лучшая конфигурация (dict)
+    finished_signal = Signal(bool, str, object)
+    def __init__(self, model_path, goal):
+        super().__init__()
+        self.model_path, self.goal = model_path, goal
+    def run(self):
+        print(f"Автонастройка ({self.goal}), ядер: {autotune.cpu_count()}")
+        try:
+            best, _ = autotune.autotune(self.model_path, self.goal)
+            if best:
+                msg = f"{best['compute_type']}, intra={best['intra_threads']}, inter={best['inter_threads']}"
+                self.finished_signal.emit(True, msg, best)
+            else:
+                self.finished_signal.emit(False, "ни одна конфигурация не запустилась", None)
+        except Exception as e:
+            print(traceback.format_exc())
+            self.finished_signal.emit(False, str(e), None)
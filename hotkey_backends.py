@@ -0,0 +1,82 @@
+import sys
+import threading
+
+# Платформенный слой действия Alt+1: нажатия клавиш, буфер обмена и проверка
+# поля ввода. Конвейер (hotkey_pipeline) работает только через этот интерфейс,
+# поэтому его можно гонять на FakeBackend без Windows.
+
+class HotkeyBackend:
+    name = "base"
+    # Вызывается при смене содержимого буфера (событие, а не опрос)
+    on_clipboard = None
+
+    def thread_init(self):
+        """Подготовка рабочего потока (COM и т.п.)"""
+
+    def wait_modifiers_released(self, timeout):
+        """Ждет отпускания Alt/Ctrl/Shift хоткея, не дольше timeout секунд"""
+
+    def send_copy(self): raise NotImplementedError
+    def send_paste(self): raise NotImplementedError
+
+    def clipboard_sequence(self):
+        """Номер версии буфера: меняется при каждой записи в буфер"""
+        raise NotImplementedError
+
+    def get_clipboard(self): raise NotImplementedError
+    def set_clipboard(self, text): raise NotImplementedError
+
+    def has_text_caret(self):
+        """True, если фокус в поле ввода и перевод можно вставить на место"""
+        return False
+
+    def notify_clipboard(self):
+        if self.on_clipboard: self.on_clipboard()
+
+class FakeBackend(HotkeyBackend):
+    """Имитация приложения с выделенным текстом: Ctrl+C доходит до буфера через copy_delay"""
+    name = "fake"
+
+    def __init__(self, selection="", editable=True, copy_delay=0.02):
+        self.selection = selection
+        self.editable = editable
+        self.copy_delay = copy_delay
+        self.clipboard = ""
+        self.sequence = 0
+        self.pasted = []
+        self.lock = threading.Lock()
+
+    def _write(self, text):
+        with self.lock:
+            self.clipboard = text
+            self.sequence += 1
+        self.notify_clipboard()
+
+    def send_copy(self):
+        # Без выделения приложение буфер не трогает
+        if not self.selection: return
+        t = threading.Timer(self.copy_delay, self._write, (self.selection,))
+        t.daemon = True
+        t.start()
+
+    def send_paste(self):
+        with self.lock: self.pasted.append(self.clipboard)
+
+    def clipboard_sequence(self):
+        with self.lock: return self.sequence
+
+    def get_clipboard(self):
+        with self.lock: return self.clipboard
+
+    def set_clipboard(self, text):
+        self._write(text)
+
+    def has_text_caret(self):
+        return self.editable
+
+def make_backend():
+    if sys.platform == "win32":
+        from winapi_backend import WindowsBackend
+        return WindowsBackend()
+    print("Alt+1: нет платформенного слоя для этой ОС, используется имитация")
+    return FakeBackend()
@@ -0,0 +1,140 @@
+import time
+import queue
+import threading
+import traceback
+
+import lang_detect
+from logger import log_debug, log_info
+from scheduler import PRIORITY_INLINE, TranslationCancelled
+
+# Действие Alt+1 в отдельном потоке: захват выделения, проверка поля ввода,
+# перевод и вставка. GUI-поток не ждет ни буфер, ни модель; смена буфера
+# приходит событием (clipboard_changed), а не опросом с паузами.
+
+INLINE_GROUP = "inline"
+MODIFIERS_TIMEOUT = 0.3
+# Сколько ждать, пока приложение положит выделение в буфер
+CLIPBOARD_TIMEOUT = 0.5
+# Страховочная перепроверка номера буфера, если событие не пришло
+CLIPBOARD_SLICE = 0.05
+
+class HotkeyPipeline:
+    def __init__(self, engine, scheduler, backend, show_text=None):
+        self.engine, self.scheduler, self.backend = engine, scheduler, backend
+        # Вызывается из рабочего потока: в GUI это emit сигнала Qt
+        self.show_text = show_text
+        # Язык и авто-направление синхронизирует окно
+        self.target_code = "ru"
+        self.auto_direction = True
+        self.clipboard_cond = threading.Condition()
+        backend.on_clipboard = self.clipboard_changed
+        self.triggers = queue.SimpleQueue()
+        self.busy = threading.Event()
+        self.thread = None
+        # Перевод скопированного заранее (SpeculativeTranslator), если включен
+        self.speculative = None
+
+    def clipboard_changed(self):
+        """Буфер обмена изменился (QClipboard.dataChanged или сам backend)"""
+        with self.clipboard_cond: self.clipboard_cond.notify_all()
+        if self.speculative: self.speculative.clipboard_changed()
+
+    def trigger(self):
+        """Нажатие хоткея; пока прошлое действие не закончено, повтор игнорируется"""
+        if self.busy.is_set():
+            log_debug("Alt+1: прошлое действие еще выполняется, нажатие пропущено")
+            return
+        self.busy.set()
+        self._ensure_worker()
+        self.triggers.put(time.perf_counter())
+
+    def _ensure_worker(self):
+        if self.thread and self.thread.is_alive(): return
+        self.thread = threading.Thread(target=self._run, name="hotkey-pipeline", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        self.backend.thread_init()
+        while True:
+            t0 = self.triggers.get()
+            try: self.run_action(t0)
+            except Exception: print(traceback.format_exc())
+            finally: self.busy.clear()
+
+    def wait_clipboard(self, sequence, timeout):
+        """Ждет смены номера буфера; False - приложение ничего не скопировало"""
+        deadline = time.perf_counter() + timeout
+        with self.clipboard_cond:
+            while self.backend.clipboard_sequence() == sequence:
+                left = deadline - time.perf_counter()
+                if left <= 0: return False
+                self.clipboard_cond.wait(min(left, CLIPBOARD_SLICE))
+        return True
+
+    def capture(self):
+        """Выделенный текст через Ctrl+C или пустая строка"""
+        b = self.backend
+        b.wait_modifiers_released(MODIFIERS_TIMEOUT)
+        # Буфер не очищаем: новое содержимое видно по номеру версии
+        sequence = b.clipboard_sequence()
+        t = time.perf_counter()
+        b.send_copy()
+        if not self.wait_clipboard(sequence, CLIPBOARD_TIMEOUT): return ""
+        self.engine.metrics.observe("hotkey_capture_seconds", time.perf_counter() - t)
+        return b.get_clipboard() or ""
+
+    def pick_target(self, text):
+        if not self.auto_direction: return self.target_code
+        src = lang_detect.detect(text)
+        if not src: return self.target_code
+        return "en" if src == "ru" else "ru"
+
+    def run_action(self, t0=None):
+        """Полный цикл Alt+1; возвращает 'replace', 'show' или None"""
+        t0 = t0 or time.perf_counter()
+        log_debug("--- ACTION START ---")
+        residency = getattr(self.engine, "residency", None)
+        # Пока идет копирование, выгруженная модель уже возвращается в память
+        if residency: residency.wake()
+
+        text = self.capture()
+        if not text.strip():
+            log_info("FAIL: Буфер пуст.")
+            return None
+        log_debug("Текст получен за %.0f мс: %d симв.", (time.perf_counter() - t0) * 1000, len(text))
+
+        is_editable = self.backend.has_text_caret()
+        log_debug("Editable (Smart Check): %s", is_editable)
+        if not is_editable:
+            log_debug("Mode: Show Window")
+            if self.show_text: self.show_text(text)
+            self.engine.metrics.observe("hotkey_total_seconds", time.perf_counter() - t0)
+            return "show"
+
+        log_debug("Mode: Replace Inline")
+        code = self.pick_target(text)
+        res = self.speculative.lookup(text, code) if self.speculative else None
+        if res:
+            log_debug("Перевод готов заранее")
+        else:
+            # Вставка в поле идет вне очереди окна и вытесняет прошлую вставку;
+            # идущий перевод заранее того же текста подхватывается с этим приоритетом
+            future = self.scheduler.submit(text, code, 1, PRIORITY_INLINE, INLINE_GROUP)
+            try:
+                res = future.result()
+            except TranslationCancelled:
+                return None
+            except Exception as e:
+                log_info("Translation failed: %s", e)
+                return None
+        if not res:
+            log_info("Translation failed.")
+            return None
+        if self.speculative: self.speculative.ignore(res)
+        self.backend.set_clipboard(res)
+        log_debug("Sending Ctrl+V...")
+        self.backend.send_paste()
+        total = time.perf_counter() - t0
+        self.engine.metrics.observe("hotkey_total_seconds", total)
+        log_debug("Alt+1: перевод вставлен за %.0f мс", total * 1000)
+        return "replace"
@@ -0,0 +1,137 @@
+import re
+from functools import lru_cache
+
+# Определение языка текста для всех языков из LANGUAGES (ru, uk, en, de, fr, es, it, zh).
+# Сначала письменность по большинству букв (одна кириллическая буква в английском
+# тексте не решает), затем внутри письменности - таблицы частых слов, триграмм
+# и характерных букв. Таблицы собираются один раз при импорте.
+
+# Смотрим только начало текста: язык длинного документа ясен по первым абзацам
+MAX_CHARS = 400
+WORD_RE = re.compile(r"[^\W\d_]+")
+SCRIPT_RES = {
+    "han": re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff]"),
+    "cyrillic": re.compile(r"[\u0400-\u04ff]"),
+    "latin": re.compile(r"[a-z\u00c0-\u024f]"),
+}
+
+WORDS = {
+    "en": "the and of to in is you that it he was for on are with as his they be at have this from "
+          "or had by not but what all were we when your can there an which she do how their if will "
+          "about up out them then so these would has been my please file save open settings error",
+    "de": "der die und in den von zu das mit sich des auf für ist im dem nicht ein eine als auch es "
+          "werden aus er hat dass sie nach wird bei einer um am sind noch wie einem über einen zum war "
+          "haben nur oder aber vor zur bis mehr durch man sein wurde ich wir bitte datei neue jetzt",
+    "fr": "de la le et les des en un du une que est pour qui dans par plus pas au sur ne se ce il sont "
+          "avec mais nous vous ou leur été aux cette fait elle ont je son sa tout être fichier voulez",
+    "es": "de la que el en los del se las por un para con no una su al lo como más pero sus le ya este "
+          "sí porque esta entre cuando muy sin sobre también me hasta hay donde desde todo nos es "
+          "gracias puede pudo servidor",
+    "it": "di il la che per un in del non una da sono con le si della al dei lo come ma gli anche nel "
+          "alla più ha questo se ci nella delle essere mi hanno tutto ancora cosa sul impossibile grazie",
+    "ru": "и в не на что я с он как это по но они к у же вы за бы так мы от из все для был только "
+          "его мне если уже или нет при когда файл нажмите",
+    "uk": "і в на не що з та у до як це за від він для його але ми ви так буде або ще її їх через "
+          "після також перевірте дякуємо",
+}
+
+# Триграммы по словам с пробелами по краям ("_th" - начало слова)
+TRIGRAMS = {
+    "en": "the _th he_ and _an ing ng_ _of of_ ion tio _to ed_ _wh ght _is is_ er_ _yo you at_ hat tha "
+          "ll_ ly_ ey_ _be ave ver his",
+    "de": "ch_ sch ich _de der die ie_ ein en_ und _un cht ung _ge gen ter _ei eit ver _ve auf _zu ers "
+          "ste nen hen ach err",
+    "fr": "_le les es_ _la _de de_ ent _et et_ _qu que ue_ our _po eur ait _un une ous vou _vo tre _ce "
+          "ett _du du_ eau ois ire",
+    "es": "_de de_ la_ _la _qu que os_ _lo los as_ _el el_ ión ado ada _co con _es _pa par ara ien _se "
+          "nte dad _po por _pu ero",
+    "it": "_di di_ _il il_ che he_ _ch zio one _la la_ to_ ell lla _de del re_ are ere gli _co _pe per "
+          "_un tto _no non ssi nti ta_",
+    "ru": "_не ть_ _по ого ени ост _пр ся_ ет_ ать ств _на ние ско ыва ый_ ая_ ое_ ые_ _чт что",
+    "uk": "_не ть_ _по ого ння ост _пр ся_ ати _на ння ськ ий_ ою_ ів_ ні_ _що що_ _ві від",
+}
+
+# Характерные буквы: сильные (почти только в этом языке) и слабые
+LETTERS = {
+    "de": ("äöüß", ""),
+    "fr": ("çêâîôûœëï", "éèà"),
+    "es": ("ñ¿¡", "áíóú"),
+    "it": ("ìòù", "èà"),
+    "ru": ("ыэъё", ""),
+    "uk": ("іїєґ", ""),
+}
+
+LATIN = ("en", "de", "fr", "es", "it")
+CYRILLIC = ("ru", "uk")
+
+def _rank_table(words):
+    # Чем чаще элемент (раньше в списке), тем больше вес: от 2 до 1
+    items = words.split()
+    return {w: 1 + (len(items) - i) / len(items) for i, w in enumerate(items)}
+
+def _merge(tables, scale=1.0):
+    # Одна таблица на все языки: элемент -> ((код, вес), ...), один поиск вместо пяти
+    merged = {}
+    for code, table in tables.items():
+        for key, w in table.items(): merged.setdefault(key, []).append((code, w * scale))
+    return {k: tuple(v) for k, v in merged.items()}
+
+WORD_TABLE = _merge({code: _rank_table(words) for code, words in WORDS.items()}, 2.0)
+TRIGRAM_TABLE = _merge({code: _rank_table(trigrams.replace("_", " ")) for code, trigrams in TRIGRAMS.items()})
+LETTER_TABLE = _merge({code: {**dict.fromkeys(strong, 3.0), **dict.fromkeys(weak, 1.0)}
+                       for code, (strong, weak) in LETTERS.items()})
+LETTER_KEYS = frozenset(LETTER_TABLE)
+# Уверенность растет с количеством признаков: одна триграмма - еще не язык
+FULL_EVIDENCE = 10.0
+# Кириллица без признаков языка ("Дякую", болгарский, сербский): русский только как догадка,
+# ниже порога движка для пропуска перевода (SAME_LANGUAGE_CONFIDENCE)
+GUESS_CONFIDENCE = 0.3
+
+def _script(ch):
+    o = ord(ch)
+    if 0x4E00 <= o <= 0x9FFF or 0x3400 <= o <= 0x4DBF: return "han"
+    if 0x0400 <= o <= 0x04FF: return "cyrillic"
+    if o < 0x0250: return "latin"
+    return None
+
+def _score(words, candidates):
+    scores = dict.fromkeys(candidates, 0.0)
+    # Триграммы по всей строке слов: на стыках ("e_m") в таблицах ничего нет
+    joined = f" {' '.join(words)} "
+    get = TRIGRAM_TABLE.get
+    hits = [h for h in map(WORD_TABLE.get, words) if h]
+    hits += [h for h in (get(joined[i:i + 3]) for i in range(len(joined) - 2)) if h]
+    for ch in LETTER_KEYS.intersection(joined):
+        hits += [LETTER_TABLE[ch]] * joined.count(ch)
+    for hit in hits:
+        for code, w in hit:
+            if code in scores: scores[code] += w
+    return scores
+
+@lru_cache(maxsize=4096)
+def _identify(sample):
+    counts = {name: len(r.findall(sample)) for name, r in SCRIPT_RES.items()}
+    script = max(counts, key=counts.get)
+    if not counts[script]: return None, 0.0
+    if script == "han": return "zh", 1.0
+    candidates = CYRILLIC if script == "cyrillic" else LATIN
+    # Слова только нужной письменности: вкрапления другого алфавита не мешают
+    words = [w for w in WORD_RE.findall(sample) if _script(w[0]) == script]
+    scores = _score(words, candidates)
+    ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+    (best, s1), (_, s2) = ranked[0], ranked[1]
+    if script == "cyrillic" and s1 == s2:
+        # Без признаков украинского кириллица считается русской, но неуверенно
+        return "ru", GUESS_CONFIDENCE
+    if s1 <= 0: return None, 0.0
+    return best, (s1 - s2) / s1 * min(1.0, s1 / FULL_EVIDENCE)
+
+def identify(text):
+    """(код языка или None, уверенность 0..1)"""
+    return _identify(text[:MAX_CHARS].lower())
+
+def detect(text, default=None, min_confidence=0.0):
+    """Код языка из LANGUAGES или default, если текст не распознан уверенно"""
+    code, confidence = identify(text)
+    if code is None or confidence < min_confidence: return default
+    return code
@@ -0,0 +1,90 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from translator_engine import join_segments
+from scheduler import PRIORITY_WINDOW, TranslationCancelled
+
+# Живой перевод: после паузы в наборе текст режется на сегменты, и в движок
+# уходят только сегменты, которых не было в прошлом прогоне. Остальные
+# берутся из переводов предыдущего прогона.
+# update() вызывается из потока GUI и сразу возвращает Future: выбор модели
+# (может загрузить малую модель) и нарезка всего текста идут в своем потоке.
+
+LIVE_GROUP = "live"
+
+class LiveSession:
+    def __init__(self, engine, scheduler, group=LIVE_GROUP):
+        self.engine, self.scheduler = engine, scheduler
+        self.group = group
+        # (модель, язык, луч) и переводы сегментов последнего текста
+        self.memo_key = None
+        self.memo = {}
+        self.generation = 0
+        self.worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="live")
+
+    def update(self, text, target_lang_code, beam_size=1):
+        """Future с (перевод всего текста, время); прошлый незавершенный прогон отменяется"""
+        result = Future()
+        result.set_running_or_notify_cancel()
+        self.generation += 1
+        self.worker.submit(self._prepare, text, target_lang_code, beam_size, self.generation, result, time.time())
+        return result
+
+    def _prepare(self, text, target_lang_code, beam_size, generation, result, t):
+        try:
+            self._start(text, target_lang_code, beam_size, generation, result, t)
+        except Exception as e:
+            if not result.done(): result.set_exception(e)
+
+    def _start(self, text, target_lang_code, beam_size, generation, result, t):
+        if self._stale(generation, result): return
+        if not self.engine.translator:
+            result.set_exception(RuntimeError("движок не готов"))
+            return
+        model = self.engine.pick_model(len(text))
+        key = (model.name, target_lang_code, beam_size)
+        if key != self.memo_key:
+            self.memo_key, self.memo = key, {}
+        lines = text.split('\n')
+        layout, segments = self.engine.segment_lines(lines, model)
+        previous = self.memo
+        missing = list(dict.fromkeys(s for s in segments if s not in previous))
+        if self._stale(generation, result): return
+        print(f"Живой перевод: {len(missing)} из {len(segments)} сегментов заново")
+
+        def finish(translations):
+            memo = {s: translations[s] if s in translations else previous[s] for s in segments}
+            # Держим только сегменты последнего текста, память не растет
+            if generation == self.generation: self.memo = memo
+            out = [""] * len(lines)
+            for i, lead, seps, trail, start in layout:
+                out[i] = join_segments(lead, [memo[s] for s in segments[start:start + len(seps)]], seps, trail, target_lang_code)
+            result.set_result(("\n".join(out), time.time() - t))
+
+        if not missing:
+            # Все уже переведено - прежнюю задачу группы просто отменяем
+            self.scheduler.cancel_group(self.group)
+            finish({})
+            return
+
+        job = self.scheduler.submit_segments(missing, target_lang_code, beam_size, model.name,
+                                             PRIORITY_WINDOW, self.group)
+        def done(f):
+            if f.cancelled():
+                result.set_exception(TranslationCancelled())
+                return
+            e = f.exception()
+            if e: result.set_exception(e)
+            else: finish(dict(zip(missing, f.result())))
+        job.add_done_callback(done)
+
+    def _stale(self, generation, result):
+        # Пока ждали очереди или резали текст, он уже сменился - прогон не нужен
+        if generation == self.generation: return False
+        result.set_exception(TranslationCancelled())
+        return True
+
+    def cancel(self):
+        # Прогон, который еще ждет нарезки, тоже не нужен
+        self.generation += 1
+        self.scheduler.cancel_group(self.group)
@@ -0,0 +1,77 @@
+import sys
+import json
+import time
+import argparse
+import threading
+import urllib.request
+import urllib.error
+
+import translator_engine as te
+from server import TranslationServer
+from stub_backend import StubTokenizer, StubTranslator
+
+# Нагрузочный тест HTTP API. Без --url поднимает сервер на заглушке:
+#   python loadtest.py --clients 32 --requests 20
+
+PHRASES = [
+    "Open the file menu", "Save changes before closing?", "Connection timed out",
+    "The quick brown fox jumps over the lazy dog", "Settings were saved successfully",
+]
+
+def percentile(values, p):
+    if not values: return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+def client(url, n, latencies, errors, seed):
+    for i in range(n):
+        body = json.dumps({"q": f"{PHRASES[(seed + i) % len(PHRASES)]} #{seed}-{i}", "source": "auto", "target": "ru"}).encode('utf-8')
+        req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+        t = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=60) as r: json.load(r)
+            latencies.append(time.perf_counter() - t)
+        except urllib.error.HTTPError as e:
+            errors.append(e.code)
+        except Exception as e:
+            errors.append(str(e))
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Нагрузочный тест /translate")
+    ap.add_argument("--url", help="адрес работающего сервера (иначе сервер на заглушке)")
+    ap.add_argument("--clients", type=int, default=32)
+    ap.add_argument("--requests", type=int, default=20, help="запросов на клиента")
+    ap.add_argument("--max-wait-ms", type=float, default=20)
+    ap.add_argument("--max-pending", type=int, default=256)
+    args = ap.parse_args(argv)
+
+    server, stub = None, None
+    url = args.url
+    if not url:
+        engine = te.TranslatorEngine()
+        stub = StubTranslator(call_overhead=0.005, step_cost=0.001)
+        engine.attach(stub, StubTokenizer())
+        server = TranslationServer(engine, port=0, max_wait=args.max_wait_ms / 1000, max_pending=args.max_pending).start()
+        url = f"http://127.0.0.1:{server.port}/translate"
+
+    latencies, errors = [], []
+    threads = [threading.Thread(target=client, args=(url, args.requests, latencies, errors, i)) for i in range(args.clients)]
+    t = time.perf_counter()
+    for th in threads: th.start()
+    for th in threads: th.join()
+    total = time.perf_counter() - t
+
+    print(f"Запросов: {len(latencies)} успешно, {len(errors)} ошибок за {total:.2f} сек")
+    print(f"Пропускная способность: {len(latencies) / total:.1f} запр/с")
+    print(f"Задержка: p50 {percentile(latencies, 50) * 1000:.0f} мс, p95 {percentile(latencies, 95) * 1000:.0f} мс, "
+          f"p99 {percentile(latencies, 99) * 1000:.0f} мс")
+    if errors:
+        print(f"Коды ошибок: {sorted(set(map(str, errors)))}")
+    if server:
+        d = server.dispatcher
+        print(f"Вызовов модели: {stub.calls}, батчей: {d.batches}, в среднем {d.requests / max(d.batches, 1):.1f} запросов на батч")
+        server.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
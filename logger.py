@@ -1,37 +1,121 @@
 import sys
-from PySide6.QtCore import QObject, Signal
+import queue
+import logging
+import threading
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener
 
-# Глобальный объект для сигналов логгера
-class LoggerSignals(QObject):
-    log_signal = Signal(str)
+# Конвейер логов: print() перехватывается, строки копятся в кольцевом буфере
+# с фиксированным бюджетом, GUI забирает их пачкой по таймеру (drain),
+# файл пишет фоновый поток. От Qt не зависит.
 
-global_signals = LoggerSignals()
+LOG_FILE = "debug.log"
+DEFAULT_LOG_LINES = 5000
+LEVELS = {"DEBUG": logging.DEBUG, "INFO": logging.INFO, "WARNING": logging.WARNING}
+
+file_logger = logging.getLogger("neuro_translator")
+file_logger.propagate = False
+
+class LogBuffer:
+    """Кольцевой буфер еще не показанных строк; при переполнении старые вытесняются"""
+    def __init__(self, max_lines=DEFAULT_LOG_LINES):
+        self.lock = threading.Lock()
+        self.resize(max_lines)
+
+    def resize(self, max_lines):
+        self.max_lines = max(100, int(max_lines))
+        self.pending = deque(getattr(self, "pending", ()), maxlen=self.max_lines)
+        self.dropped = 0
+
+    def push(self, line):
+        with self.lock:
+            if len(self.pending) == self.max_lines: self.dropped += 1
+            self.pending.append(line)
+
+    def drain(self):
+        """Забирает накопленные строки; переполнение отмечается одной строкой"""
+        with self.lock:
+            lines = list(self.pending)
+            self.pending.clear()
+            dropped, self.dropped = self.dropped, 0
+        if dropped: lines.insert(0, f"... пропущено строк: {dropped}")
+        return lines
+
+buffer = LogBuffer()
+level = logging.INFO
+listener = None
 
 class StreamRedirector:
-    """Перехватывает stdout/stderr и отправляет в GUI"""
+    """Перехватывает stdout/stderr: консоль, кольцевой буфер и файл (через очередь)"""
     def __init__(self, original_stream):
         self.original_stream = original_stream
+        self.partial = ""
+        self.lock = threading.Lock()
 
     def write(self, text):
-        # 1. В консоль
+        if not text: return 0
+        n = len(text)
+        # 1. В консоль (в exe без консоли потока нет)
         if self.original_stream:
             try:
                 self.original_stream.write(text)
-                self.original_stream.flush()
+                if "\n" in text: self.original_stream.flush()
             except: pass
-        
-        # 2. В GUI
-        try:
-            if text:
-                global_signals.log_signal.emit(str(text))
-        except: pass
+
+        # 2. Целые строки - в буфер GUI и в файл; хвост ждет продолжения
+        with self.lock:
+            text = self.partial + text
+            *lines, self.partial = text.split("\n")
+        for line in lines:
+            line = line.rstrip()
+            if not line: continue
+            buffer.push(line)
+            if listener: file_logger.info(line)
+        return n
 
     def flush(self):
         if self.original_stream:
             try: self.original_stream.flush()
             except: pass
 
-def setup_logger():
+def set_level(name):
+    global level
+    level = LEVELS.get(str(name).upper(), logging.INFO)
+
+def debug_enabled():
+    return level <= logging.DEBUG
+
+def log_debug(msg, *args):
+    """Отладочное сообщение: при выключенном DEBUG форматирование не выполняется"""
+    if level > logging.DEBUG: return
+    print(msg % args if args else msg)
+
+def log_info(msg, *args):
+    if level > logging.INFO: return
+    print(msg % args if args else msg)
+
+def setup_logger(config=None):
+    """Перехват stdout/stderr и фоновая запись в debug.log; повторный вызов меняет только настройки"""
+    global listener
+    config = config or {}
+    set_level(config.get("log_level", "INFO"))
+    if int(config.get("log_lines", buffer.max_lines)) != buffer.max_lines:
+        buffer.resize(config["log_lines"])
+    if listener is None:
+        handler = logging.FileHandler(LOG_FILE, mode='w', encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+        log_queue = queue.SimpleQueue()
+        file_logger.addHandler(QueueHandler(log_queue))
+        file_logger.setLevel(logging.INFO)
+        listener = QueueListener(log_queue, handler)
+        listener.start()
     if not isinstance(sys.stdout, StreamRedirector):
         sys.stdout = StreamRedirector(sys.__stdout__)
-        sys.stderr = StreamRedirector(sys.__stderr__)
\ No newline at end of file
+        sys.stderr = StreamRedirector(sys.__stderr__)
+
+def shutdown():
+    """Дописывает очередь в файл перед выходом"""
+    global listener
+    if listener:
+        listener.stop()
+        listener = None
@@ -1,11 +1,9 @@
 import sys
 import os
-import re
 import ctypes
 import time
-import pyperclip
-import logging
-from ctypes import wintypes
+# Точка отсчета для замеров старта (окно показано, модель готова)
+STARTUP_T0 = time.perf_counter()
 
 # Импорт библиотеки глобальных хоткеев
 from global_hotkeys import register_hotkeys, start_checking_hotkeys, stop_checking_hotkeys
@@ -13,24 +11,24 @@ from global_hotkeys import register_hotkeys, start_checking_hotkeys, stop_checki
 from PySide6.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout,
                                QWidget, QTextEdit, QPushButton, QLabel, QMessageBox, 
                                QProgressBar, QComboBox, QCheckBox, QGroupBox, QTabWidget, 
-                               QLineEdit, QFileDialog, QSystemTrayIcon, QMenu)
-from PySide6.QtCore import Qt, Slot, Signal
-from PySide6.QtGui import QIcon, QAction
+                               QLineEdit, QFileDialog, QSystemTrayIcon, QMenu, QSpinBox)
+from PySide6.QtCore import Qt, Slot, Signal, QTimer
+from PySide6.QtGui import QIcon, QAction, QTextCursor
 
 import logger
+from logger import log_debug, log_info
 import translator_engine as te
-
-# === ЛОГИ ===
-logging.basicConfig(
-    filename='debug.log', 
-    level=logging.DEBUG, 
-    format='%(asctime)s - %(message)s',
-    filemode='w'
-)
-
-def log_debug(msg):
-    print(msg) 
-    logging.debug(msg)
+import engine_threads as et
+import server
+import autotune
+import lang_detect
+from live_translation import LiveSession
+from hotkey_backends import make_backend
+from hotkey_pipeline import HotkeyPipeline
+from speculative import SpeculativeTranslator
+
+# Режимы скорости: размер луча, te.BEAM_AUTO - адаптивный
+SPEED_BEAMS = [1, 2, 4, te.BEAM_AUTO]
 
 # Функция для поиска ресурсов внутри EXE (для иконки)
 def resource_path(relative_path):
@@ -49,125 +47,10 @@ try:
 except:
     pass
 
-# ==========================================
-# === WinAPI & MSAA (COM) DEFINITIONS ======
-# ==========================================
-
-VK_MENU = 0x12    # Alt
-VK_CONTROL = 0x11 # Ctrl
-VK_C = 0x43       # C
-VK_V = 0x56       # V
-KEYEVENTF_KEYUP = 0x0002
-
-OBJID_CARET = -8
-S_OK = 0
-STATE_SYSTEM_INVISIBLE = 0x00008000
-CHILDID_SELF = 0
-VT_I4 = 3
-
-# --- VARIANT Structure for COM ---
-class VARIANT(ctypes.Structure):
-    class _U(ctypes.Union):
-        _fields_ = [("lVal", ctypes.c_long),
-                    ("vt", ctypes.c_ushort)]
-    _fields_ = [("vt", ctypes.c_ushort),
-                ("wReserved1", ctypes.c_ushort),
-                ("wReserved2", ctypes.c_ushort),
-                ("wReserved3", ctypes.c_ushort),
-                ("_u", _U)]
-
-# --- IAccessible Interface Definition ---
-COMMETHOD = ctypes.WINFUNCTYPE
-
-class IAccessibleVtbl(ctypes.Structure):
-    _fields_ = [
-        # IUnknown
-        ("QueryInterface", ctypes.c_void_p),
-        ("AddRef", ctypes.c_void_p),
-        ("Release", ctypes.c_void_p),
-        # IDispatch
-        ("GetTypeInfoCount", ctypes.c_void_p),
-        ("GetTypeInfo", ctypes.c_void_p),
-        ("GetIDsOfNames", ctypes.c_void_p),
-        ("Invoke", ctypes.c_void_p),
-        # IAccessible
-        ("get_accParent", ctypes.c_void_p),
-        ("get_accChildCount", ctypes.c_void_p),
-        ("get_accChild", ctypes.c_void_p),
-        ("get_accName", ctypes.c_void_p),
-        ("get_accValue", ctypes.c_void_p),
-        ("get_accDescription", ctypes.c_void_p),
-        ("get_accRole", ctypes.c_void_p),
-        # Index 14: get_accState
-        ("get_accState", COMMETHOD(ctypes.HRESULT, ctypes.c_void_p, VARIANT, ctypes.POINTER(VARIANT))),
-    ]
-
-class IAccessible(ctypes.Structure):
-    _fields_ = [("lpVtbl", ctypes.POINTER(IAccessibleVtbl))]
-
-class GUID(ctypes.Structure):
-    _fields_ = [("Data1", ctypes.c_ulong),
-                ("Data2", ctypes.c_ushort),
-                ("Data3", ctypes.c_ushort),
-                ("Data4", ctypes.c_ubyte * 8)]
-
-IID_IAccessible = GUID(
-    0x618736e0, 0x3c3d, 0x11cf, 
-    (ctypes.c_ubyte * 8)(0x81, 0x0c, 0x00, 0xaa, 0x00, 0x38, 0x9b, 0x71)
-)
-
-class GUITHREADINFO(ctypes.Structure):
-    _fields_ = [
-        ("cbSize", wintypes.DWORD),
-        ("flags", wintypes.DWORD),
-        ("hwndActive", wintypes.HWND),
-        ("hwndFocus", wintypes.HWND),
-        ("hwndCapture", wintypes.HWND),
-        ("hwndMenuOwner", wintypes.HWND),
-        ("hwndMoveSize", wintypes.HWND),
-        ("hwndCaret", wintypes.HWND),
-        ("rcCaret", wintypes.RECT)
-    ]
-
-KNOWN_EDIT_CLASSES = [
-    "Edit", "RichEdit", "RichEdit20A", "RichEdit20W", "TEdit", "TMemo", 
-    "ConsoleWindowClass", "TextBox", "Scintilla"
-]
-
-class InputSimulator:
-    """Класс для надежной эмуляции нажатий через WinAPI"""
-    @staticmethod
-    def press_key(vk_code):
-        ctypes.windll.user32.keybd_event(vk_code, 0, 0, 0)
-    @staticmethod
-    def release_key(vk_code):
-        ctypes.windll.user32.keybd_event(vk_code, 0, KEYEVENTF_KEYUP, 0)
-    @staticmethod
-    def release_modifiers():
-        InputSimulator.release_key(VK_MENU)
-        InputSimulator.release_key(VK_CONTROL)
-        InputSimulator.release_key(0x10)
-    @staticmethod
-    def send_ctrl_c():
-        InputSimulator.release_modifiers()
-        time.sleep(0.05)
-        InputSimulator.press_key(VK_CONTROL)
-        InputSimulator.press_key(VK_C)
-        time.sleep(0.05)
-        InputSimulator.release_key(VK_C)
-        InputSimulator.release_key(VK_CONTROL)
-    @staticmethod
-    def send_ctrl_v():
-        InputSimulator.release_modifiers()
-        time.sleep(0.05)
-        InputSimulator.press_key(VK_CONTROL)
-        InputSimulator.press_key(VK_V)
-        time.sleep(0.05)
-        InputSimulator.release_key(VK_V)
-        InputSimulator.release_key(VK_CONTROL)
-
 class MainWindow(QMainWindow):
-    action_signal = Signal()
+    # Текст из Alt+1 для показа в окне (приходит из потока конвейера)
+    show_text_signal = Signal(str)
+    load_signal = Signal(bool, str)
 
     def __init__(self):
         super().__init__()
@@ -184,6 +67,7 @@ class MainWindow(QMainWindow):
 
         self.apply_styles()
         self.config = te.ConfigManager.load()
+        te.engine.configure(self.config)
         
         self.tabs = QTabWidget()
         self.setCentralWidget(self.tabs)
@@ -200,20 +84,32 @@ class MainWindow(QMainWindow):
         self.tabs.addTab(self.tab_settings, "Настройки")
         self.tabs.addTab(self.tab_logs, "Логи")
 
-        logger.setup_logger()
-        logger.global_signals.log_signal.connect(self.append_log)
+        logger.setup_logger(self.config)
         
-        self.action_signal.connect(self.run_smart_action_gui)
+        self.show_text_signal.connect(self.translate_and_show)
+        self.load_signal.connect(self.on_load_done)
+
+        # Alt+1 выполняется в своем потоке; о смене буфера узнаем по событию Qt
+        self.pipeline = HotkeyPipeline(te.engine, te.scheduler, make_backend(), self.show_text_signal.emit)
+        QApplication.clipboard().dataChanged.connect(self.pipeline.clipboard_changed)
+        self.pipeline.speculative = SpeculativeTranslator(self.pipeline)
+        self.pipeline.speculative.configure(self.config)
+        self.sync_pipeline()
+        self.lang.currentIndexChanged.connect(self.sync_pipeline)
+        self.auto.toggled.connect(self.sync_pipeline)
         
         self.check_and_load_model()
         self.init_tray()
+
+        self.http_server = None
+        if self.server_check.isChecked(): self.toggle_server(True)
         
         self.init_hotkeys()
         
         if self.is_admin():
-            log_debug("ADMIN MODE: OK")
+            log_info("ADMIN MODE: OK")
         else:
-            log_debug("WARNING: NO ADMIN RIGHTS")
+            log_info("WARNING: NO ADMIN RIGHTS")
 
     def is_admin(self):
         try: return ctypes.windll.shell32.IsUserAnAdmin()
@@ -253,15 +149,48 @@ class MainWindow(QMainWindow):
         self.lang.setMinimumWidth(150)
         top.addWidget(QLabel("Язык назначения:"))
         top.addWidget(self.lang)
-        self.auto = QCheckBox("Авто-переключение (RU ⇄ EN)")
+        self.auto = QCheckBox("Авто-выбор направления (RU ⇄ EN)")
         self.auto.setChecked(True)
         top.addWidget(self.auto)
+        # Перевод после паузы в наборе: заново переводятся только измененные предложения
+        self.live = QCheckBox("Живой перевод")
+        self.live.setChecked(self.config.get("live_mode", False))
+        self.live.toggled.connect(self.toggle_live)
+        top.addWidget(self.live)
+        # Один текст сразу на несколько языков: результат во вкладках по языкам
+        self.multi = QCheckBox("Несколько языков")
+        self.multi.setChecked(self.config.get("multi_mode", False))
+        self.multi.toggled.connect(self.toggle_multi)
+        top.addWidget(self.multi)
+        self.live_session = LiveSession(te.engine, te.scheduler)
+        self.live_worker = None
+        self.live_timer = QTimer(self)
+        self.live_timer.setSingleShot(True)
+        self.live_timer.setInterval(int(self.config.get("live_delay_ms", 400)))
+        self.live_timer.timeout.connect(self.start_live)
         top.addStretch()
         self.speed = QComboBox()
-        self.speed.addItems(["Турбо (Быстро)", "Баланс (Норма)", "Качество (Медленно)"])
+        # Авто: жадно, а неуверенные предложения - заново лучом (ESCALATION_BEAM)
+        self.speed.addItems(["Турбо (Быстро)", "Баланс (Норма)", "Качество (Медленно)", "Авто (Адаптивно)"])
         top.addWidget(QLabel("Режим:"))
         top.addWidget(self.speed)
         l.addLayout(top)
+        self.multi_row = QWidget()
+        ml = QHBoxLayout(self.multi_row)
+        ml.setContentsMargins(0, 0, 0, 0)
+        ml.addWidget(QLabel("Языки:"))
+        targets = self.config.get("multi_targets", ["en", "de", "fr"])
+        self.multi_checks = {}
+        for name, code in te.LANGUAGES.items():
+            cb = QCheckBox(name)
+            cb.setChecked(code in targets)
+            cb.toggled.connect(self.save_multi_targets)
+            ml.addWidget(cb)
+            self.multi_checks[code] = cb
+        ml.addStretch()
+        l.addWidget(self.multi_row)
+        self.lang.currentIndexChanged.connect(self.on_live_option)
+        self.speed.currentIndexChanged.connect(self.on_live_option)
         self.inp = QTextEdit()
         self.inp.setPlaceholderText("Введите текст или нажмите Alt+1 для вставки из буфера...")
         self.inp.textChanged.connect(self.on_text_change)
@@ -275,6 +204,9 @@ class MainWindow(QMainWindow):
         self.out.setPlaceholderText("Здесь появится перевод...")
         self.out.setStyleSheet("background-color: #1e1e1e; border: 1px solid #333;")
         l.addWidget(self.out)
+        self.out_tabs = QTabWidget()
+        l.addWidget(self.out_tabs)
+        self.toggle_multi(self.multi.isChecked(), save=False)
         self.stat = QLabel("Готов к работе")
         self.stat.setStyleSheet("color: #666; font-size: 12px;")
         l.addWidget(self.stat, alignment=Qt.AlignRight)
@@ -294,8 +226,12 @@ class MainWindow(QMainWindow):
         gl.addLayout(hl)
         self.lbl_st = QLabel("Статус: Проверка...")
         gl.addWidget(self.lbl_st)
+        self.res_lbl = QLabel("Память: " + te.residency.status())
+        self.res_lbl.setStyleSheet("color: #888; font-size: 12px;")
+        gl.addWidget(self.res_lbl)
         self.load_btn = QPushButton("Загрузить модель")
-        self.load_btn.clicked.connect(self.check_and_load_model)
+        # Кнопка всегда перезагружает: так применяются настройки производительности
+        self.load_btn.clicked.connect(lambda: self.check_and_load_model(force=True))
         gl.addWidget(self.load_btn)
         gb.setLayout(gl)
         l.addWidget(gb)
@@ -306,11 +242,110 @@ class MainWindow(QMainWindow):
         self.tray_check.setChecked(self.config.get("minimize_to_tray", False))
         self.tray_check.toggled.connect(self.save_tray_setting)
         gl_sys.addWidget(self.tray_check)
+        port = self.config.get("server_port", server.DEFAULT_PORT)
+        self.server_check = QCheckBox(f"Локальный HTTP API (LibreTranslate) на порту {port}")
+        self.server_check.setChecked(self.config.get("server_enabled", False))
+        self.server_check.toggled.connect(self.toggle_server)
+        gl_sys.addWidget(self.server_check)
+        self.debug_check = QCheckBox("Подробный лог (отладка)")
+        self.debug_check.setChecked(self.config.get("log_level", "INFO") == "DEBUG")
+        self.debug_check.toggled.connect(self.save_log_level)
+        gl_sys.addWidget(self.debug_check)
         gb_sys.setLayout(gl_sys)
         l.addWidget(gb_sys)
         
+        gb_perf = QGroupBox("Производительность")
+        gl_perf = QVBoxLayout()
+        hp = QHBoxLayout()
+        self.compute_combo = QComboBox()
+        self.compute_combo.addItems(["auto", "int8", "int8_float32", "float32"])
+        self.compute_combo.setCurrentText(self.config.get("compute_type", "auto"))
+        self.intra_spin = QSpinBox()
+        self.intra_spin.setRange(0, 256)
+        self.intra_spin.setSpecialValueText("авто")
+        self.intra_spin.setValue(int(self.config.get("intra_threads", 0)))
+        self.inter_spin = QSpinBox()
+        self.inter_spin.setRange(0, 64)
+        self.inter_spin.setSpecialValueText("авто")
+        self.inter_spin.setValue(int(self.config.get("inter_threads", 0)))
+        hp.addWidget(QLabel("Вычисления:"))
+        hp.addWidget(self.compute_combo)
+        hp.addWidget(QLabel("Потоки:"))
+        hp.addWidget(self.intra_spin)
+        hp.addWidget(QLabel("Параллельно:"))
+        hp.addWidget(self.inter_spin)
+        gl_perf.addLayout(hp)
+        hi = QHBoxLayout()
+        self.warmup_check = QCheckBox("Прогрев после загрузки")
+        self.warmup_check.setChecked(self.config.get("warmup", True))
+        self.idle_spin = QSpinBox()
+        self.idle_spin.setRange(0, 1440)
+        self.idle_spin.setSpecialValueText("никогда")
+        self.idle_spin.setSuffix(" мин")
+        self.idle_spin.setValue(int(self.config.get("idle_unload_minutes", 30)))
+        hi.addWidget(self.warmup_check)
+        hi.addWidget(QLabel("Выгружать модель при простое:"))
+        hi.addWidget(self.idle_spin)
+        gl_perf.addLayout(hi)
+        # Реплики - для одновременных запросов (окно, Alt+1, HTTP API); каждая занимает память модели
+        hr = QHBoxLayout()
+        self.pool_spin = QSpinBox()
+        self.pool_spin.setRange(0, 64)
+        self.pool_spin.setSpecialValueText("нет")
+        self.pool_spin.setValue(int(self.config.get("pool_replicas", 0)))
+        self.pool_threads_spin = QSpinBox()
+        self.pool_threads_spin.setRange(0, 64)
+        self.pool_threads_spin.setSpecialValueText("авто")
+        self.pool_threads_spin.setValue(int(self.config.get("pool_threads", 0)))
+        hr.addWidget(QLabel("Реплик модели:"))
+        hr.addWidget(self.pool_spin)
+        hr.addWidget(QLabel("Потоков на реплику:"))
+        hr.addWidget(self.pool_threads_spin)
+        gl_perf.addLayout(hr)
+        # vmap.txt строит vocab_map.py; без файла галочка ни на что не влияет
+        self.vmap_check = QCheckBox("Словарные списки языков (vmap.txt рядом с моделью)")
+        self.vmap_check.setChecked(self.config.get("use_vmap", True))
+        gl_perf.addWidget(self.vmap_check)
+        self.markup_check = QCheckBox("Не отдавать модели код, теги, ссылки и подстановки")
+        self.markup_check.setChecked(self.config.get("protect_markup", True))
+        gl_perf.addWidget(self.markup_check)
+        # Короткий скопированный текст переводится в фоне: Alt+1 на нем вставляет сразу
+        self.speculative_check = QCheckBox("Переводить скопированное заранее (для Alt+1, без записи в кэш на диске)")
+        self.speculative_check.setChecked(self.config.get("speculative_mode", False))
+        gl_perf.addWidget(self.speculative_check)
+        self.warmup_check.toggled.connect(self.save_perf_settings)
+        self.vmap_check.toggled.connect(self.save_perf_settings)
+        self.markup_check.toggled.connect(self.save_perf_settings)
+        self.speculative_check.toggled.connect(self.save_perf_settings)
+        for w in (self.compute_combo, self.intra_spin, self.inter_spin, self.idle_spin, self.pool_spin, self.pool_threads_spin):
+            (w.currentTextChanged if w is self.compute_combo else w.valueChanged).connect(self.save_perf_settings)
+        ht = QHBoxLayout()
+        self.tune_goal = QComboBox()
+        self.tune_goal.addItem("Минимальная задержка", "latency")
+        self.tune_goal.addItem("Максимальная пропускная способность", "throughput")
+        self.tune_btn = QPushButton("Автонастройка")
+        self.tune_btn.clicked.connect(self.start_tune)
+        ht.addWidget(self.tune_goal)
+        ht.addWidget(self.tune_btn)
+        gl_perf.addLayout(ht)
+        self.tune_lbl = QLabel("Ручные значения важнее автонастройки. Применяется при загрузке модели.")
+        self.tune_lbl.setStyleSheet("color: #888; font-size: 12px;")
+        gl_perf.addWidget(self.tune_lbl)
+        gb_perf.setLayout(gl_perf)
+        l.addWidget(gb_perf)
+
         gb2 = QGroupBox("Загрузка из интернета")
         gl2 = QVBoxLayout()
+        self.dl_model = QComboBox()
+        for name, spec in te.MODELS.items():
+            self.dl_model.addItem(spec["title"], name)
+        gl2.addWidget(self.dl_model)
+        # Офлайн-установка: папка (сетевая шара) или внутренний HTTP-сервер с manifest.json
+        self.mirror_ed = QLineEdit(self.config.get("download_mirror", ""))
+        self.mirror_ed.setPlaceholderText("Зеркало: папка или http://... (пусто - Hugging Face)")
+        self.mirror_ed.editingFinished.connect(self.save_mirror)
+        gl2.addWidget(self.mirror_ed)
+        self.dl = None
         self.dl_btn = QPushButton("СКАЧАТЬ МОДЕЛЬ")
         self.dl_btn.setStyleSheet("background-color: #204a87;") 
         self.dl_btn.clicked.connect(self.dl_start)
@@ -327,18 +362,146 @@ class MainWindow(QMainWindow):
         self.logs = QTextEdit()
         self.logs.setReadOnly(True)
         self.logs.setStyleSheet("background-color: #0c0c0c; color: #00ff00; font-family: Consolas, monospace; font-size: 13px; border: 1px solid #333;")
+        # Консоль не растет бесконечно: старые строки удаляются
+        self.logs.document().setMaximumBlockCount(logger.buffer.max_lines)
         l.addWidget(self.logs)
+
+        gb = QGroupBox("Статистика движка")
+        gl = QVBoxLayout()
+        self.stats_lbl = QLabel(te.engine.metrics.summary())
+        self.stats_lbl.setStyleSheet("font-family: Consolas, monospace; font-size: 12px; color: #ccc;")
+        self.stats_lbl.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        gl.addWidget(self.stats_lbl)
+        gb.setLayout(gl)
+        l.addWidget(gb)
+
         h = QHBoxLayout()
         clr = QPushButton("Очистить консоль")
         clr.setStyleSheet("background-color: #444;")
         clr.clicked.connect(self.logs.clear)
         h.addWidget(clr)
+        exp = QPushButton("Экспорт метрик")
+        exp.setStyleSheet("background-color: #444;")
+        exp.clicked.connect(self.export_metrics)
+        h.addWidget(exp)
+        rst = QPushButton("Сбросить статистику")
+        rst.setStyleSheet("background-color: #444;")
+        rst.clicked.connect(self.reset_metrics)
+        h.addWidget(rst)
         l.addLayout(h)
 
+        # Новые строки логов выводятся пачкой раз в 200 мс, а не на каждый print
+        self.log_timer = QTimer(self)
+        self.log_timer.timeout.connect(self.flush_logs)
+        self.log_timer.start(200)
+
+        # Панель обновляется раз в секунду и только когда вкладка видна
+        self.metrics_ticks = 0
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.update_stats)
+        self.stats_timer.start(1000)
+
+    def update_stats(self):
+        if self.tab_logs.isVisible():
+            pool = te.engine.pool
+            self.stats_lbl.setText(te.engine.metrics.summary() + ("\n" + pool.status() if pool else ""))
+        if self.tab_settings.isVisible():
+            self.res_lbl.setText("Память: " + te.residency.status())
+        # Файл для мониторинга (textfile collector) переписывается периодически
+        path = self.config.get("metrics_export_path")
+        if not path: return
+        self.metrics_ticks += 1
+        if self.metrics_ticks >= int(self.config.get("metrics_export_interval", 15)):
+            self.metrics_ticks = 0
+            try: te.engine.metrics.export(path)
+            except Exception as e: log_info("Экспорт метрик не удался: %s", e)
+
+    def export_metrics(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Экспорт метрик", "metrics.prom",
+                                              "Prometheus (*.prom *.txt);;JSON (*.json)")
+        if not path: return
+        try:
+            te.engine.metrics.export(path)
+            print(f"Метрики сохранены: {path}")
+        except Exception as e:
+            print(f"Ошибка экспорта метрик: {e}")
+
+    def reset_metrics(self):
+        te.engine.metrics.reset()
+        self.stats_lbl.setText(te.engine.metrics.summary())
+
+    def observe_delivery(self, job):
+        if job.emitted is not None:
+            te.engine.metrics.observe("qt_delivery_seconds", time.perf_counter() - job.emitted)
+
+    def save_log_level(self, checked):
+        self.config["log_level"] = "DEBUG" if checked else "INFO"
+        logger.set_level(self.config["log_level"])
+        te.ConfigManager.save(self.config)
+
     def save_tray_setting(self, checked):
         self.config["minimize_to_tray"] = checked
         te.ConfigManager.save(self.config)
 
+    def save_mirror(self):
+        self.config["download_mirror"] = self.mirror_ed.text().strip()
+        te.ConfigManager.save(self.config)
+
+    def save_perf_settings(self, *args):
+        self.config["compute_type"] = self.compute_combo.currentText()
+        self.config["intra_threads"] = self.intra_spin.value()
+        self.config["inter_threads"] = self.inter_spin.value()
+        self.config["warmup"] = self.warmup_check.isChecked()
+        self.config["idle_unload_minutes"] = self.idle_spin.value()
+        self.config["use_vmap"] = self.vmap_check.isChecked()
+        te.engine.use_vmap = self.config["use_vmap"]
+        self.config["protect_markup"] = self.markup_check.isChecked()
+        te.engine.protect_markup = self.config["protect_markup"]
+        self.config["speculative_mode"] = self.speculative_check.isChecked()
+        self.pipeline.speculative.configure(self.config)
+        pool = (self.pool_spin.value(), self.pool_threads_spin.value())
+        if pool != (te.engine.pool_replicas, te.engine.pool_threads):
+            self.config["pool_replicas"], self.config["pool_threads"] = pool
+            te.engine.pool_replicas, te.engine.pool_threads = pool
+            if te.engine.pool_replicas > 1 and te.engine.model: te.engine.start_pool()
+            else: te.engine.stop_pool()
+        te.residency.configure(self.config)
+        te.ConfigManager.save(self.config)
+
+    def start_tune(self):
+        p = self.path_ed.text().strip()
+        if not p: return
+        self.tune_btn.setEnabled(False)
+        self.tune_lbl.setText("Идет автонастройка, подробности на вкладке логов...")
+        self.tuner = et.TuneThread(p, self.tune_goal.currentData())
+        self.tuner.finished_signal.connect(self.on_tune_done)
+        self.tuner.start()
+
+    @Slot(bool, str, object)
+    def on_tune_done(self, s, m, best):
+        self.tune_btn.setEnabled(True)
+        if s:
+            autotune.save_result(self.config, self.path_ed.text().strip(), best)
+            te.ConfigManager.save(self.config)
+            self.tune_lbl.setText(f"Лучшее: {m}. Перезагрузите модель, чтобы применить.")
+        else:
+            self.tune_lbl.setText(f"Автонастройка не удалась: {m}")
+
+    def toggle_server(self, checked):
+        self.config["server_enabled"] = checked
+        te.ConfigManager.save(self.config)
+        if checked and not self.http_server:
+            try:
+                self.http_server = server.TranslationServer(
+                    te.engine, port=self.config.get("server_port", server.DEFAULT_PORT),
+                    allowed_origins=self.config.get("server_allowed_origins", [])).start()
+            except OSError as e:
+                log_info("HTTP API не запущен: %s", e)
+        elif not checked and self.http_server:
+            self.http_server.stop()
+            self.http_server = None
+            log_info("HTTP API остановлен")
+
     def init_tray(self):
         self.tray_icon = QSystemTrayIcon(self)
         self.tray_icon.setIcon(self.app_icon)
@@ -359,6 +522,8 @@ class MainWindow(QMainWindow):
             self.show_normal()
 
     def show_normal(self):
+        # Пока окно разворачивается, выгруженная модель возвращается в память
+        te.residency.wake()
         self.show()
         self.setWindowState(Qt.WindowActive)
         self.activateWindow()
@@ -377,185 +542,50 @@ class MainWindow(QMainWindow):
             ]
             register_hotkeys(bindings)
             start_checking_hotkeys()
-            log_debug("GlobalHotKeys запущен (Alt+1).")
+            log_info("GlobalHotKeys запущен (Alt+1).")
         except Exception as e:
-            log_debug(f"Ошибка GHK: {e}")
+            log_info("Ошибка GHK: %s", e)
 
     def on_ghk_triggered(self):
         log_debug(">>> GLOBAL HOTKEY: Alt+1 <<<")
-        self.action_signal.emit()
-
-    # === ДЕТАЛЬНАЯ ПРОВЕРКА КУРСОРА (WINAPI + MSAA STATE) ===
-    def get_window_class(self, hwnd):
-        length = 256
-        buff = ctypes.create_unicode_buffer(length)
-        ctypes.windll.user32.GetClassNameW(hwnd, buff, length)
-        return buff.value
-
-    def get_window_title(self, hwnd):
-        length = 256
-        buff = ctypes.create_unicode_buffer(length)
-        ctypes.windll.user32.GetWindowTextW(hwnd, buff, length)
-        return buff.value
-
-    def has_text_caret(self):
-        try:
-            foreground_hwnd = ctypes.windll.user32.GetForegroundWindow()
-            if not foreground_hwnd: return False
-                
-            fg_title = self.get_window_title(foreground_hwnd)
-            fg_class = self.get_window_class(foreground_hwnd)
-            log_debug(f"DEBUG: Active Window: '{fg_title}' | Class: '{fg_class}'")
-
-            # --- СПОСОБ 1: Стандартный WinAPI ---
-            foreground_thread_id = ctypes.windll.user32.GetWindowThreadProcessId(foreground_hwnd, None)
-            current_thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
-
-            attached = False
-            if foreground_thread_id != current_thread_id:
-                attached = ctypes.windll.user32.AttachThreadInput(current_thread_id, foreground_thread_id, True)
-            
-            try:
-                gui_info = GUITHREADINFO()
-                gui_info.cbSize = ctypes.sizeof(GUITHREADINFO)
-                success = ctypes.windll.user32.GetGUIThreadInfo(foreground_thread_id, ctypes.byref(gui_info))
-                
-                if success:
-                    if gui_info.hwndCaret:
-                        log_debug(f"DEBUG: Native Caret FOUND (HWND: {gui_info.hwndCaret})")
-                        return True
-                    
-                    if gui_info.hwndFocus:
-                        focus_class = self.get_window_class(gui_info.hwndFocus)
-                        for cls in KNOWN_EDIT_CLASSES:
-                            if cls.lower() in focus_class.lower():
-                                log_debug(f"DEBUG: Detected input by class '{focus_class}'")
-                                return True
-            finally:
-                if attached:
-                    ctypes.windll.user32.AttachThreadInput(current_thread_id, foreground_thread_id, False)
-
-            # --- СПОСОБ 2: MSAA с проверкой STATE ---
-            ptr = ctypes.POINTER(IAccessible)()
-            res = ctypes.windll.oleacc.AccessibleObjectFromWindow(
-                foreground_hwnd, 
-                OBJID_CARET, 
-                ctypes.byref(IID_IAccessible), 
-                ctypes.byref(ptr)
-            )
-            
-            if res == S_OK and ptr:
-                varChild = VARIANT()
-                varChild.vt = VT_I4
-                varChild._u.lVal = CHILDID_SELF
-                
-                varState = VARIANT()
-                hr = ptr.contents.lpVtbl.contents.get_accState(ptr, varChild, ctypes.byref(varState))
-                
-                if hr == S_OK and varState.vt == VT_I4:
-                    state = varState._u.lVal
-                    log_debug(f"DEBUG: MSAA Caret State: {state} (Hex: {hex(state)})")
-                    
-                    if state & STATE_SYSTEM_INVISIBLE:
-                        log_debug("DEBUG: Caret exists but is INVISIBLE -> Not an input field.")
-                        return False
-                    else:
-                        log_debug("DEBUG: Caret exists and is VISIBLE -> Input field detected.")
-                        return True
-                
-                ptr.contents.lpVtbl.contents.Release(ptr)
-            else:
-                log_debug(f"DEBUG: MSAA Caret check failed or no object.")
-
-            return False
+        # Вызывается из потока global_hotkeys: дальше работает поток конвейера
+        self.pipeline.trigger()
 
-        except Exception as e:
-            log_debug(f"DEBUG: Exception in has_text_caret: {e}")
-            return False
-
-    # === УМНАЯ ЛОГИКА ===
-    @Slot()
-    def run_smart_action_gui(self):
-        log_debug("--- ACTION START ---")
-        
-        InputSimulator.release_modifiers()
-        time.sleep(0.1)
-
-        pyperclip.copy("") 
-        
-        log_debug("Sending Ctrl+C via WinAPI...")
-        InputSimulator.send_ctrl_c()
-        
-        text = ""
-        for i in range(5): 
-            time.sleep(0.1)
-            text = pyperclip.paste()
-            if text: break
-        
-        if not text:
-            log_debug("FAIL: Буфер пуст.")
-            return
-
-        log_debug(f"Текст получен: {len(text)} симв.")
-        
-        is_editable = self.has_text_caret()
-        log_debug(f"Editable (Smart Check): {is_editable}")
-
-        if is_editable:
-            self.translate_and_replace(text)
-        else:
-            self.translate_and_show(text)
+    def sync_pipeline(self, *args):
+        self.pipeline.target_code = te.LANGUAGES[self.lang.currentText()]
+        self.pipeline.auto_direction = self.auto.isChecked()
 
+    @Slot(str)
     def translate_and_show(self, text):
         log_debug("Mode: Show Window")
         self.show_normal()
         self.inp.setPlainText(text)
         self.start_tr()
 
-    def translate_and_replace(self, text):
-        log_debug("Mode: Replace Inline")
-        
-        target_lang_name = self.lang.currentText()
-        target_code = te.LANGUAGES[target_lang_name]
-        
-        if self.auto.isChecked():
-            has_ru = bool(re.search('[а-яА-Я]', text))
-            if has_ru: target_code = "en"
-            else: target_code = "ru"
-
-        try:
-            res = te.engine.translate(text, target_code, beam_size=1)
-            
-            if res and not res.startswith("Error"):
-                pyperclip.copy(res)
-                time.sleep(0.1)
-                log_debug("Sending Ctrl+V via WinAPI...")
-                InputSimulator.send_ctrl_v()
-            else:
-                log_debug("Translation failed.")
-        except Exception as e:
-            log_debug(f"Replace error: {e}")
-
     # === UI ЛОГИКА ===
-    @Slot(str)
-    def append_log(self, text):
-        if not text: return
-        self.logs.append(text.strip()) 
+    def flush_logs(self):
+        lines = logger.buffer.drain()
+        if not lines: return
+        cursor = self.logs.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        if not self.logs.document().isEmpty(): cursor.insertText("\n")
+        cursor.insertText("\n".join(lines))
+        self.logs.verticalScrollBar().setValue(self.logs.verticalScrollBar().maximum())
 
     def browse(self):
         d = QFileDialog.getExistingDirectory(self, "Выбор папки", self.path_ed.text())
         if d: self.path_ed.setText(d)
 
-    def check_and_load_model(self):
+    def check_and_load_model(self, force=False):
         p = self.path_ed.text().strip()
         if not p: return
         self.config["model_path"] = p
         te.ConfigManager.save(self.config)
         self.btn.setEnabled(False)
         self.stat.setText("Загрузка...")
-        self.loader = te.LoaderThread(p)
-        self.loader.finished_signal.connect(self.on_load_done)
-        self.loader.start()
+        # Загрузка могла начаться еще до создания окна - тогда просто дождемся ее
+        future = te.engine.load_async(p, force)
+        future.add_done_callback(lambda f: self.load_signal.emit(*f.result()))
 
     @Slot(bool, str)
     def on_load_done(self, s, m):
@@ -565,51 +595,169 @@ class MainWindow(QMainWindow):
             self.btn.setEnabled(True)
             self.btn.setText("ПЕРЕВЕСТИ ТЕКСТ") # ИСПРАВЛЕНИЕ 1: Сброс текста кнопки
             self.stat.setText("Модель готова")
+            log_info("STARTUP: модель готова через %.3f сек", time.perf_counter() - STARTUP_T0)
+            if os.environ.get("NT_STARTUP_PROBE"): self.force_quit()
         else:
             self.btn.setText("Ошибка загрузки")
 
     def dl_start(self):
+        # Повторное нажатие во время скачивания - отмена; докачка продолжится со следующего раза
+        if self.dl and self.dl.isRunning():
+            self.dl.cancel.set()
+            self.dl_btn.setEnabled(False)
+            return
         p = self.path_ed.text().strip()
         if not p: return
-        self.dl_btn.setEnabled(False)
+        self.save_mirror()
+        self.dl_btn.setText("ОТМЕНИТЬ СКАЧИВАНИЕ")
         self.prog.setRange(0,0)
+        self.prog.setFormat("Получение списка файлов...")
         self.prog.show()
-        self.dl = te.DownloaderThread(p)
+        self.dl = et.DownloaderThread(p, te.MODELS[self.dl_model.currentData()]["repo"],
+                                      self.config.get("download_mirror", ""),
+                                      int(self.config.get("download_connections", 4)))
+        self.dl.progress_signal.connect(self.on_dl_progress)
         self.dl.finished_signal.connect(self.on_dl_done)
         self.dl.start()
 
+    @Slot(float, float, float)
+    def on_dl_progress(self, done, total, speed):
+        if total <= 0: return
+        self.prog.setRange(0, 1000)
+        self.prog.setValue(int(done / total * 1000))
+        self.prog.setFormat(f"{done / 2 ** 30:.2f} / {total / 2 ** 30:.2f} ГБ  -  {speed / 2 ** 20:.1f} МБ/с")
+
     @Slot(bool, str)
     def on_dl_done(self, s, m):
         self.prog.hide()
         self.dl_btn.setEnabled(True)
+        self.dl_btn.setText("СКАЧАТЬ МОДЕЛЬ")
+        if self.dl.cancel.is_set(): return
         if s: 
             QMessageBox.information(self, "OK", "Скачано!")
-            self.check_and_load_model()
+            self.check_and_load_model(force=True)
         else: 
             QMessageBox.critical(self, "Err", m)
 
     def on_text_change(self):
+        if self.live.isChecked(): self.live_timer.start()
         if not self.auto.isChecked(): return
         t = self.inp.toPlainText()
         if not t: return
-        has_ru = bool(re.search('[а-яА-Я]', t))
-        curr = self.lang.currentText()
-        if has_ru and curr != "English": self.lang.setCurrentText("English")
-        elif not has_ru and curr != "Русский" and curr == "English": self.lang.setCurrentText("Русский")
+        # Детектор смотрит только начало текста и кэширует результат - на нажатие клавиши это микросекунды
+        src = lang_detect.detect(t)
+        if not src: return
+        curr = te.LANGUAGES[self.lang.currentText()]
+        if src == "ru" and curr != "en": self.lang.setCurrentText("English")
+        elif src != "ru" and curr in ("en", src): self.lang.setCurrentText("Русский")
+
+    def toggle_live(self, checked):
+        self.config["live_mode"] = checked
+        te.ConfigManager.save(self.config)
+        if checked: self.live_timer.start()
+        else:
+            self.live_timer.stop()
+            self.live_session.cancel()
+
+    def toggle_multi(self, checked, save=True):
+        self.multi_row.setVisible(checked)
+        self.out.setVisible(not checked)
+        self.out_tabs.setVisible(checked)
+        if not save: return
+        self.config["multi_mode"] = checked
+        te.ConfigManager.save(self.config)
+        if self.live.isChecked(): self.live_timer.start()
+
+    def save_multi_targets(self, *args):
+        self.config["multi_targets"] = self.multi_targets()
+        te.ConfigManager.save(self.config)
+
+    def multi_targets(self):
+        return [code for code, cb in self.multi_checks.items() if cb.isChecked()]
+
+    def on_live_option(self, *args):
+        if self.live.isChecked(): self.live_timer.start()
+
+    def start_live(self):
+        t = self.inp.toPlainText()
+        # Живой перевод - только на один язык, несколько языков переводятся кнопкой
+        if not t.strip() or not te.engine.translator or self.multi.isChecked(): return
+        bm = SPEED_BEAMS[self.speed.currentIndex()]
+        tg = te.LANGUAGES[self.lang.currentText()]
+        # Прошлый прогон отменяется через группу планировщика
+        self.live_worker = et.LiveJob(self.live_session, t, tg, bm)
+        self.live_worker.result_signal.connect(self.on_live_done)
+        self.live_worker.start()
+
+    @Slot(str, float)
+    def on_live_done(self, txt, tm):
+        if self.sender() is not self.live_worker: return
+        self.out.setPlainText(txt)
+        self.stat.setText(f"Живой перевод: {tm:.2f} сек")
 
     def start_tr(self):
         t = self.inp.toPlainText().strip()
         if not t: return
-        bm = [1, 2, 4][self.speed.currentIndex()]
+        bm = SPEED_BEAMS[self.speed.currentIndex()]
+        if self.multi.isChecked(): return self.start_multi(t, bm)
         tg = te.LANGUAGES[self.lang.currentText()]
         self.btn.setEnabled(False)
         self.stat.setText("Перевод...")
-        self.worker = te.TranslateThread(t, tg, bm)
+        self.out.clear()
+        self.stream_lines, self.stream_draft = 0, False
+        # Новая задача окна вытесняет предыдущую, если та еще считается
+        self.worker = et.TranslateJob(t, tg, bm, group="window")
+        self.worker.line_signal.connect(self.on_tr_line)
         self.worker.result_signal.connect(self.on_tr_done)
         self.worker.start()
 
+    def start_multi(self, t, bm):
+        codes = self.multi_targets()
+        if not codes:
+            self.stat.setText("Выберите языки перевода")
+            return
+        self.btn.setEnabled(False)
+        self.stat.setText(f"Перевод (языков: {len(codes)})...")
+        # Все языки одним вызовом движка: сегменты общие, языки смешаны в батчах
+        self.worker = et.MultiJob(t, codes, bm, group="window")
+        self.worker.result_signal.connect(self.on_multi_done)
+        self.worker.start()
+
+    @Slot(dict, float)
+    def on_multi_done(self, results, tm):
+        if self.sender() is not self.worker: return
+        self.observe_delivery(self.worker)
+        names = {code: name for name, code in te.LANGUAGES.items()}
+        current = self.out_tabs.tabText(self.out_tabs.currentIndex())
+        self.out_tabs.clear()
+        for code, txt in results.items():
+            edit = QTextEdit()
+            edit.setReadOnly(True)
+            edit.setStyleSheet("background-color: #1e1e1e; border: 1px solid #333;")
+            edit.setPlainText(txt)
+            self.out_tabs.addTab(edit, names.get(code, code))
+            if names.get(code) == current: self.out_tabs.setCurrentIndex(self.out_tabs.count() - 1)
+        self.btn.setEnabled(True)
+        self.stat.setText(f"Время перевода ({len(results)} яз.): {tm:.2f} сек")
+
+    @Slot(str, bool)
+    def on_tr_line(self, text, final):
+        """Дописывает строку перевода по мере готовности; черновик заменяется на следующем сигнале"""
+        if self.sender() is not self.worker: return
+        cursor = self.out.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        if self.stream_draft:
+            cursor.movePosition(QTextCursor.StartOfBlock, QTextCursor.KeepAnchor)
+        elif self.stream_lines:
+            cursor.insertText("\n")
+        cursor.insertText(text)
+        self.stream_draft = not final
+        if final: self.stream_lines += 1
+
     @Slot(str, float)
     def on_tr_done(self, txt, tm):
+        if self.sender() is not self.worker: return
+        self.observe_delivery(self.worker)
         self.out.setPlainText(txt)
         self.btn.setEnabled(True)
         self.stat.setText(f"Время перевода: {tm:.2f} сек")
@@ -623,12 +771,21 @@ class MainWindow(QMainWindow):
         else:
             try: stop_checking_hotkeys()
             except: pass
+            logger.shutdown()
             e.accept()
             QApplication.quit()
 
 if __name__ == "__main__":
+    # Модель грузится параллельно с построением окна
+    config = te.ConfigManager.load()
+    # Перехват логов до загрузки модели: ее сообщения тоже попадут во вкладку
+    logger.setup_logger(config)
+    te.engine.configure(config)
+    if config.get("model_path"): te.engine.load_async(config["model_path"])
+
     app = QApplication(sys.argv)
     app.setQuitOnLastWindowClosed(False)
     w = MainWindow()
     w.show()
+    log_info("STARTUP: окно показано через %.3f сек", time.perf_counter() - STARTUP_T0)
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,107 @@
+import re
+
+# Разметка и код в переводимом тексте. Блоки кода (```), трассировки стека
+# и куски строк - инлайн-код, теги, ссылки, пути, подстановки {name}/%s -
+# модели не отдаются: она тратит на них шаги декодирования и часто их портит.
+# Переводятся только куски с буквами между ними, документ собирается
+# обратно символ в символ.
+
+FENCE_RE = re.compile(r"^\s*(`{3,}|~{3,})")
+# Python: Traceback (most recent call last): ... ValueError: ...
+TRACE_START_RE = re.compile(r"^Traceback \(most recent call last\):")
+EXCEPTION_RE = re.compile(r"^[\w.$]+(?:Error|Exception|Warning|Interrupt|Exit)\b")
+# Строки стека вне блока Traceback: Python, Java/Kotlin/C#, JavaScript
+STACK_LINE_RE = re.compile(
+    r'^\s+File ".*", line \d+'
+    r"|^\s+at \S+\s?\(.*\)\s*$"
+    r"|^\s+at \S+:\d+(?::\d+)?\s*$"
+    r"|^\s*\.\.\. \d+ more\s*$"
+    r"|^Caused by: [\w.$]+"
+)
+
+INLINE = (
+    r"(`+).+?\1"                                              # `код`
+    r"|<!--.*?-->"
+    r"|<(code|kbd|samp|var|tt)\b[^<>]*>.*?</\2>"                # код в HTML целиком
+    r"|</?[A-Za-z][\w:-]*(?:\s+[^<>]*?)?/?>"                   # теги HTML/XML
+    r"|&(?:[A-Za-z]+|#\d+|#x[0-9A-Fa-f]+);"                    # сущности
+    r"|\[(?=[^\[\]]*\]\()|\]\([^()\s]+(?:\s+\"[^\"]*\")?\)"      # ссылка Markdown [текст](адрес)
+    r"|https?://[^\s<>\"'`]*[^\s<>\"'`.,;:!?)\]]"
+    r"|www\.[^\s<>\"'`]*[^\s<>\"'`.,;:!?)\]]"
+    r"|[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)+"
+    r"|\{\{.*?\}\}|\$\{\w+\}|\{\w*(?:![rsa])?(?::[^{}\s]*)?\}"  # шаблоны и format()
+    r"|%(?:\(\w+\)|\d+\$)?[-+#0]*\d*(?:\.\d+)?[sdifxXeEgGcr](?!\w)"  # printf
+    r"|(?<![\w/.~])(?:~|\.{1,2})?/[\w.@+-]+(?:/[\w.@+-]+)+/?"  # /usr/bin, ./src/app
+    r"|\b[\w.-]+(?:/[\w.-]+)*/[\w-]+\.\w{1,5}\b"               # src/main.py
+    r"|\b[A-Za-z]:\\[^\s\"'<>|]*"                             # C:\path
+)
+INLINE_RE = re.compile(INLINE)
+# Маркеры Markdown в начале строки: заголовки, списки, цитаты
+LINE_MARK_RE = re.compile(r"^\s*(?:(?:#{1,6}|[-*+]|\d{1,3}[.)]|>)\s+)+")
+TABLE_CELL_RE = re.compile(r"\s*\|\s*")
+
+def has_letters(text):
+    return any(c.isalpha() for c in text)
+
+def next_fence(line, fence):
+    """Открытый блок кода после строки: его ограждение (``` или ~~~) или None"""
+    if fence:
+        s = line.strip()
+        # Закрывает блок строка из одних символов ограждения, не короче открывающей
+        return None if s.startswith(fence) and not s.strip(fence[0]) else fence
+    m = FENCE_RE.match(line)
+    return m.group(1) if m else None
+
+def protected_lines(lines):
+    """Индексы строк, которые не переводятся целиком: блоки кода и трассировки стека"""
+    keep, fence, trace, opened = set(), None, False, 0
+    for i, line in enumerate(lines):
+        s = line.strip()
+        inside, fence = fence, next_fence(line, fence)
+        # Ограждения и все между ними
+        if inside or fence:
+            if not inside: opened = i
+            keep.add(i)
+            continue
+        if trace:
+            if s and line[:1].isspace():
+                keep.add(i)
+                continue
+            trace = False
+            # Последняя строка Traceback - тип и текст исключения
+            if EXCEPTION_RE.match(s):
+                keep.add(i)
+                continue
+        if TRACE_START_RE.match(s):
+            trace = True
+            keep.add(i)
+        elif STACK_LINE_RE.match(line):
+            keep.add(i)
+        # Заголовок стека Java/C#: исключение, за которым идут строки "at ..."
+        elif EXCEPTION_RE.match(s) and i + 1 < len(lines) and STACK_LINE_RE.match(lines[i + 1]):
+            keep.add(i)
+    if fence:
+        # Блок без закрывающего ограждения (обрезанная вставка): защищаем только саму строку ```
+        keep = {i for i in keep if i <= opened}
+        keep |= {opened + 1 + i for i in protected_lines(lines[opened + 1:])}
+    return keep
+
+def split_line(line):
+    """[(переводить ли, кусок)] - куски строки по порядку, вместе дают строку"""
+    spans, pos = [], 0
+    m = LINE_MARK_RE.match(line)
+    if m and m.end():
+        spans.append((False, m.group(0)))
+        pos = m.end()
+    patterns = [INLINE_RE]
+    # Строка таблицы Markdown: ячейки переводятся по отдельности
+    if line.lstrip().startswith("|"): patterns.append(TABLE_CELL_RE)
+    matches = sorted((m for r in patterns for m in r.finditer(line, pos)), key=lambda m: m.start())
+    for m in matches:
+        if m.start() < pos or m.end() == m.start(): continue
+        if m.start() > pos: spans.append((True, line[pos:m.start()]))
+        spans.append((False, m.group(0)))
+        pos = m.end()
+    if pos < len(line): spans.append((True, line[pos:]))
+    # Куски без букв (числа, знаки) тоже не переводим
+    return [(translate and has_letters(s), s) for translate, s in spans]
@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import bisect
+import threading
+
+# Метрики движка: гистограммы по этапам перевода и счетчики.
+# Снимок выгружается в JSON или в текстовый формат Prometheus
+# (подходит для textfile collector у node_exporter).
+
+PREFIX = "neuro_translator"
+
+TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+RATIO_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+# Имя -> (границы корзин, описание)
+HISTOGRAMS = {
+    "queue_wait_seconds": (TIME_BUCKETS, "Ожидание задачи в очереди планировщика"),
+    "http_queue_wait_seconds": (TIME_BUCKETS, "Ожидание запроса HTTP API до отправки в батч"),
+    "encode_seconds": (TIME_BUCKETS, "Токенизация SentencePiece и сборка подсказки"),
+    "decode_seconds": (TIME_BUCKETS, "Декодирование CTranslate2 на один батч"),
+    "detokenize_seconds": (TIME_BUCKETS, "Детокенизация SentencePiece на один батч"),
+    "first_output_seconds": (TIME_BUCKETS, "От начала задачи до первой строки"),
+    "translate_seconds": (TIME_BUCKETS, "Задача перевода целиком"),
+    "qt_delivery_seconds": (TIME_BUCKETS, "Доставка результата в GUI-поток сигналом Qt"),
+    "hotkey_capture_seconds": (TIME_BUCKETS, "Alt+1: от Ctrl+C до текста в буфере обмена"),
+    "hotkey_total_seconds": (TIME_BUCKETS, "Alt+1: от нажатия до вставки перевода или показа окна"),
+    "batch_size": (COUNT_BUCKETS, "Сегментов в батче"),
+    "batch_input_tokens": (COUNT_BUCKETS, "Входных токенов в батче"),
+    "batch_output_tokens": (COUNT_BUCKETS, "Выходных токенов в батче"),
+    "padding_ratio": (RATIO_BUCKETS, "Доля паддинга в батче (1 - токены / (размер * максимум))"),
+}
+
+COUNTERS = {
+    "segments_total": "Сегментов отдано модели",
+    "input_tokens_total": "Входных токенов отдано модели",
+    "output_tokens_total": "Токенов получено от модели",
+    "cache_hits_total": "Сегментов найдено в кэше",
+    "cache_misses_total": "Сегментов, которых не было в кэше",
+    "tm_hits_total": "Сегментов из памяти переводов (с заменой чисел, ссылок, идентификаторов)",
+    "same_language_total": "Сегментов уже на языке перевода (без модели)",
+    "adaptive_segments_total": "Сегментов в режиме Авто (сначала жадно)",
+    "escalated_total": "Сегментов режима Авто, переведенных заново лучом",
+    "speculative_jobs_total": "Текстов из буфера обмена, переведенных заранее",
+    "speculative_skipped_total": "Текстов из буфера, пропущенных по размеру или частоте",
+    "speculative_hits_total": "Alt+1 с готовым заранее переводом",
+    "speculative_joined_total": "Alt+1, подхвативших еще идущий перевод заранее",
+    "speculative_misses_total": "Alt+1 без перевода заранее",
+    "jobs_total": "Задач перевода выполнено",
+    "jobs_cancelled_total": "Задач перевода отменено",
+}
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Оценка квантиля по корзинам (верхняя граница корзины, как у Prometheus без интерполяции)"""
+        if not self.count: return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if seen >= rank: return bound
+        return float("inf")
+
+    def snapshot(self):
+        return {
+            "count": self.count, "sum": self.sum,
+            "avg": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5), "p95": self.quantile(0.95),
+            "buckets": dict(zip([str(b) for b in self.bounds] + ["+Inf"], self.counts)),
+        }
+
+class Metrics:
+    """Потокобезопасный набор гистограмм и счетчиков"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {name: Histogram(bounds) for name, (bounds, _) in HISTOGRAMS.items()}
+            self.counters = dict.fromkeys(COUNTERS, 0)
+            self.started = time.time()
+
+    def observe(self, name, value):
+        with self.lock:
+            self.histograms[name].observe(value)
+
+    def inc(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def observe_batch(self, lengths, output_tokens, decode, detokenize):
+        """Все метрики одного батча под одной блокировкой"""
+        size = len(lengths)
+        longest = max(lengths) if lengths else 0
+        tokens = sum(lengths)
+        with self.lock:
+            h = self.histograms
+            h["decode_seconds"].observe(decode)
+            h["detokenize_seconds"].observe(detokenize)
+            h["batch_size"].observe(size)
+            h["batch_input_tokens"].observe(tokens)
+            h["batch_output_tokens"].observe(output_tokens)
+            h["padding_ratio"].observe(1 - tokens / (size * longest) if longest else 0.0)
+            self.counters["segments_total"] += size
+            self.counters["input_tokens_total"] += tokens
+            self.counters["output_tokens_total"] += output_tokens
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "uptime_seconds": time.time() - self.started,
+                "counters": dict(self.counters),
+                "histograms": {name: h.snapshot() for name, h in self.histograms.items()},
+            }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=1)
+
+    def to_prometheus(self):
+        lines = []
+        with self.lock:
+            for name, value in self.counters.items():
+                full = f"{PREFIX}_{name}"
+                lines += [f"# HELP {full} {COUNTERS[name]}", f"# TYPE {full} counter", f"{full} {value}"]
+            for name, h in self.histograms.items():
+                full = f"{PREFIX}_{name}"
+                lines += [f"# HELP {full} {HISTOGRAMS[name][1]}", f"# TYPE {full} histogram"]
+                seen = 0
+                for bound, n in zip(list(h.bounds) + ["+Inf"], h.counts):
+                    seen += n
+                    lines.append(f'{full}_bucket{{le="{bound}"}} {seen}')
+                lines += [f"{full}_sum {h.sum}", f"{full}_count {h.count}"]
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """Формат по расширению: .json - снимок JSON, иначе Prometheus. Запись атомарная"""
+        data = self.to_json() if path.lower().endswith(".json") else self.to_prometheus()
+        tmp = path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f: f.write(data)
+        os.replace(tmp, path)
+
+    def summary(self):
+        """Короткая сводка для панели в логах"""
+        s = self.snapshot()
+        c, h = s["counters"], s["histograms"]
+        def ms(name):
+            x = h[name]
+            return f"{x['avg'] * 1000:7.1f} {x['p95'] * 1000:7.1f}" if x["count"] else f"{'-':>7s} {'-':>7s}"
+        looked = c['cache_hits_total'] + c['cache_misses_total']
+        rows = [
+            f"Задач: {c['jobs_total']} (отменено {c['jobs_cancelled_total']}), сегментов: {c['segments_total']}, "
+            f"из памяти переводов: {c['tm_hits_total']}, уже на нужном языке: {c['same_language_total']}",
+            f"Кэш: попаданий {c['cache_hits_total']}, промахов {c['cache_misses_total']}"
+            + (f" ({100 * c['cache_hits_total'] / looked:.0f}% попаданий)" if looked else ""),
+            f"Токенов: {c['input_tokens_total']} -> {c['output_tokens_total']}, "
+            f"батч в среднем {h['batch_size']['avg']:.1f} сегм., паддинг {h['padding_ratio']['avg'] * 100:.0f}%",
+            f"Режим Авто: {c['adaptive_segments_total']} сегм., заново лучом {c['escalated_total']}"
+            + (f" ({100 * c['escalated_total'] / c['adaptive_segments_total']:.0f}%)" if c['adaptive_segments_total'] else ""),
+            f"{'этап':14s} {'сред мс':>7s} {'p95 мс':>7s}",
+        ]
+        asked = c['speculative_hits_total'] + c['speculative_joined_total'] + c['speculative_misses_total']
+        if c['speculative_jobs_total'] or asked:
+            rows.insert(4, f"Заранее: {c['speculative_jobs_total']} из буфера (пропущено {c['speculative_skipped_total']}), "
+                           f"Alt+1: готово {c['speculative_hits_total']}, в работе {c['speculative_joined_total']}, "
+                           f"мимо {c['speculative_misses_total']}"
+                           + (f" ({100 * (c['speculative_hits_total'] + c['speculative_joined_total']) / asked:.0f}% попаданий)" if asked else ""))
+        for label, name in (("очередь", "queue_wait_seconds"), ("токенизация", "encode_seconds"),
+                            ("декодирование", "decode_seconds"), ("детокенизация", "detokenize_seconds"),
+                            ("первый вывод", "first_output_seconds"), ("задача", "translate_seconds"),
+                            ("сигнал Qt", "qt_delivery_seconds"), ("Alt+1 буфер", "hotkey_capture_seconds"),
+                            ("Alt+1 целиком", "hotkey_total_seconds")):
+            rows.append(f"{label:14s} {ms(name)}")
+        return "\n".join(rows)
@@ -0,0 +1,428 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Скачивание моделей: файлы и куски файлов параллельно (HTTP Range), докачка
+# после обрыва, проверка sha256 до того, как модель будет загружена в движок.
+# Источник - Hugging Face, HTTP-зеркало или папка (например, сетевая шара):
+#   зеркало/<имя репозитория>/manifest.json + файлы модели
+# manifest.json для зеркала делает команда:
+#   python model_download.py manifest <папка с моделью>
+
+HUB_URL = "https://huggingface.co"
+MANIFEST = "manifest.json"
+DEFAULT_CONNECTIONS = 4
+CHUNK_SIZE = 32 * 2 ** 20
+READ_SIZE = 2 ** 20
+RETRIES = 3
+TIMEOUT = 30
+# Как часто отдавать прогресс в GUI
+PROGRESS_INTERVAL = 0.2
+
+class DownloadError(Exception):
+    pass
+
+class DownloadCancelled(DownloadError):
+    pass
+
+def _request(url, start=None, end=None):
+    headers = {"User-Agent": "neuro-translator"}
+    if start is not None: headers["Range"] = f"bytes={start}-{end - 1}"
+    token = os.environ.get("HF_TOKEN")
+    if token and url.startswith(HUB_URL): headers["Authorization"] = f"Bearer {token}"
+    return urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=TIMEOUT)
+
+class HubSource:
+    """Репозиторий Hugging Face: размеры и хэши из API, файлы по resolve/main"""
+    def __init__(self, repo_id, base=HUB_URL):
+        self.repo_id, self.base = repo_id, base.rstrip("/")
+
+    def manifest(self):
+        with _request(f"{self.base}/api/models/{self.repo_id}?blobs=true") as r:
+            info = json.load(r)
+        files = []
+        for s in info.get("siblings", []):
+            lfs = s.get("lfs") or {}
+            # Большие файлы лежат в LFS с sha256, мелкие проверяем по git-хэшу (sha1 блоба)
+            files.append({"name": s["rfilename"], "size": lfs.get("size", s.get("size")),
+                          "sha256": lfs.get("sha256"), "git_sha1": None if lfs else s.get("blobId")})
+        return files
+
+    def open(self, name, start=None, end=None):
+        return _request(f"{self.base}/{self.repo_id}/resolve/main/{urllib.parse.quote(name)}", start, end)
+
+class HttpMirror:
+    """Внутренний HTTP-сервер: <url>/<репозиторий>/manifest.json и файлы рядом"""
+    def __init__(self, url, repo_id):
+        self.url = f"{url.rstrip('/')}/{repo_id.split('/')[-1]}"
+
+    def manifest(self):
+        with _request(f"{self.url}/{MANIFEST}") as r: return json.load(r)["files"]
+
+    def open(self, name, start=None, end=None):
+        return _request(f"{self.url}/{urllib.parse.quote(name)}", start, end)
+
+class _RangeReader:
+    def __init__(self, f, length):
+        self.f, self.left = f, length
+    def read(self, n):
+        data = self.f.read(min(n, self.left))
+        self.left -= len(data)
+        return data
+    def close(self): self.f.close()
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+class DirMirror:
+    """Папка-зеркало (локальная или сетевая); без manifest.json хэшей не будет"""
+    def __init__(self, path, repo_id):
+        self.path = os.path.join(path, repo_id.split("/")[-1])
+
+    def manifest(self):
+        p = os.path.join(self.path, MANIFEST)
+        if os.path.exists(p):
+            with open(p, 'r', encoding='utf-8') as f: return json.load(f)["files"]
+        print(f"Внимание: в {self.path} нет {MANIFEST}, файлы не будут проверены")
+        return [{"name": os.path.relpath(os.path.join(root, n), self.path).replace(os.sep, "/"),
+                 "size": os.path.getsize(os.path.join(root, n))}
+                for root, _, names in os.walk(self.path) for n in names]
+
+    def open(self, name, start=None, end=None):
+        f = open(os.path.join(self.path, name), 'rb')
+        if start is None: return f
+        f.seek(start)
+        return _RangeReader(f, end - start)
+
+def check_name(name):
+    """Имя файла из манифеста: только относительный путь внутри папки модели"""
+    parts = name.replace("\\", "/").split("/") if isinstance(name, str) else [""]
+    if any(p in ("", ".", "..") for p in parts) or os.path.isabs(name) or ":" in parts[0]:
+        raise DownloadError(f"недопустимое имя файла в манифесте: {name!r}")
+    return name
+
+def make_source(repo_id, mirror=""):
+    if not mirror: return HubSource(repo_id)
+    if mirror.startswith(("http://", "https://")): return HttpMirror(mirror, repo_id)
+    return DirMirror(mirror, repo_id)
+
+def _hasher(entry):
+    if entry.get("sha256"): return hashlib.sha256(), entry["sha256"]
+    if entry.get("git_sha1"):
+        h = hashlib.sha1()
+        h.update(b"blob %d\0" % entry["size"])
+        return h, entry["git_sha1"]
+    return None, None
+
+def verify(path, entry):
+    """True, если файл совпадает с опубликованным хэшем (или хэша нет)"""
+    h, expected = _hasher(entry)
+    if entry.get("size") is not None and os.path.getsize(path) != entry["size"]: return False
+    if not h: return True
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_SIZE), b""): h.update(block)
+    return h.hexdigest() == expected
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_SIZE), b""): h.update(block)
+    return h.hexdigest()
+
+def write_manifest(folder):
+    """manifest.json с размерами и sha256 всех файлов папки (для зеркала)"""
+    files = []
+    for root, _, names in os.walk(folder):
+        for n in sorted(names):
+            p = os.path.join(root, n)
+            name = os.path.relpath(p, folder).replace(os.sep, "/")
+            if name == MANIFEST or name.endswith((".part", ".part.json")): continue
+            files.append({"name": name, "size": os.path.getsize(p), "sha256": sha256_file(p)})
+    with open(os.path.join(folder, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump({"files": files}, f, indent=1)
+    return files
+
+class Progress:
+    """Счетчик байт на все потоки; callback(скачано, всего, байт/с) не чаще PROGRESS_INTERVAL"""
+    def __init__(self, total, callback=None):
+        self.total, self.callback = total, callback
+        self.done = 0
+        self.lock = threading.Lock()
+        self.samples = [(time.perf_counter(), 0)]
+        self.last = 0.0
+
+    def add(self, n, force=False):
+        with self.lock:
+            self.done += n
+            now = time.perf_counter()
+            if not force and now - self.last < PROGRESS_INTERVAL: return
+            self.last = now
+            # Скорость по окну последних ~5 секунд
+            self.samples.append((now, self.done))
+            while len(self.samples) > 2 and now - self.samples[0][0] > 5: self.samples.pop(0)
+            t0, d0 = self.samples[0]
+            speed = (self.done - d0) / (now - t0) if now > t0 else 0.0
+            done = self.done
+        if self.callback: self.callback(done, self.total, speed)
+
+class Downloader:
+    def __init__(self, source, target_folder, connections=DEFAULT_CONNECTIONS, chunk_size=CHUNK_SIZE,
+                 progress=None, cancel=None):
+        self.source, self.folder = source, target_folder
+        self.connections = max(1, int(connections))
+        self.chunk_size = chunk_size
+        self.on_progress = progress
+        self.cancel = cancel or threading.Event()
+        self.state_lock = threading.Lock()
+
+    def run(self):
+        """Скачивает и проверяет все файлы; готовые файлы появляются под своими именами только после проверки"""
+        files = self.source.manifest()
+        # Манифест не должен писать за пределы папки модели
+        for entry in files: check_name(entry["name"])
+        todo, skipped = [], 0
+        for entry in files:
+            path = self._paths(entry)[0]
+            if os.path.exists(path) and verify(path, entry):
+                skipped += 1
+                continue
+            todo.append(entry)
+        parts = [(e, self._load_state(e)) for e in todo]
+        total = sum(e["size"] or 0 for e in todo)
+        done = sum(min(c * self.chunk_size + self.chunk_size, e["size"]) - c * self.chunk_size
+                   for e, state in parts if e.get("size") for c in state)
+        print(f"Файлов: {len(files)}, уже на месте: {skipped}, к скачиванию: "
+              f"{(total - done) / 2 ** 20:.1f} МБ" + (f" (докачка, есть {done / 2 ** 20:.1f} МБ)" if done else ""))
+        self.progress = Progress(total, self.on_progress)
+        self.progress.add(done, force=True)
+
+        t = time.perf_counter()
+        with ThreadPoolExecutor(self.connections, thread_name_prefix="download") as pool:
+            # Куски всех файлов в одной очереди: мелкие файлы не ждут большой
+            tasks = [pool.submit(self._fetch_chunk, e, c, state) for e, state in parts
+                     for c in range(self._chunks(e)) if c not in state]
+            try:
+                for task in tasks: task.result()
+            except BaseException:
+                self.cancel.set()
+                raise
+        for e, _ in parts: self._finish(e)
+        self.progress.add(0, force=True)
+        spent = time.perf_counter() - t
+        print(f"Скачивание завершено: {(total - done) / 2 ** 20:.1f} МБ за {spent:.1f} сек "
+              f"({(total - done) / 2 ** 20 / spent if spent else 0:.1f} МБ/с)")
+        return files
+
+    def _paths(self, entry):
+        path = os.path.join(self.folder, check_name(entry["name"]))
+        return path, path + ".part", path + ".part.json"
+
+    def _chunks(self, entry):
+        # Пустой файл не запрашиваем: .part нулевого размера уже создан
+        if entry.get("size") == 0: return 0
+        if not entry.get("size"): return 1
+        return (entry["size"] + self.chunk_size - 1) // self.chunk_size
+
+    def _load_state(self, entry):
+        """Номера уже скачанных кусков; .part заранее создается нужного размера"""
+        path, part, state_path = self._paths(entry)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        state = set()
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f: saved = json.load(f)
+            if saved.get("size") == entry.get("size") and saved.get("chunk_size") == self.chunk_size and os.path.exists(part):
+                state = set(saved["done"])
+        except (OSError, ValueError):
+            pass
+        if not state or not os.path.exists(part):
+            with open(part, 'wb') as f:
+                if entry.get("size"): f.truncate(entry["size"])
+            state = set()
+        return state
+
+    def _save_state(self, entry, state):
+        _, _, state_path = self._paths(entry)
+        tmp = state_path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"size": entry.get("size"), "chunk_size": self.chunk_size, "done": sorted(state)}, f)
+        os.replace(tmp, state_path)
+
+    def _fetch_chunk(self, entry, index, state):
+        _, part, _ = self._paths(entry)
+        size = entry.get("size")
+        start = index * self.chunk_size
+        end = min(start + self.chunk_size, size) if size else None
+        for attempt in range(RETRIES):
+            written = 0
+            try:
+                ranged = bool(size) and (start > 0 or end < size)
+                with self.source.open(entry["name"], start if ranged else None, end) as r, open(part, 'r+b') as f:
+                    f.seek(start)
+                    # Сервер без поддержки Range отдает файл целиком (200) - пропускаем начало
+                    skip = start if ranged and getattr(r, "status", 206) == 200 else 0
+                    while True:
+                        if self.cancel.is_set(): raise DownloadCancelled("Скачивание отменено")
+                        block = r.read(READ_SIZE)
+                        if not block: break
+                        if skip:
+                            cut = min(skip, len(block))
+                            block, skip = block[cut:], skip - cut
+                            if not block: continue
+                        if end is not None: block = block[:end - start - written]
+                        f.write(block)
+                        written += len(block)
+                        self.progress.add(len(block))
+                        if end is not None and written >= end - start: break
+                if end is not None and written != end - start:
+                    raise DownloadError(f"{entry['name']}: получено {written} из {end - start} байт")
+                with self.state_lock:
+                    state.add(index)
+                    self._save_state(entry, state)
+                return
+            except DownloadCancelled:
+                self.progress.add(-written)
+                raise
+            except Exception as e:
+                self.progress.add(-written)
+                if attempt == RETRIES - 1:
+                    raise DownloadError(f"{entry['name']}: {e}")
+                print(f"Повтор куска {index} файла {entry['name']}: {e}")
+                time.sleep(1 + attempt)
+
+    def _finish(self, entry):
+        path, part, state_path = self._paths(entry)
+        if not verify(part, entry):
+            # Испорченный файл не докачивается - при следующем запуске начнем его заново
+            for p in (part, state_path):
+                if os.path.exists(p): os.remove(p)
+            raise DownloadError(f"{entry['name']}: контрольная сумма не совпала, файл удален")
+        os.replace(part, path)
+        if os.path.exists(state_path): os.remove(state_path)
+
+def download(repo_id, target_folder, mirror="", connections=DEFAULT_CONNECTIONS, progress=None, cancel=None):
+    return Downloader(make_source(repo_id, mirror), target_folder, connections, progress=progress, cancel=cancel).run()
+
+def selftest():
+    """Проверка на локальном HTTP-сервере с Range: обрыв, докачка, порча файла и папка-зеркало"""
+    import tempfile
+    from functools import partial
+    from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+    class RangeHandler(SimpleHTTPRequestHandler):
+        def log_message(self, *args): pass
+        def send_head(self):
+            rng = self.headers.get("Range")
+            path = self.translate_path(self.path)
+            if not rng or not os.path.isfile(path): return super().send_head()
+            size = os.path.getsize(path)
+            # Медленная сеть: иначе тест скачает все раньше первого отчета о прогрессе
+            time.sleep(0.15)
+            start, end = rng.split("=")[1].split("-")
+            start, end = int(start), min(int(end), size - 1)
+            f = open(path, 'rb')
+            f.seek(start)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            self.send_header("Content-Length", str(end - start + 1))
+            self.end_headers()
+            return _RangeReader(f, end - start + 1)
+
+    class QuietServer(ThreadingHTTPServer):
+        # Обрыв соединения при отмене - штатная ситуация теста
+        def handle_error(self, *args): pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+        share = os.path.join(tmp, "share", "test-model")
+        os.makedirs(share)
+        blobs = {"model.bin": os.urandom(5 * 2 ** 20 + 123), "config.json": b'{"a": 1}', "sentencepiece.model": os.urandom(70000)}
+        for name, data in blobs.items():
+            with open(os.path.join(share, name), 'wb') as f: f.write(data)
+        write_manifest(share)
+        server = QuietServer(("127.0.0.1", 0), partial(RangeHandler, directory=os.path.join(tmp, "share")))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        ok = True
+        def check(label, cond):
+            nonlocal ok
+            ok = ok and cond
+            print(f"  {'OK  ' if cond else 'FAIL'} {label}")
+        def same(folder):
+            return all(os.path.exists(os.path.join(folder, n)) and open(os.path.join(folder, n), 'rb').read() == d
+                       for n, d in blobs.items())
+
+        print("Самопроверка загрузчика:")
+        # 1. Обрыв на середине и докачка
+        out = os.path.join(tmp, "out1")
+        cancel = threading.Event()
+        seen = []
+        def stop_midway(done, total, speed):
+            seen.append(done)
+            if done: cancel.set()
+        d = Downloader(HttpMirror(url, "org/test-model"), out, 2, 2 ** 20, stop_midway, cancel)
+        try:
+            d.run()
+            check("обрыв на середине", False)
+        except DownloadCancelled:
+            check("обрыв на середине", seen[-1] < sum(map(len, blobs.values())) and not os.path.exists(os.path.join(out, "model.bin")))
+        resumed = []
+        Downloader(HttpMirror(url, "org/test-model"), out, 4, 2 ** 20, lambda done, total, s: resumed.append((done, total))).run()
+        check("докачка продолжает с места обрыва", resumed[0][0] > 0)
+        check("прогресс дошел до конца байт в байт", resumed[-1][0] == resumed[-1][1] == sum(map(len, blobs.values())))
+        check("файлы совпадают после докачки", same(out))
+        check("временные файлы убраны", not [n for n in os.listdir(out) if ".part" in n])
+
+        # 2. Подмененный файл на сервере не попадает в папку модели
+        with open(os.path.join(share, "model.bin"), 'r+b') as f: f.write(b"XX")
+        out2 = os.path.join(tmp, "out2")
+        try:
+            Downloader(HttpMirror(url, "org/test-model"), out2, 4, 2 ** 20).run()
+            check("порча файла обнаружена", False)
+        except DownloadError as e:
+            check("порча файла обнаружена", "контрольная сумма" in str(e) and not os.path.exists(os.path.join(out2, "model.bin")))
+        with open(os.path.join(share, "model.bin"), 'wb') as f: f.write(blobs["model.bin"])
+
+        # 3. Папка-зеркало (сетевая шара)
+        out3 = os.path.join(tmp, "out3")
+        Downloader(DirMirror(os.path.join(tmp, "share"), "org/test-model"), out3, 2, 2 ** 20).run()
+        check("установка из папки-зеркала", same(out3))
+        server.shutdown()
+    print("Все проверки пройдены" if ok else "ЕСТЬ ОШИБКИ")
+    return 0 if ok else 1
+
+def main(argv=None):
+    from model_registry import MODELS
+    ap = argparse.ArgumentParser(description="Скачивание моделей с проверкой и докачкой")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    get = sub.add_parser("get", help="скачать модель")
+    get.add_argument("model", choices=sorted(MODELS))
+    get.add_argument("folder")
+    get.add_argument("--mirror", default="", help="папка или http(s)-адрес зеркала")
+    get.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS)
+    man = sub.add_parser("manifest", help="записать manifest.json для зеркала")
+    man.add_argument("folder")
+    sub.add_parser("selftest", help="проверка на локальном HTTP-сервере")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "selftest": return selftest()
+    if args.cmd == "manifest":
+        files = write_manifest(args.folder)
+        print(f"{MANIFEST}: {len(files)} файлов")
+        return 0
+    def show(done, total, speed):
+        sys.stdout.write(f"\r{done / 2 ** 20:9.1f} / {total / 2 ** 20:.1f} МБ  {speed / 2 ** 20:6.1f} МБ/с")
+        if done == total: sys.stdout.write("\n")
+    try:
+        download(MODELS[args.model]["repo"], args.folder, args.mirror, args.connections, show)
+    except DownloadError as e:
+        print(f"\nОшибка скачивания: {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+import os
+
+from lang_detect import detect
+
+# Описание поддерживаемых моделей: файлы, токенизатор, коды языков и формат подсказки.
+# MADLAD выбирает язык токеном <2xx> в начале источника, NLLB - токенами языка
+# источника в source и языка перевода в target_prefix.
+
+DEFAULT_MODEL = "madlad400-3b"
+
+NLLB_CODES = {
+    "ru": "rus_Cyrl", "en": "eng_Latn", "de": "deu_Latn", "fr": "fra_Latn",
+    "es": "spa_Latn", "uk": "ukr_Cyrl", "it": "ita_Latn", "zh": "zho_Hans"
+}
+
+MODELS = {
+    "madlad400-3b": {
+        "title": "MADLAD-400 3B",
+        "repo": "santhosh/madlad400-3b-ct2",
+        "files": ["model.bin", "config.json", "sentencepiece.model"],
+        "tokenizer": "sentencepiece.model",
+        "prompt": "madlad",
+        "codes": None,
+    },
+    "nllb-1.3b": {
+        "title": "NLLB-200 distilled 1.3B int8",
+        "repo": "winstxnhdw/nllb-200-distilled-1.3B-ct2-int8",
+        "files": ["model.bin", "config.json", "sentencepiece.bpe.model"],
+        "tokenizer": "sentencepiece.bpe.model",
+        "prompt": "nllb",
+        "codes": NLLB_CODES,
+    },
+    "nllb-600m": {
+        "title": "NLLB-200 distilled 600M int8",
+        "repo": "softcatala/nllb-200-distilled-600M-ct2-int8",
+        "files": ["model.bin", "config.json", "sentencepiece.bpe.model"],
+        "tokenizer": "sentencepiece.bpe.model",
+        "prompt": "nllb",
+        "codes": NLLB_CODES,
+    },
+}
+
+def guess_source_lang(text):
+    """Язык источника для NLLB; нераспознанный текст считаем английским"""
+    return detect(text, default="en")
+
+class MadladPrompt:
+    """<2xx> перед текстом, target_prefix не нужен"""
+    def __init__(self, spec):
+        self.spec = spec
+
+    def source(self, tokens, text, target_lang_code, source_lang_code=None):
+        return [f"<2{target_lang_code}>"] + tokens
+
+    def target_prefix(self, target_lang_code):
+        return None
+
+    def vmap_key(self, target_lang_code):
+        """Токен источника, по которому vmap.txt включает словарный список языка"""
+        return f"<2{target_lang_code}>"
+
+    def clean(self, pieces, target_lang_code):
+        return pieces
+
+class NllbPrompt:
+    """[язык источника] текст </s>, перевод начинается с токена языка назначения"""
+    def __init__(self, spec):
+        self.codes = spec["codes"]
+
+    def code(self, lang):
+        return self.codes.get(lang, lang)
+
+    def source(self, tokens, text, target_lang_code, source_lang_code=None):
+        src = source_lang_code or guess_source_lang(text)
+        return [self.code(src)] + tokens + ["</s>"]
+
+    def target_prefix(self, target_lang_code):
+        return [self.code(target_lang_code)]
+
+    def vmap_key(self, target_lang_code):
+        # Язык перевода задан в target_prefix, в источнике его нет
+        return None
+
+    def clean(self, pieces, target_lang_code):
+        if pieces and pieces[0] == self.code(target_lang_code): return pieces[1:]
+        return pieces
+
+PROMPTS = {"madlad": MadladPrompt, "nllb": NllbPrompt}
+
+def make_prompt(spec):
+    return PROMPTS[spec["prompt"]](spec)
+
+def detect_model(path):
+    """Определяет модель по файлам в папке (по имени папки, затем по токенизатору)"""
+    base = os.path.basename(os.path.normpath(path)).lower()
+    for name, spec in MODELS.items():
+        if spec["repo"].split("/")[-1].lower() == base: return name
+    for name, spec in MODELS.items():
+        if os.path.exists(os.path.join(path, spec["tokenizer"])): return name
+    return DEFAULT_MODEL
+
+def missing_files(name, path):
+    return [f for f in MODELS[name]["files"] if not os.path.exists(os.path.join(path, f))]
+
+def model_size(path):
+    """Размер весов на диске - оценка занимаемой памяти, байт"""
+    p = os.path.join(path, "model.bin")
+    return os.path.getsize(p) if os.path.exists(p) else 0
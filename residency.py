@@ -0,0 +1,165 @@
+import os
+import sys
+import time
+import threading
+from contextlib import contextmanager
+
+# Жизненный цикл моделей в памяти: прогрев сразу после загрузки и выгрузка
+# весов после простоя (Translator.unload_model). Переводчик, токенизатор и
+# пулы потоков остаются, поэтому load_model() намного быстрее холодной загрузки.
+
+DEFAULT_IDLE_MINUTES = 30
+WARMUP_TEXT = "Hello! This short sentence warms up the model."
+WARMUP_TARGET = "ru"
+
+STATE_READY = "в памяти"
+STATE_UNLOADED = "выгружена"
+STATE_LOADING = "возвращается в память"
+
+def process_rss():
+    """Занятая процессом физическая память, байт (0, если узнать не удалось)"""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            get_info = ctypes.windll.psapi.GetProcessMemoryInfo
+            get_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+            if get_info(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize
+            return 0
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return 0
+
+class ResidencyManager:
+    """Следит за простоем моделей движка; переводы идут через use(model)"""
+    def __init__(self, engine, idle_minutes=DEFAULT_IDLE_MINUTES, warmup=True):
+        self.engine = engine
+        self.idle_seconds = idle_minutes * 60
+        self.warmup = warmup
+        self.cond = threading.Condition()
+        self.active = {}
+        self.last_used = {}
+        self.states = {}
+        self.thread = None
+        engine.residency = self
+
+    def configure(self, config):
+        self.idle_seconds = float(config.get("idle_unload_minutes", DEFAULT_IDLE_MINUTES)) * 60
+        self.warmup = bool(config.get("warmup", True))
+        with self.cond: self.cond.notify_all()
+
+    def register(self, model):
+        """Модель только что загружена в память"""
+        with self.cond:
+            self.states[model.name] = STATE_READY
+            self.last_used[model.name] = time.time()
+        self._ensure_monitor()
+
+    def warm_up(self, model):
+        if not self.warmup or not model: return
+        # Первый вызов платит за подкачку страниц весов и разогрев аллокатора - делаем его сами
+        t = time.perf_counter()
+        try:
+            self.engine.translate_segments([WARMUP_TEXT], WARMUP_TARGET, 1, model)
+            print(f"Прогрев модели {model.name}: {(time.perf_counter() - t) * 1000:.0f} мс")
+        except Exception as e:
+            print(f"Прогрев не удался: {e}")
+
+    def forget(self, name):
+        with self.cond:
+            for d in (self.states, self.last_used, self.active): d.pop(name, None)
+
+    @contextmanager
+    def use(self, model):
+        name = model.name
+        with self.cond:
+            self.active[name] = self.active.get(name, 0) + 1
+            # Пока одна задача возвращает модель в память, остальные ждут ее
+            while self.states.get(name) == STATE_LOADING: self.cond.wait()
+            reactivate = self.states.get(name) == STATE_UNLOADED
+            if reactivate: self.states[name] = STATE_LOADING
+        try:
+            if reactivate: self._reactivate(model)
+            yield
+        finally:
+            with self.cond:
+                self.active[name] = self.active.get(name, 1) - 1
+                self.last_used[name] = time.time()
+
+    def _reactivate(self, model):
+        t = time.perf_counter()
+        try:
+            model.translator.load_model()
+            print(f"Модель {model.name} снова в памяти за {(time.perf_counter() - t) * 1000:.0f} мс")
+        finally:
+            with self.cond:
+                self.states[model.name] = STATE_READY if getattr(model.translator, "model_is_loaded", True) else STATE_UNLOADED
+                self.cond.notify_all()
+
+    def unload(self, name):
+        """Выгружает веса модели, если она сейчас не занята"""
+        with self.engine.models_lock:
+            model = self.engine.models.get(name)
+        if not model or not hasattr(model.translator, "unload_model"): return False
+        with self.cond:
+            if self.active.get(name) or self.states.get(name) != STATE_READY: return False
+            # Держим блокировку: новая задача дождется конца выгрузки и вернет модель
+            self.states[name] = STATE_LOADING
+            try:
+                model.translator.unload_model()
+                self.states[name] = STATE_UNLOADED
+                print(f"Модель {name} выгружена из памяти, RSS {process_rss() / 2 ** 20:.0f} МБ")
+            except Exception as e:
+                self.states[name] = STATE_READY
+                print(f"Выгрузка не удалась: {e}")
+            self.cond.notify_all()
+        return self.states.get(name) == STATE_UNLOADED
+
+    def is_ready(self, model):
+        """Модель в памяти и не возвращается в нее"""
+        if not model: return False
+        with self.cond: return self.states.get(model.name, STATE_READY) == STATE_READY
+
+    def wake(self):
+        """Заранее возвращает основную модель в память (например, при показе окна)"""
+        model = self.engine.model
+        if not model or self.states.get(model.name) != STATE_UNLOADED: return
+        def run():
+            with self.use(model): pass
+        threading.Thread(target=run, name="model-wake", daemon=True).start()
+
+    def _ensure_monitor(self):
+        if self.thread and self.thread.is_alive(): return
+        self.thread = threading.Thread(target=self._monitor, name="model-residency", daemon=True)
+        self.thread.start()
+
+    def _monitor(self):
+        while True:
+            with self.cond:
+                # Проверяем с шагом в четверть периода простоя (0 - не выгружать)
+                self.cond.wait(min(60, self.idle_seconds / 4) if self.idle_seconds > 0 else 60)
+                if self.idle_seconds <= 0: continue
+                now = time.time()
+                idle = [n for n, s in self.states.items()
+                        if s == STATE_READY and not self.active.get(n) and now - self.last_used.get(n, now) >= self.idle_seconds]
+            for name in idle: self.unload(name)
+
+    def status(self):
+        """Строка для вкладки настроек"""
+        now = time.time()
+        with self.cond:
+            parts = [f"{n}: {s}" + (f", простой {(now - self.last_used[n]) / 60:.0f} мин" if s == STATE_READY and n in self.last_used else "")
+                     for n, s in self.states.items()]
+        rss = process_rss()
+        memory = f"RSS {rss / 2 ** 20:.0f} МБ" if rss else "RSS неизвестен"
+        return f"{'; '.join(parts) or 'модель не загружена'} | {memory}"
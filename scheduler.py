@@ -0,0 +1,223 @@
+import heapq
+import itertools
+import threading
+import time
+import traceback
+from contextlib import nullcontext
+from concurrent.futures import Future
+
+# Чем меньше число, тем раньше задача уходит в движок
+PRIORITY_INLINE = 0
+PRIORITY_WINDOW = 1
+# Перевод заранее (speculative): только когда больше нечего делать
+PRIORITY_BACKGROUND = 2
+
+class TranslationCancelled(Exception):
+    pass
+
+class TranslationJob:
+    def __init__(self, key, priority, stream):
+        self.key = key
+        self.priority = priority
+        self.stream = stream
+        self.future = Future()
+        self.cancelled = threading.Event()
+        self.lock = threading.Lock()
+        self.lines = []
+        self.listeners = []
+        self.groups = set()
+        # Анонимный заказчик (без группы) не может быть вытеснен
+        self.pinned = False
+        self.started = False
+        self.submitted = time.time()
+        # False - результат не пишется в кэш и память переводов (перевод заранее)
+        self.persist = True
+
+    def add_listener(self, on_line):
+        with self.lock:
+            # Подключившийся позже получает уже готовые строки
+            for line, final in self.lines:
+                on_line(line, final)
+            self.listeners.append(on_line)
+
+    def emit(self, line, final):
+        with self.lock:
+            if final: self.lines.append((line, final))
+            for on_line in self.listeners:
+                try: on_line(line, final)
+                except: print(traceback.format_exc())
+
+class TranslationScheduler:
+    """Единственный владелец движка: очередь с приоритетами, отмена и склейка дублей"""
+    def __init__(self, engine):
+        self.engine = engine
+        self.cond = threading.Condition()
+        self.heap = []
+        self.seq = itertools.count()
+        self.jobs = {}
+        self.groups = {}
+        self.thread = None
+
+    def submit(self, text, target_lang_code, beam_size=1, priority=PRIORITY_WINDOW, group=None, on_line=None, stream=False, model=None, persist=True):
+        """Ставит перевод в очередь и возвращает Future с готовым текстом.
+
+        Новая задача той же группы отменяет предыдущую, одинаковые задачи
+        в полете склеиваются в одну. persist=False - не сохранять результат
+        в кэш и память переводов, пока к задаче не присоединится обычный запрос.
+        """
+        key = (text, target_lang_code, beam_size, model)
+        with self.cond:
+            previous = self.groups.get(group) if group else None
+            job = self.jobs.get(key)
+            if job and job.cancelled.is_set(): job = None
+            if job:
+                if priority < job.priority and not job.started:
+                    # Повышаем приоритет: старая запись в куче будет пропущена
+                    job.priority = priority
+                    heapq.heappush(self.heap, (priority, next(self.seq), job))
+                job.stream = job.stream or stream
+                if not job.started: job.persist = job.persist or persist
+            else:
+                job = TranslationJob(key, priority, stream)
+                job.persist = persist
+                self.jobs[key] = job
+                heapq.heappush(self.heap, (priority, next(self.seq), job))
+            if group:
+                job.groups.add(group)
+                self.groups[group] = job
+            else:
+                job.pinned = True
+            if previous and previous is not job:
+                previous.groups.discard(group)
+                self._cancel_if_orphaned(previous)
+            self._ensure_worker()
+            self.cond.notify()
+        if on_line: job.add_listener(on_line)
+        return job.future
+
+    def submit_segments(self, segments, target_lang_code, beam_size=1, model=None, priority=PRIORITY_WINDOW, group=None):
+        """Перевод уже нарезанных сегментов (живой режим); Future со списком переводов"""
+        return self.submit(tuple(segments), target_lang_code, beam_size, priority, group, model=model)
+
+    def submit_multi(self, text, target_lang_codes, beam_size=1, priority=PRIORITY_WINDOW, group=None, model=None):
+        """Один текст на несколько языков одним вызовом движка; Future со словарем {код: перевод}"""
+        return self.submit(text, tuple(target_lang_codes), beam_size, priority, group, model=model)
+
+    def cancel_group(self, group):
+        with self.cond:
+            job = self.groups.pop(group, None)
+            if job:
+                job.groups.discard(group)
+                self._cancel_if_orphaned(job)
+
+    def _cancel_if_orphaned(self, job):
+        if job.groups or job.pinned: return
+        job.cancelled.set()
+        if self.jobs.get(job.key) is job: del self.jobs[job.key]
+        # Задача еще в очереди - отменяем сразу, иначе ее остановит проверка между батчами
+        if job.future.cancel():
+            print("Задача перевода отменена")
+            self.engine.metrics.inc("jobs_cancelled_total")
+
+    def _ensure_worker(self):
+        if self.thread and self.thread.is_alive(): return
+        self.thread = threading.Thread(target=self._run, name="translation-scheduler", daemon=True)
+        self.thread.start()
+
+    def _next_job(self):
+        with self.cond:
+            while True:
+                while self.heap:
+                    priority, _, job = heapq.heappop(self.heap)
+                    # Пропускаем отмененные и устаревшие записи после повышения приоритета
+                    if job.started or job.cancelled.is_set() or priority != job.priority: continue
+                    if not job.future.set_running_or_notify_cancel(): continue
+                    job.started = True
+                    return job
+                self.cond.wait()
+
+    def _run(self):
+        while True:
+            pool = self.engine.pool
+            # С пулом реплик задача берется из очереди, только когда есть свободная реплика:
+            # до этого приоритеты и вытеснение работают как обычно. Пока реплики
+            # загружаются, задачи выполняет основная модель - первый Alt+1 их не ждет
+            if pool and pool.ready(): pool.wait_idle()
+            job = self._next_job()
+            pool = self.engine.pool
+            if pool and pool.ready():
+                try:
+                    text = job.key[0]
+                    weight = sum(map(len, text)) if isinstance(text, tuple) else len(text)
+                    pool.submit(lambda model, job=job: self._complete(job, model), weight or 1)
+                    continue
+                except RuntimeError:
+                    pass
+            self._complete(job)
+
+    def _complete(self, job, replica=None):
+        try:
+            with nullcontext() if job.persist else self.engine.private():
+                job.future.set_result(self._execute(job, replica))
+        except TranslationCancelled as e:
+            print("Задача перевода прервана между батчами")
+            self.engine.metrics.inc("jobs_cancelled_total")
+            job.future.set_exception(e)
+        except Exception as e:
+            print(traceback.format_exc())
+            job.future.set_exception(e)
+        finally:
+            with self.cond:
+                if self.jobs.get(job.key) is job: del self.jobs[job.key]
+                for group in job.groups:
+                    if self.groups.get(group) is job: del self.groups[group]
+
+    def _execute(self, job, replica=None):
+        text, code, beam, name = job.key
+        if not self.engine.translator:
+            raise RuntimeError("движок не готов")
+        metrics = self.engine.metrics
+        model = self.engine.get_model(name) if name else None
+        # Реплика заменяет основную модель; короткие тексты по-прежнему уходят в малую
+        if replica and not model and self.engine.pick_model(sum(map(len, text)) if isinstance(text, tuple) else len(text)) is self.engine.model:
+            model = replica
+        t = time.time()
+        metrics.observe("queue_wait_seconds", t - job.submitted)
+        print(f"Translate -> {'+'.join(code) if isinstance(code, tuple) else code} (очередь {t - job.submitted:.2f} сек)")
+        if isinstance(code, tuple):
+            result = self.engine.translate_multi(text, code, beam, model)
+            metrics.observe("translate_seconds", time.time() - t)
+            metrics.inc("jobs_total")
+            return result
+        if isinstance(text, tuple):
+            result = self._execute_segments(job, list(text), code, beam, model)
+            metrics.observe("translate_seconds", time.time() - t)
+            metrics.inc("jobs_total")
+            return result
+        done, first = [], None
+        stream = self.engine.translate_stream(text, code, beam, partial=job.stream, model=model)
+        try:
+            for line, final in stream:
+                # Проверка между батчами: генератор ленивый, следующий батч не начнется
+                if job.cancelled.is_set(): raise TranslationCancelled()
+                if first is None:
+                    first = time.time() - t
+                    print(f"Первый вывод через {first * 1000:.0f} мс")
+                    metrics.observe("first_output_seconds", first)
+                if final: done.append(line)
+                job.emit(line, final)
+        finally:
+            stream.close()
+        metrics.observe("translate_seconds", time.time() - t)
+        metrics.inc("jobs_total")
+        return "\n".join(done)
+
+    def _execute_segments(self, job, segments, code, beam, model):
+        # Кусками растущего размера, чтобы отмена срабатывала быстро
+        translated, chunk = [], 8
+        while len(translated) < len(segments):
+            if job.cancelled.is_set(): raise TranslationCancelled()
+            part = segments[len(translated):len(translated) + chunk]
+            translated.extend(self.engine.translate_cached(part, code, beam, model))
+            chunk *= 2
+        return translated
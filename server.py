@@ -0,0 +1,306 @@
+import sys
+import json
+import time
+import argparse
+import threading
+import traceback
+from concurrent.futures import Future
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs
+
+import translator_engine as te
+
+# Локальный HTTP API в стиле LibreTranslate: POST /translate, GET /languages.
+# Запросы из разных программ склеиваются в общий батч на модель.
+# GET /metrics отдает метрики движка в формате Prometheus.
+# Авторизации нет, поэтому браузерам (расширения, веб-страницы) доступ только
+# с источников из настройки server_allowed_origins; клиенты без заголовка
+# Origin (скрипты, CLI) работают как прежде.
+
+DEFAULT_PORT = 5000
+DEFAULT_MAX_WAIT = 0.02
+DEFAULT_MAX_BATCH_TOKENS = 4096
+DEFAULT_MAX_PENDING = 256
+MAX_REQUEST_CHARS = 100000
+# Тело больше этого не читаем вовсе: запас на UTF-8 и экранирование JSON (\uXXXX)
+MAX_REQUEST_BYTES = 8 * MAX_REQUEST_CHARS
+MAX_BEAM = 8
+
+class Overloaded(Exception):
+    pass
+
+def estimate_tokens(text):
+    # Грубая оценка без токенизатора: ~3 символа на токен
+    return len(text) // 3 + 1
+
+class PendingRequest:
+    def __init__(self, texts, code, beam):
+        self.texts, self.code, self.beam = texts, code, beam
+        self.tokens = sum(estimate_tokens(t) for t in texts)
+        self.future = Future()
+        self.submitted = time.time()
+
+class BatchingDispatcher:
+    """Копит запросы max_wait секунд или до бюджета токенов и переводит их одним вызовом"""
+    def __init__(self, engine, max_wait=DEFAULT_MAX_WAIT, max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS, max_pending=DEFAULT_MAX_PENDING):
+        self.engine = engine
+        self.max_wait = max_wait
+        self.max_batch_tokens = max_batch_tokens
+        self.max_pending = max_pending
+        self.queue = []
+        self.cond = threading.Condition()
+        self.batches = 0
+        self.requests = 0
+        self.thread = threading.Thread(target=self._run, name="http-batcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, texts, code, beam=1):
+        req = PendingRequest(texts, code, beam)
+        with self.cond:
+            # Обратное давление: очередь не растет бесконечно
+            if len(self.queue) >= self.max_pending:
+                raise Overloaded(f"очередь переполнена ({self.max_pending})")
+            self.queue.append(req)
+            self.cond.notify()
+        return req.future
+
+    def _collect(self):
+        with self.cond:
+            while not self.queue:
+                self.cond.wait()
+            deadline = time.time() + self.max_wait
+            while True:
+                tokens = sum(r.tokens for r in self.queue)
+                left = deadline - time.time()
+                if tokens >= self.max_batch_tokens or left <= 0: break
+                self.cond.wait(left)
+            # Забираем запросы, пока влезают в бюджет (первый берем всегда)
+            batch, tokens = [], 0
+            while self.queue and (not batch or tokens + self.queue[0].tokens <= self.max_batch_tokens):
+                req = self.queue.pop(0)
+                batch.append(req)
+                tokens += req.tokens
+            return batch
+
+    def _run(self):
+        while True:
+            pool = self.engine.pool
+            # С пулом реплик батч собирается, пока свободной реплики нет: он только крупнее.
+            # Пока реплики загружаются, переводит основная модель
+            if pool and pool.ready(): pool.wait_idle()
+            batch = self._collect()
+            groups = {}
+            for req in batch:
+                try: groups.setdefault((req.code, req.beam), []).append(req)
+                except TypeError as e: req.future.set_exception(e)
+            for (code, beam), reqs in groups.items():
+                # Ошибка одной группы не должна останавливать поток: остальные запросы ждут его
+                try: self._dispatch_group(code, beam, reqs)
+                except Exception as e:
+                    print(traceback.format_exc())
+                    for req in reqs:
+                        if not req.future.done(): req.future.set_exception(e)
+
+    def _dispatch_group(self, code, beam, reqs):
+        pool = self.engine.pool
+        if pool and pool.ready():
+            try:
+                weight = sum(len(t) for req in reqs for t in req.texts)
+                pool.submit(lambda model: self._translate_group(code, beam, reqs, model), weight or 1)
+                return
+            except RuntimeError:
+                pass
+        self._translate_group(code, beam, reqs)
+
+    def _translate_group(self, code, beam, reqs, model=None):
+        # Тексты всех запросов - одним батчем, но каждый размечается сам по себе
+        texts = []
+        now = time.time()
+        for req in reqs:
+            self.engine.metrics.observe("http_queue_wait_seconds", now - req.submitted)
+            texts.extend(req.texts)
+        try:
+            if not self.engine.translator: raise RuntimeError("движок не готов")
+            translated = self.engine.translate_line_groups([t.split('\n') for t in texts], code, beam, model)
+        except Exception as e:
+            print(traceback.format_exc())
+            for req in reqs: req.future.set_exception(e)
+            return
+        with self.cond:
+            self.batches += 1
+            self.requests += len(reqs)
+        pos = 0
+        for req in reqs:
+            req.future.set_result(["\n".join(lines) for lines in translated[pos:pos + len(req.texts)]])
+            pos += len(req.texts)
+
+class TranslateHandler(BaseHTTPRequestHandler):
+    dispatcher = None
+    timeout_sec = 120
+    allowed_origins = ()
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _reply(self, code, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self._cors_headers()
+        for k, v in (headers or {}).items(): self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _params(self, length):
+        raw = self.rfile.read(length).decode('utf-8') if length else ""
+        if "json" in (self.headers.get("Content-Type") or ""):
+            return json.loads(raw or "{}")
+        return {k: (v if len(v) > 1 else v[0]) for k, v in parse_qs(raw).items()}
+
+    def _origin_allowed(self):
+        origin = self.headers.get("Origin")
+        return origin is None or origin in self.allowed_origins
+
+    def _cors_headers(self):
+        origin = self.headers.get("Origin")
+        if origin and origin in self.allowed_origins:
+            self.send_header("Access-Control-Allow-Origin", origin)
+            self.send_header("Vary", "Origin")
+
+    def do_OPTIONS(self):
+        if not self._origin_allowed():
+            return self._reply(403, {"error": "источник не разрешен"})
+        self.send_response(204)
+        self._cors_headers()
+        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.end_headers()
+
+    def _reply_text(self, code, text, content_type):
+        body = text.encode('utf-8')
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if not self._origin_allowed():
+            return self._reply(403, {"error": "источник не разрешен"})
+        path, _, query = self.path.partition("?")
+        if path == "/languages":
+            codes = list(te.LANGUAGES.values())
+            self._reply(200, [{"code": c, "name": n, "targets": codes} for n, c in te.LANGUAGES.items()])
+        elif path == "/metrics":
+            # Prometheus по умолчанию, ?format=json - снимок JSON
+            metrics = self.dispatcher.engine.metrics
+            if parse_qs(query).get("format") == ["json"]:
+                self._reply(200, metrics.snapshot())
+            else:
+                self._reply_text(200, metrics.to_prometheus(), "text/plain; version=0.0.4; charset=utf-8")
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        # Простой POST из чужой страницы браузер отправит и без CORS - отказываем сами
+        if not self._origin_allowed():
+            return self._reply(403, {"error": "источник не разрешен"})
+        if self.path.split("?")[0] != "/translate":
+            return self._reply(404, {"error": "not found"})
+        # Размер проверяем по заголовку, до чтения тела
+        try: length = int(self.headers.get("Content-Length") or 0)
+        except ValueError: length = -1
+        if length < 0:
+            return self._reply(400, {"error": "некорректный Content-Length"})
+        if length > MAX_REQUEST_BYTES:
+            return self._reply(413, {"error": f"тело запроса больше {MAX_REQUEST_BYTES} байт"})
+        try:
+            params = self._params(length)
+        except Exception:
+            return self._reply(400, {"error": "некорректное тело запроса"})
+        if not isinstance(params, dict):
+            return self._reply(400, {"error": "некорректное тело запроса"})
+        q, target = params.get("q"), params.get("target")
+        if q is None or not target:
+            return self._reply(400, {"error": "нужны параметры q и target"})
+        # Повтор поля формы (target=en&target=de) или список в JSON - не язык
+        if not isinstance(target, str) or target not in te.LANGUAGES.values():
+            return self._reply(400, {"error": "неизвестный язык target"})
+        texts = q if isinstance(q, list) else [q]
+        if not all(isinstance(t, str) for t in texts):
+            return self._reply(400, {"error": "q - строка или список строк"})
+        if sum(len(t) for t in texts) > MAX_REQUEST_CHARS:
+            return self._reply(413, {"error": f"текст длиннее {MAX_REQUEST_CHARS} символов"})
+        beam = params.get("beam", 1)
+        try:
+            if isinstance(beam, bool) or not isinstance(beam, (int, str)): raise ValueError
+            beam = int(beam)
+            if not 0 <= beam <= MAX_BEAM: raise ValueError
+        except ValueError:
+            return self._reply(400, {"error": f"beam - целое от 0 до {MAX_BEAM}"})
+        try:
+            future = self.dispatcher.submit(texts, target, beam)
+            result = future.result(self.timeout_sec)
+        except Overloaded as e:
+            return self._reply(429, {"error": str(e)}, {"Retry-After": "1"})
+        except Exception as e:
+            return self._reply(500, {"error": str(e)})
+        self._reply(200, {"translatedText": result if isinstance(q, list) else result[0]})
+
+class LocalHTTPServer(ThreadingHTTPServer):
+    # Стандартной очереди из 5 соединений мало для пачки одновременных клиентов
+    request_queue_size = 128
+    daemon_threads = True
+
+class TranslationServer:
+    """HTTP-сервер в фоновом потоке поверх уже загруженного движка"""
+    def __init__(self, engine, host="127.0.0.1", port=DEFAULT_PORT, allowed_origins=(), **batch_options):
+        self.dispatcher = BatchingDispatcher(engine, **batch_options)
+        handler = type("Handler", (TranslateHandler,), {"dispatcher": self.dispatcher,
+                                                         "allowed_origins": frozenset(allowed_origins)})
+        self.httpd = LocalHTTPServer((host, port), handler)
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="http-server", daemon=True)
+        self.thread.start()
+        print(f"HTTP API: http://127.0.0.1:{self.port}/translate")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Локальный HTTP-сервер перевода (LibreTranslate-совместимый /translate)")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--model", help="папка с моделью (по умолчанию из settings.json)")
+    ap.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT * 1000)
+    ap.add_argument("--max-batch-tokens", type=int, default=DEFAULT_MAX_BATCH_TOKENS)
+    ap.add_argument("--max-pending", type=int, default=DEFAULT_MAX_PENDING)
+    ap.add_argument("--allow-origin", action="append", default=[],
+                    help="источник браузера с доступом к API (chrome-extension://..., http://localhost:3000)")
+    args = ap.parse_args(argv)
+
+    config = te.ConfigManager.load()
+    te.engine.configure(config)
+    ok, msg = te.engine.load(args.model or config.get("model_path", ""))
+    if not ok:
+        print(f"Модель не загружена: {msg}")
+        return 1
+    origins = config.get("server_allowed_origins", []) + args.allow_origin
+    server = TranslationServer(te.engine, port=args.port, allowed_origins=origins, max_wait=args.max_wait_ms / 1000,
+                               max_batch_tokens=args.max_batch_tokens, max_pending=args.max_pending)
+    server.start()
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
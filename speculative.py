@@ -0,0 +1,109 @@
+import time
+import threading
+from collections import OrderedDict
+
+import markup
+from logger import log_debug
+from scheduler import PRIORITY_BACKGROUND
+
+# Перевод скопированного заранее. При смене буфера обмена короткий текст
+# уходит в очередь с низшим приоритетом; если потом на нем нажали Alt+1,
+# перевод уже готов (или уже идет) и вставка не ждет модель. Частые и
+# большие копирования пропускаются, чтобы фоновая работа не занимала CPU.
+# В буфере бывают пароли и личный текст: перевод заранее не пишется ни в
+# кэш, ни в память переводов на диске, текст живет только в памяти процесса.
+
+SPECULATIVE_GROUP = "speculative"
+DEFAULT_MAX_CHARS = 400
+DEFAULT_PER_MINUTE = 20
+# Пауза после последней смены буфера: серия копирований дает один перевод
+DEBOUNCE = 0.3
+STORE_ENTRIES = 64
+
+def usable(future):
+    """Догадка не отменена и не упала (может быть еще в работе)"""
+    if not future or future.cancelled(): return False
+    return not future.done() or future.exception() is None
+
+class SpeculativeTranslator:
+    """Фоновый перевод буфера обмена для Alt+1; готовые Future по (текст, язык)"""
+    def __init__(self, pipeline, max_chars=DEFAULT_MAX_CHARS, per_minute=DEFAULT_PER_MINUTE):
+        self.pipeline = pipeline
+        self.engine, self.scheduler, self.backend = pipeline.engine, pipeline.scheduler, pipeline.backend
+        self.enabled = False
+        self.max_chars = max_chars
+        self.per_minute = per_minute
+        self.cond = threading.Condition()
+        self.changed = 0.0
+        self.started = []
+        self.store = OrderedDict()
+        # Свои вставки (перевод в буфере после Alt+1) заново не переводим
+        self.pasted = None
+        self.thread = None
+
+    def configure(self, config):
+        self.enabled = bool(config.get("speculative_mode", False))
+        self.max_chars = int(config.get("speculative_max_chars", DEFAULT_MAX_CHARS))
+        self.per_minute = int(config.get("speculative_per_minute", DEFAULT_PER_MINUTE))
+        if not self.enabled:
+            self.scheduler.cancel_group(SPECULATIVE_GROUP)
+            with self.cond: self.store.clear()
+
+    def clipboard_changed(self):
+        if not self.enabled: return
+        with self.cond:
+            self.changed = time.perf_counter()
+            self.cond.notify_all()
+        if not (self.thread and self.thread.is_alive()):
+            self.thread = threading.Thread(target=self._run, name="speculative", daemon=True)
+            self.thread.start()
+
+    def ignore(self, text):
+        with self.cond: self.pasted = text
+
+    def _run(self):
+        self.backend.thread_init()
+        while True:
+            with self.cond:
+                while not self.changed: self.cond.wait()
+                # Ждем, пока буфер перестанет меняться
+                while time.perf_counter() - self.changed < DEBOUNCE:
+                    self.cond.wait(DEBOUNCE - (time.perf_counter() - self.changed))
+                self.changed = 0.0
+            try: self._speculate(self.backend.get_clipboard() or "")
+            except Exception as e: log_debug("Перевод буфера заранее не удался: %s", e)
+
+    def _speculate(self, text):
+        metrics = self.engine.metrics
+        if not self.enabled or self.pipeline.busy.is_set(): return
+        if not text.strip() or not markup.has_letters(text) or not self.engine.translator: return
+        code = self.pipeline.pick_target(text)
+        with self.cond:
+            if text == self.pasted or usable(self.store.get((text, code))): return
+            now = time.perf_counter()
+            self.started = [t for t in self.started if now - t < 60]
+            skip = len(text) > self.max_chars or len(self.started) >= self.per_minute
+            if not skip: self.started.append(now)
+        if skip:
+            metrics.inc("speculative_skipped_total")
+            return
+        # Выгруженную при простое модель ради догадки не будим
+        residency = getattr(self.engine, "residency", None)
+        if residency and not residency.is_ready(self.engine.model): return
+        # Новая догадка отменяет прежнюю, если та еще в очереди
+        future = self.scheduler.submit(text, code, 1, PRIORITY_BACKGROUND, SPECULATIVE_GROUP, persist=False)
+        metrics.inc("speculative_jobs_total")
+        log_debug("Буфер переводится заранее: %d симв. -> %s", len(text), code)
+        with self.cond:
+            self.store[(text, code)] = future
+            while len(self.store) > STORE_ENTRIES: self.store.popitem(last=False)
+
+    def lookup(self, text, code):
+        """Готовый перевод для Alt+1 или None; незаконченный подхватит очередь (та же задача)"""
+        metrics = self.engine.metrics
+        with self.cond: future = self.store.get((text, code))
+        if usable(future) and future.done():
+            metrics.inc("speculative_hits_total")
+            return future.result()
+        metrics.inc("speculative_joined_total" if usable(future) else "speculative_misses_total")
+        return None
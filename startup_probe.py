@@ -0,0 +1,88 @@
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+# Замер холодного старта. Бюджет импорта и ленивые импорты проверяет
+# tests/test_startup.py; вручную, с кодом возврата 1 при нарушении бюджета:
+#   python startup_probe.py            - время импорта модулей
+#   python startup_probe.py --gui      - плюс окно показано / модель готова (нужны PySide6 и модель)
+
+ENGINE_MODULES = ["translation_cache", "scheduler", "translator_engine", "cli", "server"]
+HEAVY_MODULES = ["PySide6.QtWidgets", "ctranslate2", "sentencepiece", "huggingface_hub", "global_hotkeys"]
+# Эти модули не должны подтягиваться при импорте движка
+LAZY_MODULES = ["PySide6", "ctranslate2", "sentencepiece", "huggingface_hub"]
+HERE = os.path.dirname(os.path.abspath(__file__))
+ENGINE_BUDGET_MS = 150
+
+def import_time(module):
+    """Суммарное время импорта модуля в свежем интерпретаторе по -X importtime, мс"""
+    r = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                       cwd=HERE, capture_output=True, text=True)
+    if r.returncode != 0: return None
+    total = 0
+    for line in r.stderr.splitlines():
+        m = re.match(r'import time:\s+\d+\s+\|\s+(\d+)\s+\|(\s*)(\S+)', line)
+        # Верхний уровень вложенности - модули, импортированные напрямую из -c
+        if m and len(m.group(2)) == 1: total += int(m.group(1))
+    return total / 1000
+
+def leaked_modules(module):
+    """Тяжелые модули, подтянутые импортом module; None - module не импортируется"""
+    code = f"import sys, {module}; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    r = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True)
+    if r.returncode != 0: return None
+    return [m for m in r.stdout.strip().split(",") if m]
+
+def gui_startup(timeout):
+    env = dict(os.environ, NT_STARTUP_PROBE="1")
+    try:
+        r = subprocess.run([sys.executable, "main.py"], cwd=HERE, env=env, capture_output=True,
+                           text=True, encoding="utf-8", errors="replace", timeout=timeout)
+        out = r.stdout
+    except subprocess.TimeoutExpired as e:
+        out = (e.stdout or b"").decode("utf-8", "replace") if isinstance(e.stdout, bytes) else (e.stdout or "")
+    window = re.search(r'STARTUP: окно показано через ([\d.]+)', out)
+    model = re.search(r'STARTUP: модель готова через ([\d.]+)', out)
+    return (float(window.group(1)) if window else None), (float(model.group(1)) if model else None)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Замер времени старта")
+    ap.add_argument("--gui", action="store_true", help="запустить main.py и замерить окно/модель")
+    ap.add_argument("--engine-budget-ms", type=float, default=ENGINE_BUDGET_MS, help="бюджет на импорт translator_engine")
+    ap.add_argument("--window-budget", type=float, default=3.0, help="бюджет до показа окна, сек")
+    ap.add_argument("--timeout", type=float, default=300)
+    args = ap.parse_args(argv)
+    failed = False
+
+    print("Время импорта (свежий процесс):")
+    for module in ENGINE_MODULES + HEAVY_MODULES:
+        ms = import_time(module)
+        print(f"  {module:20s} {'нет модуля' if ms is None else f'{ms:8.1f} мс'}")
+        if module == "translator_engine" and ms is not None and ms > args.engine_budget_ms:
+            print(f"  ! импорт движка дольше бюджета {args.engine_budget_ms} мс")
+            failed = True
+
+    for module in ENGINE_MODULES:
+        leaked = leaked_modules(module)
+        if leaked is None:
+            print(f"  ! {module} не импортируется")
+            failed = True
+        elif leaked:
+            print(f"  ! {module} тянет при импорте: {', '.join(leaked)}")
+            failed = True
+
+    if args.gui:
+        window, model = gui_startup(args.timeout)
+        print(f"Окно показано через: {window if window is not None else '-'} сек")
+        print(f"Модель готова через: {model if model is not None else '-'} сек")
+        if window is None or window > args.window_budget:
+            print(f"  ! окно не показано за {args.window_budget} сек")
+            failed = True
+
+    print("FAIL" if failed else "OK")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+import re
+import time
+import zlib
+
+# Заглушки с тем же интерфейсом, что у sentencepiece и ctranslate2.Translator.
+# Нужны для бенчмарков и проверок без 3B модели на диске.
+
+LANG_TAG_RE = re.compile(r"<2\w+>")
+# Служебные токены: теги MADLAD, коды языков NLLB (rus_Cyrl) и конец строки
+SPECIAL_RE = re.compile(r"<2\w+>|[a-z]{3}_[A-Z][a-z]{3}|</s>")
+
+class StubTokenizer:
+    """Токенизатор по пробелам в стиле SentencePiece (▁ в начале слова)"""
+    def encode(self, text, out_type=str):
+        if isinstance(text, list):
+            return [self.encode(t) for t in text]
+        # Теги языка <2xx> в MADLAD - отдельные пользовательские токены
+        return [w if LANG_TAG_RE.fullmatch(w) else "▁" + w for w in text.split()]
+
+    def encode_as_pieces(self, text):
+        return self.encode(text)
+
+    def decode(self, pieces):
+        if pieces and isinstance(pieces[0], list):
+            return [self.decode(p) for p in pieces]
+        if not pieces: return ""
+        return "".join(pieces).replace("▁", " ").strip()
+
+class StubResult:
+    def __init__(self, hypotheses, scores):
+        self.hypotheses = hypotheses
+        self.scores = scores
+
+class StubStep:
+    def __init__(self, step, token, is_last):
+        self.step, self.token, self.is_last = step, token, is_last
+
+class StubTranslator:
+    """Детерминированный 'переводчик': переворачивает слова (слова с цифрами копирует).
+
+    Стоимость вызова моделируется как у настоящего декодера: фиксированные
+    накладные расходы на вызов + шаги декодирования по самой длинной строке
+    батча (строки внутри батча декодируются параллельно). Внимание на каждом
+    шаге растет с длиной исходной строки.
+
+    open_cost - создание переводчика с нуля, load_cost - load_model() после
+    unload_model(), cold_cost - первый вызов после загрузки (страницы весов,
+    аллокатор).
+
+    vocab_cost - выходной слой по всему словарю на шаге; с use_vmap
+    оценивается только доля vmap_ratio словаря.
+
+    hard_ratio - доля "трудных" слов: жадный поиск их не переворачивает
+    (ошибка) и дает им низкую вероятность, луч от 2 переводит верно.
+    runaway_ratio - доля сегментов, на которых жадный поиск зацикливается
+    и повторяет последний токен до max_decoding_length.
+    row_cost - на CPU каждая строка батча (и каждый луч) считается на
+    каждом своем шаге отдельно: батч дешевле вызовов по строке, но не бесплатен.
+    """
+    def __init__(self, call_overhead=0.0, step_cost=0.0, token_cost=0.0, attn_cost=0.0,
+                 open_cost=0.0, load_cost=0.0, cold_cost=0.0, vocab_cost=0.0, vmap_ratio=1.0,
+                 hard_ratio=0.0, runaway_ratio=0.0, row_cost=0.0):
+        self.call_overhead = call_overhead
+        self.step_cost = step_cost
+        self.token_cost = token_cost
+        self.attn_cost = attn_cost
+        self.load_cost = load_cost
+        self.cold_cost = cold_cost
+        self.vocab_cost = vocab_cost
+        self.vmap_ratio = vmap_ratio
+        self.hard_ratio = hard_ratio
+        self.runaway_ratio = runaway_ratio
+        self.row_cost = row_cost
+        self.calls = 0
+        self.examples = 0
+        self.model_is_loaded = True
+        self.cold = True
+        if open_cost > 0: time.sleep(open_cost)
+
+    def unload_model(self, to_cpu=False):
+        self.model_is_loaded = False
+
+    def load_model(self, keep_cache=False):
+        if self.load_cost > 0: time.sleep(self.load_cost)
+        self.model_is_loaded = True
+        self.cold = True
+
+    def _first_call(self):
+        if not self.model_is_loaded: raise RuntimeError("The model is unloaded")
+        if self.cold:
+            self.cold = False
+            return self.cold_cost
+        return 0.0
+
+    @staticmethod
+    def _share(text, ratio):
+        return ratio > 0 and zlib.crc32(text.encode('utf-8')) % 1000 < ratio * 1000
+
+    def _translate_one(self, tokens, prefix=None, beam_size=1, max_decoding_length=256):
+        """(токены перевода, log-prob каждого токена)"""
+        # Отбрасываем служебные токены, префикс цели (NLLB) попадает в гипотезу как есть
+        words = [t for t in tokens if not SPECIAL_RE.fullmatch(t)]
+        out, probs = list(prefix or []), [0.0] * len(prefix or [])
+        for w in words:
+            w = w.lstrip("▁")
+            # Числа, ссылки и идентификаторы настоящая модель копирует как есть
+            if any(c.isdigit() for c in w): out.append("▁" + w)
+            elif beam_size < 2 and self._share(w, self.hard_ratio):
+                out.append("▁" + w)
+                probs.append(-3.0)
+                continue
+            else: out.append("▁" + w[::-1])
+            probs.append(-0.05)
+        if beam_size < 2 and out and self._share(" ".join(tokens), self.runaway_ratio):
+            while len(out) < max_decoding_length:
+                out.append(out[-1])
+                probs.append(-0.2)
+        return out[:max_decoding_length], probs[:max_decoding_length]
+
+    def _step_cost(self, src_len, use_vmap):
+        return self.step_cost + self.attn_cost * src_len + self.vocab_cost * (self.vmap_ratio if use_vmap else 1.0)
+
+    def translate_batch(self, source, beam_size=1, max_decoding_length=256, return_scores=False, target_prefix=None,
+                        use_vmap=False, **kwargs):
+        cold = self._first_call()
+        self.calls += 1
+        self.examples += len(source)
+        prefixes = target_prefix or [None] * len(source)
+        decoded = [self._translate_one(s, p, beam_size, max_decoding_length) for s, p in zip(source, prefixes)]
+        out = [o for o, _ in decoded]
+        steps = max((len(o) for o in out), default=0)
+        src_len = max((len(s) for s in source), default=0)
+        cost = cold + self.call_overhead + self._step_cost(src_len, use_vmap) * steps * beam_size
+        # Законченные строки выходят из батча: каждая платит только за свои шаги
+        cost += self.row_cost * sum(len(o) for o in out) * beam_size
+        cost += self.token_cost * sum(len(s) for s in source)
+        if cost > 0: time.sleep(cost)
+        normalize = kwargs.get("normalize_scores", False)
+        return [StubResult([o], [sum(p) / max(len(p), 1) if normalize else sum(p)]) for o, p in decoded]
+
+    def generate_tokens(self, source, target_prefix=None, max_decoding_length=256, use_vmap=False, **kwargs):
+        """Пошаговая жадная генерация, как Translator.generate_tokens"""
+        cold = self._first_call()
+        self.calls += 1
+        self.examples += 1
+        out, _ = self._translate_one(source, target_prefix, 1, max_decoding_length)
+        if cold + self.call_overhead > 0: time.sleep(cold + self.call_overhead)
+        step_cost = self._step_cost(len(source), use_vmap)
+        for i, token in enumerate(out):
+            if step_cost > 0: time.sleep(step_cost)
+            yield StubStep(i, token, i == len(out) - 1)
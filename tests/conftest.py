@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import translator_engine as te
+from stub_backend import StubTokenizer, StubTranslator
+
+@pytest.fixture
+def engine():
+    """Движок на заглушке без кэша и памяти переводов на диске"""
+    e = te.TranslatorEngine()
+    e.attach(StubTranslator(), StubTokenizer())
+    yield e
+    e.stop_pool()
@@ -0,0 +1,13 @@
+from cli import BatchRunner
+
+def test_open_fence_does_not_leak_into_next_file(engine, tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "a.md").write_text("Intro text\n```py\n", encoding='utf-8')
+    (src / "b.md").write_text("Some doc here\n```\nMore text\n", encoding='utf-8')
+    files = [(str(src / name), name) for name in ("a.md", "b.md")]
+    out = tmp_path / "out"
+    out.mkdir()
+    BatchRunner(engine, files, str(out), "ru", 1, chunk_lines=100, batch_lines=100, resume=False).run()
+    assert (out / "a.md").read_text(encoding='utf-8') == "ortnI txet\n```py\n"
+    assert (out / "b.md").read_text(encoding='utf-8') == "emoS cod ereh\n```\neroM txet\n"
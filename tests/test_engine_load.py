@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+
+@pytest.fixture
+def loads(engine, monkeypatch):
+    """Заменяет engine.load: считает вызовы, результат и момент завершения задает тест"""
+    calls = []
+    gate = threading.Event()
+    gate.set()
+    result = [(True, "Готово")]
+    def load(path, name=None):
+        calls.append(path)
+        gate.wait(5)
+        return result[0]
+    monkeypatch.setattr(engine, "load", load)
+    return calls, gate, result
+
+def test_running_load_is_shared(engine, loads):
+    calls, gate, _ = loads
+    gate.clear()
+    first = engine.load_async("model")
+    assert engine.load_async("model") is first
+    assert engine.load_async("model", force=True) is first
+    gate.set()
+    assert first.result(5) == (True, "Готово")
+    assert calls == ["model"]
+
+def test_loaded_model_is_reused_without_force(engine, loads):
+    calls, _, _ = loads
+    first = engine.load_async("model")
+    first.result(5)
+    assert engine.load_async("model") is first
+    assert calls == ["model"]
+
+def test_force_reloads_loaded_model(engine, loads):
+    calls, _, _ = loads
+    first = engine.load_async("model")
+    first.result(5)
+    second = engine.load_async("model", force=True)
+    assert second is not first
+    assert second.result(5) == (True, "Готово")
+    assert calls == ["model", "model"]
+
+def test_failed_load_can_be_retried(engine, loads):
+    calls, _, result = loads
+    result[0] = (False, "Файлы не найдены!")
+    first = engine.load_async("model")
+    assert first.result(5)[0] is False
+    result[0] = (True, "Готово")
+    assert engine.load_async("model").result(5) == (True, "Готово")
+    assert calls == ["model", "model"]
@@ -0,0 +1,61 @@
+import threading
+
+from engine_pool import plan_cores
+from scheduler import TranslationScheduler
+from stub_backend import StubTranslator
+
+def test_plan_cores():
+    assert plan_cores(0, 0, list(range(16))) == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9, 10, 11], [12, 13, 14, 15]]
+    assert plan_cores(3, 0, list(range(16))) == [list(range(0, 5)), list(range(5, 10)), list(range(10, 15))]
+    assert plan_cores(8, 4, list(range(8))) == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    assert plan_cores(0, 0, [0, 1]) == [[0, 1]]
+
+def start(engine, replicas):
+    pool = engine.start_pool(replicas, 1, lambda model, threads: StubTranslator(), pin=False, cores=list(range(replicas)))
+    for r in pool.replicas:
+        while not r.ready: pool.wait_idle(0.01)
+    return pool
+
+def test_pool_matches_single_engine(engine):
+    texts = [f"Line number {i} of the document" for i in range(20)]
+    expected = [engine.translate(t, "ru") for t in texts]
+    pool = start(engine, 3)
+    assert [f.result(5) for f in [pool.translate(t, "ru") for t in texts]] == expected
+    assert sum(r.done for r in pool.replicas) == len(texts)
+    assert all(r.model.name.endswith(f"#{r.index}") for r in pool.replicas)
+
+def test_least_loaded_replica_gets_work(engine):
+    pool = start(engine, 2)
+    gate = threading.Event()
+    busy = pool.submit(lambda model: gate.wait(5), 100)
+    other = pool.submit(lambda model: model.name, 1)
+    assert other.result(5).endswith("#1")
+    gate.set()
+    busy.result(5)
+
+def test_scheduler_uses_pool_and_falls_back(engine):
+    scheduler = TranslationScheduler(engine)
+    start(engine, 2)
+    assert scheduler.submit("hello world", "ru").result(5) == "olleh dlrow"
+    engine.stop_pool()
+    assert scheduler.submit("good morning", "ru").result(5) == "doog gninrom"
+
+def test_primary_serves_while_replicas_load(engine):
+    scheduler = TranslationScheduler(engine)
+    gate = threading.Event()
+    def slow_factory(model, threads):
+        gate.wait(10)
+        return StubTranslator()
+    pool = engine.start_pool(2, 1, slow_factory, pin=False, cores=[0, 1])
+    try:
+        assert not pool.ready()
+        assert scheduler.submit("hello world", "ru").result(2) == "olleh dlrow"
+        assert sum(r.done for r in pool.replicas) == 0
+    finally:
+        gate.set()
+
+def test_no_pool_when_replica_does_not_fit_budget(engine):
+    engine.model.size = 600 * 2 ** 20
+    engine.ram_budget_mb = 1000
+    assert engine.start_pool(2, 1, lambda model, threads: StubTranslator(), pin=False, cores=[0, 1]) is None
+    assert engine.pool is None
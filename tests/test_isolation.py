@@ -0,0 +1,56 @@
+import pytest
+
+import benchmark
+import translator_engine as te
+from stub_backend import StubTokenizer, StubTranslator
+from translation_cache import TranslationCache
+from translation_memory import TranslationMemory
+
+def make_engine(translator, fingerprint, cache=None, tm=None):
+    e = te.TranslatorEngine()
+    e.attach(translator, StubTokenizer(), fingerprint)
+    e.cache, e.tm = cache, tm
+    return e
+
+def calls_for(engine, *args):
+    before = engine.translator.calls
+    engine.translate(*args)
+    return engine.translator.calls - before
+
+@pytest.fixture
+def cache(tmp_path):
+    return TranslationCache(str(tmp_path / "cache.sqlite3"))
+
+@pytest.fixture
+def tm(tmp_path):
+    return TranslationMemory(str(tmp_path / "tm.sqlite3"))
+
+def test_cache_separates_target_beam_and_model(cache):
+    translator = StubTranslator()
+    engine = make_engine(translator, "model-a", cache=cache)
+    assert calls_for(engine, "Open the settings file", "ru") == 1
+    assert calls_for(engine, "Open the settings file", "ru") == 0
+    assert calls_for(engine, "Open the settings file", "de") == 1
+    assert calls_for(engine, "Open the settings file", "ru", 4) == 1
+    other = make_engine(translator, "model-b", cache=cache)
+    assert calls_for(other, "Open the settings file", "ru") == 1
+
+def test_memory_separates_target_and_model(tm):
+    translator = StubTranslator()
+    engine = make_engine(translator, "model-a", tm=tm)
+    # 1002, 1003 и 1004 - одна форма множественного числа в русском
+    assert calls_for(engine, "Your order 1002 has shipped", "ru") == 1
+    assert calls_for(engine, "Your order 1003 has shipped", "ru") == 0
+    assert calls_for(engine, "Your order 1003 has shipped", "de") == 1
+    other = make_engine(translator, "model-b", tm=tm)
+    assert calls_for(other, "Your order 1004 has shipped", "ru") == 1
+
+def test_bench_tm_leaves_engine_untouched(engine, tm):
+    engine.tm = tm
+    fingerprint = engine.fingerprint
+    benchmark.bench_tm(engine, 20, "ru", 1, 100)
+    assert engine.tm is tm and engine.cache is None
+    assert engine.fingerprint == fingerprint
+    # Следующий набор переводит моделью, а не из памяти бенчмарка
+    engine.tm = None
+    assert calls_for(engine, benchmark.tm_corpus(1)[0], "ru") == 1
@@ -0,0 +1,25 @@
+import pytest
+
+import lang_detect
+
+def model_calls(engine, text, code):
+    before = engine.translator.calls
+    engine.translate(text, code)
+    return engine.translator.calls - before
+
+@pytest.mark.parametrize("text", ["Дякую", "Добрий день, друже"])
+def test_ukrainian_without_features_is_translated_to_ru(engine, text):
+    assert lang_detect.detect(text) == "ru"
+    assert model_calls(engine, text, "ru") == 1
+
+def test_russian_is_not_translated_to_ru(engine):
+    assert model_calls(engine, "Спасибо, это нужный файл", "ru") == 0
+
+@pytest.mark.parametrize("text, code", [
+    ("Перевірте, будь ласка, цей файл", "uk"),
+    ("Please open the settings file", "en"),
+    ("Bitte die Datei jetzt speichern", "de"),
+    ("打开设置文件", "zh"),
+])
+def test_detect(text, code):
+    assert lang_detect.detect(text) == code
@@ -0,0 +1,42 @@
+import threading
+
+import pytest
+
+from live_translation import LiveSession
+from scheduler import TranslationCancelled, TranslationScheduler
+
+@pytest.fixture
+def session(engine):
+    return LiveSession(engine, TranslationScheduler(engine))
+
+def test_segmentation_runs_off_the_calling_thread(engine, session, monkeypatch):
+    threads = []
+    segment_lines = engine.segment_lines
+    def record(lines, model=None):
+        threads.append(threading.current_thread())
+        return segment_lines(lines, model)
+    monkeypatch.setattr(engine, "segment_lines", record)
+    text, _ = session.update("Hello world. Second one.", "ru").result(5)
+    assert text == "olleH .dlrow dnoceS .eno"
+    assert threads and threading.current_thread() not in threads
+
+def test_only_changed_segments_are_translated(engine, session):
+    session.update("Hello world. Second one.", "ru").result(5)
+    calls = engine.translator.calls
+    text, _ = session.update("Hello world. Third one.", "ru").result(5)
+    assert text == "olleH .dlrow drihT .eno"
+    assert engine.translator.calls == calls + 1
+
+def test_stale_update_is_dropped(engine, session, monkeypatch):
+    gate = threading.Event()
+    pick_model = engine.pick_model
+    def slow(n):
+        gate.wait(5)
+        return pick_model(n)
+    monkeypatch.setattr(engine, "pick_model", slow)
+    first = session.update("First text.", "ru")
+    second = session.update("Second text.", "ru")
+    gate.set()
+    assert second.result(5)[0] == "dnoceS .txet"
+    with pytest.raises(TranslationCancelled):
+        first.result(5)
@@ -0,0 +1,40 @@
+import pytest
+
+import markup
+
+@pytest.mark.parametrize("line, kept", [
+    ("Run `pip install -e .` first", ["`pip install -e .`"]),
+    ("See [the docs](https://example.com/docs) for more", ["[", "](https://example.com/docs)"]),
+    ("Hello, {name}! You have %d messages", ["{name}", "%d"]),
+    ("Edit src/main.py and /etc/hosts", ["src/main.py", "/etc/hosts"]),
+    ("Press <kbd>Ctrl+C</kbd> to copy", ["<kbd>Ctrl+C</kbd>"]),
+])
+def test_split_line_keeps_markup(line, kept):
+    spans = markup.split_line(line)
+    assert "".join(chunk for _, chunk in spans) == line
+    for chunk in kept: assert (False, chunk) in spans
+
+def test_percent_in_prose_is_translated():
+    assert markup.split_line("I am 100% sure") == [(True, "I am 100% sure")]
+
+def test_fenced_block_and_traceback_are_protected():
+    lines = [
+        "Install it:",
+        "```py",
+        "print('hi')",
+        "```",
+        "Then it fails:",
+        "Traceback (most recent call last):",
+        '  File "app.py", line 3, in <module>',
+        "ValueError: bad value",
+        "Fix the value.",
+    ]
+    assert markup.protected_lines(lines) == {1, 2, 3, 5, 6, 7}
+
+def test_unclosed_fence_protects_only_its_line():
+    lines = ["```", "Plain text after a cut paste", "  at com.example.Main.run(Main.java:10)"]
+    assert markup.protected_lines(lines) == {0, 2}
+
+def test_engine_keeps_markup_verbatim(engine):
+    text = "Open `config.yaml` and visit https://example.com today"
+    assert engine.translate(text, "ru") == "nepO `config.yaml` dna tisiv https://example.com yadot"
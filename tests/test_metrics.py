@@ -0,0 +1,14 @@
+import translator_engine as te
+from stub_backend import StubTokenizer, StubTranslator
+from translation_cache import TranslationCache
+
+def test_cache_hits_and_misses(tmp_path):
+    engine = te.TranslatorEngine()
+    engine.attach(StubTranslator(), StubTokenizer(), "stub")
+    engine.cache = TranslationCache(str(tmp_path / "cache.sqlite3"))
+    engine.translate("Open the file. Close the window.", "ru")
+    engine.translate("Open the file. Save the draft.", "ru")
+    counters = engine.metrics.snapshot()["counters"]
+    assert counters["cache_misses_total"] == 3
+    assert counters["cache_hits_total"] == 1
+    assert "попаданий 1, промахов 3 (25% попаданий)" in engine.metrics.summary()
@@ -0,0 +1,36 @@
+import json
+import os
+
+import pytest
+
+from model_download import DirMirror, DownloadError, Downloader, write_manifest
+
+def make_mirror(root, files, names=None):
+    """Папка-зеркало repo/ с файлами и manifest.json; names подменяет имена в манифесте"""
+    repo = root / "repo"
+    repo.mkdir()
+    for name, data in files.items(): (repo / name).write_bytes(data)
+    write_manifest(str(repo))
+    if names:
+        path = repo / "manifest.json"
+        manifest = json.loads(path.read_text(encoding='utf-8'))
+        for entry in manifest["files"]: entry["name"] = names.get(entry["name"], entry["name"])
+        path.write_text(json.dumps(manifest), encoding='utf-8')
+    return DirMirror(str(root), "org/repo")
+
+def test_empty_file_is_downloaded(tmp_path):
+    source = make_mirror(tmp_path, {"empty.txt": b"", "model.bin": b"x" * 1000})
+    target = tmp_path / "model"
+    Downloader(source, str(target), chunk_size=256).run()
+    assert (target / "empty.txt").read_bytes() == b""
+    assert (target / "model.bin").read_bytes() == b"x" * 1000
+    assert sorted(os.listdir(target)) == ["empty.txt", "model.bin"]
+
+@pytest.mark.parametrize("name", ["../evil.bin", "sub/../../evil.bin", "/tmp/evil.bin", "..\\evil.bin", "C:evil.bin"])
+def test_unsafe_manifest_name_is_rejected(tmp_path, name):
+    source = make_mirror(tmp_path, {"model.bin": b"data"}, names={"model.bin": name})
+    target = tmp_path / "model"
+    with pytest.raises(DownloadError):
+        Downloader(source, str(target)).run()
+    assert not (tmp_path / "evil.bin").exists()
+    assert not target.exists() or not os.listdir(target)
@@ -0,0 +1,99 @@
+import json
+import http.client
+from urllib.parse import urlencode
+
+import pytest
+
+from server import MAX_REQUEST_BYTES, TranslationServer
+
+@pytest.fixture
+def server(engine):
+    s = TranslationServer(engine, port=0, max_wait=0.001, allowed_origins=["chrome-extension://abc"]).start()
+    yield s
+    s.stop()
+
+def request(server, method, body=None, content_type="application/json", origin=None):
+    conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+    headers = {"Content-Type": content_type}
+    if origin: headers["Origin"] = origin
+    if body is not None and not isinstance(body, str): body = json.dumps(body)
+    conn.request(method, "/translate", body.encode('utf-8') if body is not None else None, headers)
+    r = conn.getresponse()
+    data = json.loads(r.read() or b"null")
+    conn.close()
+    return r.status, data, r.getheader("Access-Control-Allow-Origin")
+
+def post(server, body, content_type="application/json"):
+    return request(server, "POST", body, content_type)[:2]
+
+def test_translate(server):
+    status, data = post(server, {"q": "hello world", "target": "ru"})
+    assert status == 200
+    assert data["translatedText"] == "olleh dlrow"
+
+@pytest.mark.parametrize("body", [
+    {"q": "hello", "target": ["en", "de"]},
+    {"q": "hello", "target": "xx"},
+    {"q": 5, "target": "ru"},
+    {"q": [1, 2], "target": "ru"},
+    {"q": "hello", "target": "ru", "beam": [1]},
+    {"q": "hello", "target": "ru", "beam": "two"},
+    {"q": "hello", "target": "ru", "beam": -1},
+    {"q": "hello", "target": "ru", "beam": 1000000},
+    ["hello", "ru"],
+])
+def test_bad_json_is_400(server, body):
+    assert post(server, body)[0] == 400
+    # Сервер после плохого запроса продолжает работать
+    assert post(server, {"q": "ok", "target": "ru"}) == (200, {"translatedText": "ko"})
+
+def test_repeated_form_field_is_400(server):
+    body = urlencode([("q", "hello"), ("target", "en"), ("target", "de")])
+    assert post(server, body, "application/x-www-form-urlencoded")[0] == 400
+    body = urlencode([("q", "hello"), ("target", "en")])
+    assert post(server, body, "application/x-www-form-urlencoded") == (200, {"translatedText": "olleh"})
+
+@pytest.mark.parametrize("length, status", [(MAX_REQUEST_BYTES + 1, 413), (-5, 400), ("abc", 400)])
+def test_content_length_checked_before_reading(server, length, status):
+    # Тело не отправляем: ответ должен прийти по одному заголовку
+    conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+    conn.putrequest("POST", "/translate")
+    conn.putheader("Content-Type", "application/json")
+    conn.putheader("Content-Length", str(length))
+    conn.endheaders()
+    r = conn.getresponse()
+    r.read()
+    conn.close()
+    assert r.status == status
+
+def test_dispatcher_survives_bad_group(server):
+    dispatcher = server.dispatcher
+    bad = dispatcher.submit(["hello"], ["en"], 1)
+    with pytest.raises(TypeError):
+        bad.result(5)
+    broken = dispatcher.submit(["hello"], "ru", object())
+    with pytest.raises(Exception):
+        broken.result(5)
+    assert dispatcher.submit(["hello"], "ru", 1).result(5) == ["olleh"]
+
+def test_foreign_origin_is_rejected(server):
+    status, _, allow = request(server, "POST", {"q": "hello", "target": "ru"}, origin="https://evil.example")
+    assert (status, allow) == (403, None)
+    assert request(server, "OPTIONS", origin="https://evil.example")[0] == 403
+
+def test_allowed_origin_gets_cors(server):
+    origin = "chrome-extension://abc"
+    assert request(server, "POST", {"q": "hello", "target": "ru"}, origin=origin) == (200, {"translatedText": "olleh"}, origin)
+    assert request(server, "OPTIONS", origin=origin)[::2] == (204, origin)
+    # Клиент без Origin (скрипт, CLI) заголовок CORS не получает
+    assert request(server, "POST", {"q": "hello", "target": "ru"})[2] is None
+
+def test_open_fence_does_not_leak_into_next_request(engine):
+    from server import BatchingDispatcher
+    dispatcher = BatchingDispatcher(engine, max_wait=0.2)
+    first = dispatcher.submit(["Intro text\n```py"], "ru")
+    # Ограждение второго запроса не должно закрыть блок первого
+    second = dispatcher.submit(["Some doc here\n```\nMore text"], "ru")
+    assert first.result(5) == ["ortnI txet\n```py"]
+    assert second.result(5) == ["emoS cod ereh\n```\neroM txet"]
+    assert dispatcher.batches == 1
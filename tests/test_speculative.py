@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from hotkey_backends import FakeBackend
+from hotkey_pipeline import HotkeyPipeline
+from scheduler import TranslationScheduler
+from speculative import SpeculativeTranslator
+from translation_cache import TranslationCache
+from translation_memory import TranslationMemory
+
+TEXT = "Open the settings file"
+
+@pytest.fixture
+def persisted(engine, tmp_path):
+    engine.attach(engine.translator, engine.sp, "model-a")
+    engine.cache = TranslationCache(str(tmp_path / "cache.sqlite3"))
+    engine.tm = TranslationMemory(str(tmp_path / "tm.sqlite3"))
+    def stored(text, code="ru"):
+        key = TranslationCache.make_key(engine.cache_id(engine.model), code, 1, text)
+        return key in engine.cache.get_many([key]) or engine.tm.count > 0
+    return stored
+
+@pytest.fixture
+def speculative(engine):
+    backend = FakeBackend(TEXT, editable=True, copy_delay=0.01)
+    pipeline = HotkeyPipeline(engine, TranslationScheduler(engine), backend)
+    pipeline.auto_direction, pipeline.target_code = False, "ru"
+    s = SpeculativeTranslator(pipeline)
+    pipeline.speculative = s
+    s.configure({"speculative_mode": True})
+    return s
+
+def wait_store(s, text, code="ru"):
+    deadline = time.time() + 5
+    while (text, code) not in s.store:
+        assert time.time() < deadline, "перевод заранее не запущен"
+        time.sleep(0.01)
+    return s.store[(text, code)].result(5)
+
+def test_private_job_is_not_persisted(engine, persisted):
+    scheduler = TranslationScheduler(engine)
+    assert scheduler.submit(TEXT, "ru", persist=False).result(5) == "nepO eht sgnittes elif"
+    assert not persisted(TEXT)
+    scheduler.submit(TEXT, "ru").result(5)
+    assert persisted(TEXT)
+
+def test_clipboard_is_not_persisted_and_hotkey_hits(engine, persisted, speculative):
+    backend = speculative.backend
+    backend.set_clipboard(TEXT)
+    assert wait_store(speculative, TEXT) == "nepO eht sgnittes elif"
+    assert not persisted(TEXT)
+    calls = engine.translator.calls
+    assert speculative.pipeline.run_action() == "replace"
+    assert backend.pasted == ["nepO eht sgnittes elif"]
+    assert engine.translator.calls == calls
+    assert engine.metrics.snapshot()["counters"]["speculative_hits_total"] == 1
+
+def test_large_copy_is_skipped(engine, speculative):
+    speculative.max_chars = 10
+    speculative.backend.set_clipboard(TEXT)
+    deadline = time.time() + 5
+    while not engine.metrics.snapshot()["counters"]["speculative_skipped_total"]:
+        assert time.time() < deadline
+        time.sleep(0.01)
+    assert not speculative.store
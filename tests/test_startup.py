@@ -0,0 +1,18 @@
+import os
+
+import pytest
+
+import startup_probe
+
+# На медленной машине CI бюджет можно поднять: NT_ENGINE_BUDGET_MS=300
+BUDGET_MS = float(os.environ.get("NT_ENGINE_BUDGET_MS", startup_probe.ENGINE_BUDGET_MS))
+
+def test_engine_import_within_budget():
+    # Лучший из трех прогонов: первый может греть кэш файловой системы
+    times = [startup_probe.import_time("translator_engine") for _ in range(3)]
+    assert None not in times, "translator_engine не импортируется"
+    assert min(times) <= BUDGET_MS
+
+@pytest.mark.parametrize("module", startup_probe.ENGINE_MODULES)
+def test_no_heavy_modules_on_import(module):
+    assert startup_probe.leaked_modules(module) == []
@@ -0,0 +1,121 @@
+import os
+import re
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+CACHE_FILE = "translation_cache.sqlite3"
+DEFAULT_MEMORY_ENTRIES = 4096
+DEFAULT_DISK_ENTRIES = 200000
+
+def model_fingerprint(model_path):
+    """Отпечаток модели: путь + размер и время изменения ее файлов"""
+    h = hashlib.sha1(os.path.realpath(model_path).encode('utf-8'))
+    for name in ("model.bin", "sentencepiece.model", "config.json"):
+        p = os.path.join(model_path, name)
+        if os.path.exists(p):
+            st = os.stat(p)
+            h.update(f"{name}:{st.st_size}:{int(st.st_mtime)}".encode('utf-8'))
+    return h.hexdigest()[:16]
+
+def normalize_segment(text):
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFC', text)).strip()
+
+class TranslationCache:
+    """LRU в памяти поверх SQLite на диске, переживает перезапуски"""
+    def __init__(self, path=CACHE_FILE, memory_entries=DEFAULT_MEMORY_ENTRIES, disk_entries=DEFAULT_DISK_ENTRIES):
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        self.disk_count = 0
+        if path:
+            try:
+                self.db = sqlite3.connect(path, check_same_thread=False)
+                self.db.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, used REAL)")
+                self.db.execute("CREATE INDEX IF NOT EXISTS cache_used ON cache(used)")
+                self.db.commit()
+                self.disk_count = self.db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            except Exception as e:
+                print(f"Кэш на диске недоступен: {e}")
+                self.db = None
+
+    @staticmethod
+    def make_key(fingerprint, target_lang_code, beam_size, segment):
+        raw = f"{fingerprint}\x00{target_lang_code}\x00{beam_size}\x00{normalize_segment(segment)}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def get_many(self, keys):
+        """Возвращает {key: перевод} для найденных ключей"""
+        found = {}
+        with self.lock:
+            rest = []
+            for k in keys:
+                if k in self.memory:
+                    self.memory.move_to_end(k)
+                    found[k] = self.memory[k]
+                else:
+                    rest.append(k)
+            rest = list(dict.fromkeys(rest))
+            if rest and self.db:
+                now = time.time()
+                # SQLite ограничивает число параметров в запросе
+                for i in range(0, len(rest), 500):
+                    part = rest[i:i + 500]
+                    marks = ",".join("?" * len(part))
+                    rows = self.db.execute(f"SELECT key, value FROM cache WHERE key IN ({marks})", part).fetchall()
+                    for k, v in rows:
+                        found[k] = v
+                        self._remember(k, v)
+                    if rows:
+                        self.db.executemany("UPDATE cache SET used = ? WHERE key = ?", [(now, k) for k, _ in rows])
+                if self.db.in_transaction: self.db.commit()
+            hits = sum(1 for k in keys if k in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return found
+
+    def put_many(self, items):
+        with self.lock:
+            for k, v in items:
+                self._remember(k, v)
+            if self.db and items:
+                now = time.time()
+                self.db.executemany("INSERT OR REPLACE INTO cache (key, value, used) VALUES (?, ?, ?)",
+                                    [(k, v, now) for k, v in items])
+                # Счетчик приблизительный (REPLACE не добавляет строк), уточняем только у границы
+                self.disk_count += len(items)
+                if self.disk_count > self.disk_entries:
+                    self._evict()
+                self.db.commit()
+
+    def _evict(self):
+        self.disk_count = self.db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        if self.disk_count <= self.disk_entries: return
+        # Удаляем с запасом, чтобы не чистить на каждой записи
+        extra = self.disk_count - self.disk_entries + self.disk_entries // 10
+        self.db.execute("DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY used LIMIT ?)", (extra,))
+        self.disk_count -= extra
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            if self.db:
+                self.db.execute("DELETE FROM cache")
+                self.db.commit()
+                self.disk_count = 0
+
+    def stats(self):
+        return f"Кэш: {self.hits} попаданий, {self.misses} промахов, в памяти {len(self.memory)}"
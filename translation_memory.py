@@ -0,0 +1,229 @@
+import re
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from difflib import SequenceMatcher
+
+from translation_cache import normalize_segment
+
+# Память переводов для почти одинаковых сегментов (шаблонные письма, тикеты,
+# сообщения логов). Числа, ссылки, адреса и идентификаторы заменяются
+# заглушкой - получается шаблон сегмента. Сегмент с тем же шаблоном берет
+# перевод прежнего, в котором старые значения заменены новыми. Похожие шаблоны
+# ищутся через MinHash + LSH по символьным n-граммам; перевод переиспользуется,
+# только если сегменты различаются заменяемыми токенами и старые значения
+# нашлись в переводе. Все остальное идет в модель.
+
+TM_FILE = "translation_memory.sqlite3"
+DEFAULT_TM_ENTRIES = 200000
+# Минимальное сходство шаблонов (Жаккар по n-граммам) для нечеткого совпадения
+DEFAULT_TM_THRESHOLD = 0.7
+# Сколько сегментов одного шаблона хранить (у разных значений перевод может не подойти)
+TEMPLATE_VARIANTS = 6
+MAX_CANDIDATES = 8
+
+PLACEHOLDER = (
+    r"https?://[^\s<>\"']*[^\s<>\"'.,;:!?)\]]"
+    r"|www\.[^\s<>\"']*[^\s<>\"'.,;:!?)\]]"
+    r"|[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)+"
+    # Числа, даты, версии и ASCII-идентификаторы с цифрой или _ (INC-0042, x86_64, user_id), camelCase
+    r"|(?<![\w-])(?=[A-Za-z0-9_.:/-]*[\d_]|[a-z]+[A-Z])[A-Za-z0-9](?:[A-Za-z0-9_.:/-]*[A-Za-z0-9])?(?![\w-])"
+)
+PLACEHOLDER_RE = re.compile(PLACEHOLDER)
+TOKEN_RE = re.compile(f"{PLACEHOLDER}|\\w+|[^\\w\\s]")
+# Имена и названия: можно заменить, если модель оставила их в переводе как есть
+NAME_RE = re.compile(r"[A-Z][\w'-]*")
+SLOT = "█"
+
+# Подпись MinHash: одна хэш-функция, 32 корзины (one permutation hashing),
+# LSH - 8 полос по 4 корзины
+SHINGLE = 4
+BIN_BITS = 5
+BINS = 1 << BIN_BITS
+ROWS = 4
+
+def make_template(segment):
+    """(шаблон, значения заглушек по порядку)"""
+    values = PLACEHOLDER_RE.findall(segment)
+    return PLACEHOLDER_RE.sub(SLOT, segment), values
+
+def shingles(template):
+    s = f" {template.lower()} "
+    if len(s) <= SHINGLE: return {s}
+    return {s[i:i + SHINGLE] for i in range(len(s) - SHINGLE + 1)}
+
+def signature(grams):
+    sig = [None] * BINS
+    mask = BINS - 1
+    for h in map(zlib.crc32, (g.encode('utf-8') for g in grams)):
+        b, v = h & mask, h >> BIN_BITS
+        if sig[b] is None or v < sig[b]: sig[b] = v
+    # Пустые корзины берут значение следующей непустой (densification)
+    filled = [i for i, v in enumerate(sig) if v is not None]
+    for i in range(BINS):
+        if sig[i] is None:
+            j = next((k for k in filled if k > i), filled[0])
+            sig[i] = sig[j] + ((j - i) % BINS << 27)
+    return sig
+
+def band_keys(ctx, sig):
+    keys = []
+    for b in range(0, BINS, ROWS):
+        digest = hashlib.blake2b(f"{ctx}\x00{b}\x00{sig[b:b + ROWS]}".encode('utf-8'), digest_size=8).digest()
+        # SQLite хранит знаковые 64-битные числа
+        keys.append(int.from_bytes(digest, 'big') >> 1)
+    return keys
+
+def plural_form(n, lang):
+    """Форма существительного после числа: при другой форме подстановка испортит грамматику"""
+    if lang in ("ru", "uk"):
+        if n % 10 == 1 and n % 100 != 11: return "one"
+        if 2 <= n % 10 <= 4 and not 12 <= n % 100 <= 14: return "few"
+        return "many"
+    if lang == "zh": return "other"
+    if lang == "fr": return "one" if n in (0, 1) else "other"
+    return "one" if n == 1 else "other"
+
+def reuse_key(segment, lang):
+    """Сегменты с одинаковым ключом переводятся друг из друга подстановкой значений"""
+    template, values = make_template(segment)
+    return template, tuple(plural_form(int(v), lang) for v in values if v.isdigit())
+
+def swappable(old, new, lang):
+    if PLACEHOLDER_RE.fullmatch(old) and PLACEHOLDER_RE.fullmatch(new):
+        if old.isdigit() != new.isdigit(): return False
+        return not old.isdigit() or plural_form(int(old), lang) == plural_form(int(new), lang)
+    return bool(NAME_RE.fullmatch(old) and NAME_RE.fullmatch(new))
+
+def substitute(source, translation, segment, lang):
+    """Перевод segment из перевода похожего source или None, если различия не только в заменяемых токенах"""
+    old_tokens, new_tokens = TOKEN_RE.findall(source), TOKEN_RE.findall(segment)
+    mapping, kept = {}, set()
+    for op, i1, i2, j1, j2 in SequenceMatcher(None, old_tokens, new_tokens, autojunk=False).get_opcodes():
+        if op == "equal":
+            kept.update(old_tokens[i1:i2])
+            continue
+        if op != "replace" or i2 - i1 != j2 - j1: return None
+        for old, new in zip(old_tokens[i1:i2], new_tokens[j1:j2]):
+            if not swappable(old, new, lang) or mapping.setdefault(old, new) != new: return None
+    # Значение, которое где-то осталось прежним, а где-то поменялось, в переводе не различить
+    if kept & set(mapping): return None
+    if not mapping: return translation
+    pattern = re.compile("|".join(f"(?<![\\w-]){re.escape(old)}(?![\\w-])"
+                                  for old in sorted(mapping, key=len, reverse=True)))
+    found = set(pattern.findall(translation))
+    # Модель могла переписать значение (3.5 -> 3,5) или перевести имя - тогда не угадываем
+    if found != set(mapping): return None
+    return pattern.sub(lambda m: mapping[m.group(0)], translation)
+
+class TranslationMemory:
+    """Индекс шаблонов и полос LSH в SQLite; ctx - модель, язык и луч"""
+    def __init__(self, path=TM_FILE, max_entries=DEFAULT_TM_ENTRIES, threshold=DEFAULT_TM_THRESHOLD):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        try:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+        except Exception as e:
+            print(f"Память переводов на диске недоступна: {e}")
+            self.db = sqlite3.connect(":memory:", check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS tm (id INTEGER PRIMARY KEY, template_key TEXT, "
+                        "source TEXT, target TEXT, used REAL)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS tm_template ON tm(template_key)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS tm_used ON tm(used)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS tm_band (band INTEGER, id INTEGER)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS tm_band_key ON tm_band(band)")
+        self.db.commit()
+        self.count = self.db.execute("SELECT COUNT(*) FROM tm").fetchone()[0]
+
+    @staticmethod
+    def make_ctx(fingerprint, target_lang_code, beam_size):
+        return f"{fingerprint}\x00{target_lang_code}\x00{beam_size}"
+
+    @staticmethod
+    def template_key(ctx, template):
+        return hashlib.sha1(f"{ctx}\x00{template}".encode('utf-8')).hexdigest()
+
+    def lookup(self, ctx, segment):
+        """Перевод из памяти или None"""
+        segment = normalize_segment(segment)
+        lang = ctx.split("\x00")[1]
+        template, _ = make_template(segment)
+        with self.lock:
+            # 1. Тот же шаблон - один поиск по индексу
+            rows = self.db.execute("SELECT id, source, target FROM tm WHERE template_key = ?",
+                                   (self.template_key(ctx, template),)).fetchall()
+            out = self._try(rows, segment, lang)
+            if out is None:
+                # 2. Похожие шаблоны через полосы LSH
+                grams = shingles(template)
+                bands = band_keys(ctx, signature(grams))
+                marks = ",".join("?" * len(bands))
+                ids = self.db.execute(f"SELECT id, COUNT(*) AS n FROM tm_band WHERE band IN ({marks}) "
+                                      f"GROUP BY id ORDER BY n DESC LIMIT {MAX_CANDIDATES}", bands).fetchall()
+                seen = {r[0] for r in rows}
+                ids = [i for i, _ in ids if i not in seen]
+                if ids:
+                    marks = ",".join("?" * len(ids))
+                    candidates = self.db.execute(f"SELECT id, source, target FROM tm WHERE id IN ({marks})", ids).fetchall()
+                    scored = []
+                    for row in candidates:
+                        other = shingles(make_template(row[1])[0])
+                        similarity = len(grams & other) / len(grams | other)
+                        if similarity >= self.threshold: scored.append((similarity, row))
+                    out = self._try([row for _, row in sorted(scored, key=lambda x: x[0], reverse=True)], segment, lang)
+            if out is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            row_id, translation = out
+            self.db.execute("UPDATE tm SET used = ? WHERE id = ?", (time.time(), row_id))
+            self.db.commit()
+            return translation
+
+    def _try(self, rows, segment, lang):
+        for row_id, source, target in rows:
+            translation = substitute(source, target, segment, lang)
+            if translation is not None: return row_id, translation
+        return None
+
+    def add_many(self, ctx, pairs):
+        """Запоминает (сегмент, перевод модели)"""
+        now = time.time()
+        with self.lock:
+            for segment, translation in pairs:
+                if not translation: continue
+                segment = normalize_segment(segment)
+                template, _ = make_template(segment)
+                key = self.template_key(ctx, template)
+                sources = [r[0] for r in self.db.execute("SELECT source FROM tm WHERE template_key = ?", (key,))]
+                if segment in sources or len(sources) >= TEMPLATE_VARIANTS: continue
+                row_id = self.db.execute("INSERT INTO tm (template_key, source, target, used) VALUES (?, ?, ?, ?)",
+                                         (key, segment, translation, now)).lastrowid
+                self.db.executemany("INSERT INTO tm_band (band, id) VALUES (?, ?)",
+                                    [(b, row_id) for b in band_keys(ctx, signature(shingles(template)))])
+                self.count += 1
+            if self.count > self.max_entries: self._evict()
+            self.db.commit()
+
+    def _evict(self):
+        # Удаляем давно не использованные с запасом, чтобы не чистить на каждой записи
+        extra = self.count - self.max_entries + self.max_entries // 10
+        old = "SELECT id FROM tm ORDER BY used LIMIT ?"
+        self.db.execute(f"DELETE FROM tm_band WHERE id IN ({old})", (extra,))
+        self.db.execute(f"DELETE FROM tm WHERE id IN ({old})", (extra,))
+        self.count = self.db.execute("SELECT COUNT(*) FROM tm").fetchone()[0]
+
+    def clear(self):
+        with self.lock:
+            self.db.execute("DELETE FROM tm")
+            self.db.execute("DELETE FROM tm_band")
+            self.db.commit()
+            self.count = 0
+
+    def stats(self):
+        return f"Память переводов: {self.hits} совпадений, {self.misses} промахов, сегментов {self.count}"
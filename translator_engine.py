@@ -1,19 +1,31 @@
 import os
+import re
 import json
 import time
+import threading
 import traceback
-import sentencepiece as spm
-from PySide6.QtCore import QThread, Signal
+from contextlib import nullcontext, contextmanager
+from collections import OrderedDict
+from concurrent.futures import Future
+from scheduler import TranslationScheduler
+from residency import ResidencyManager
+from engine_pool import EnginePool, plan_cores
+from model_registry import MODELS, DEFAULT_MODEL, make_prompt, detect_model, missing_files, model_size
+from autotune import resolve as resolve_tuning
+from metrics import Metrics
+from lang_detect import detect as detect_lang
+from vocab_map import vmap_tag
+import markup
+from translation_cache import TranslationCache, model_fingerprint, normalize_segment, DEFAULT_MEMORY_ENTRIES, DEFAULT_DISK_ENTRIES
+from translation_memory import TranslationMemory, reuse_key, DEFAULT_TM_ENTRIES, DEFAULT_TM_THRESHOLD
 
-# Попытка импорта движка
-try:
-    import ctranslate2
-    from huggingface_hub import snapshot_download
-except ImportError:
-    print("CRITICAL: ctranslate2 not found")
+# ctranslate2 и sentencepiece тяжелые: импортируются только при загрузке модели
 
 CONFIG_FILE = "settings.json"
-DEFAULT_MODEL_REPO = "santhosh/madlad400-3b-ct2"
+DEFAULT_MODEL_REPO = MODELS[DEFAULT_MODEL]["repo"]
+DEFAULT_RAM_BUDGET_MB = 8192
+# Тексты короче этого порога уходят на быструю модель, если она задана
+DEFAULT_SHORT_TEXT_CHARS = 200
 LANGUAGES = {
     "Русский": "ru", "English": "en", "German": "de", "French": "fr",
     "Spanish": "es", "Ukrainian": "uk", "Italian": "it", "Chinese": "zh"
@@ -31,96 +43,736 @@ class ConfigManager:
     def save(data):
         with open(CONFIG_FILE, 'w', encoding='utf-8') as f: json.dump(data, f, indent=4)
 
+DEFAULT_MAX_BATCH_SIZE = 1024
+DEFAULT_BATCH_TYPE = "tokens"
+MAX_DECODING_LENGTH = 300
+# Предел длины перевода растет с длиной источника: зацикленная генерация обрывается рано
+DECODING_LENGTH_RATIO = 3
+DECODING_LENGTH_MARGIN = 10
+# Режим "Авто": все жадно с оценками, неуверенные сегменты - заново лучом
+BEAM_AUTO = 0
+ESCALATION_BEAM = 4
+# Средний log-prob на токен, ниже которого перевод считается неуверенным
+DEFAULT_ADAPTIVE_MIN_SCORE = -0.3
+# Перевод короче этой доли источника (в токенах) - вероятно, модель пропустила кусок
+MIN_LENGTH_RATIO = 0.3
+MIN_LENGTH_CHECK_TOKENS = 8
+DEFAULT_MAX_SEGMENT_TOKENS = 128
+# Сегмент не переводится, только если язык перевода определен уверенно
+SAME_LANGUAGE_CONFIDENCE = 0.5
+# Потоковый режим: первый кусок маленький, дальше батчи растут вдвое
+STREAM_MAX_CHUNK = 64
+
+def decoding_limit(source_len):
+    return min(MAX_DECODING_LENGTH, source_len * DECODING_LENGTH_RATIO + DECODING_LENGTH_MARGIN)
+
+def make_batches(lengths, max_batch_size, batch_type="tokens"):
+    """Группирует индексы по длине так, чтобы в батче было минимум паддинга"""
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches, cur, cur_max = [], [], 0
+    for i in order:
+        new_max = max(cur_max, lengths[i])
+        # Размер батча считается с учетом паддинга до самой длинной строки
+        size = new_max * (len(cur) + 1) if batch_type == "tokens" else len(cur) + 1
+        if cur and max_batch_size and size > max_batch_size:
+            batches.append(cur)
+            cur, new_max = [], lengths[i]
+        cur.append(i)
+        cur_max = new_max
+    if cur: batches.append(cur)
+    return batches
+
+# === СЕГМЕНТАЦИЯ ===
+# Конец предложения: .!?… и закрывающие кавычки/скобки, затем пробел и начало нового предложения
+SENTENCE_RE = re.compile(r'(?<=[.!?…])(["»”)\]]*)(\s+)(?=["«“(\[]*[A-ZА-ЯЁЇІЄҐ0-9])')
+# В китайском/японском пробелов нет, режем сразу после знака
+CJK_SENTENCE_RE = re.compile(r'(?<=[。！？])()()')
+CLAUSE_RE = re.compile(r'(?<=[,;:，；、])(\s*)')
+CJK_LANGS = ("zh", "ja")
+# Сокращения, после которых точка не означает конец предложения
+ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "st", "vs", "etc", "e.g", "i.e", "no", "fig", "approx",
+    "т", "т.е", "т.д", "т.п", "др", "г", "гг", "им", "ул", "стр", "см", "рис", "проф", "напр",
+    "z.b", "bzw", "usw", "ca", "nr", "env", "sr", "sra", "dott", "ecc"
+}
+
+def _is_abbreviation(text):
+    m = re.search(r'(\S+)\.["»”)\]]*$', text)
+    if not m: return False
+    word = m.group(1).lower()
+    # Инициалы (А. С. Пушкин) тоже не конец предложения
+    return word in ABBREVIATIONS or (len(word) == 1 and word.isalpha())
+
+def split_sentences(text):
+    """Режет текст на [(предложение, разделитель_после)], разделители сохраняются как есть"""
+    parts, start = [], 0
+    matches = sorted(list(SENTENCE_RE.finditer(text)) + list(CJK_SENTENCE_RE.finditer(text)),
+                     key=lambda m: m.start())
+    for m in matches:
+        end = m.start() + len(m.group(1))
+        if end <= start or _is_abbreviation(text[start:end]): continue
+        parts.append((text[start:end], m.group(2)))
+        start = m.end()
+    if start < len(text):
+        parts.append((text[start:], ""))
+    return parts
+
+def _chunk_pieces(pieces, max_tokens, count_tokens):
+    """Жадно склеивает соседние куски [(текст, разделитель)], пока влезают в бюджет"""
+    chunks, cur, cur_len = [], [], 0
+    for piece, sep in pieces:
+        n = count_tokens(piece)
+        if cur and cur_len + n > max_tokens:
+            chunks.append(cur)
+            cur, cur_len = [], 0
+        cur.append((piece, sep))
+        cur_len += n
+    if cur: chunks.append(cur)
+    # Разделитель внутри чанка остается частью текста, наружу выходит только последний
+    return [("".join(p + s for p, s in c[:-1]) + c[-1][0], c[-1][1]) for c in chunks]
+
+def _split_words(text, max_tokens, count_tokens):
+    words = [(m.group(1), m.group(2)) for m in re.finditer(r'(\S+)(\s*)', text)]
+    if len(words) <= 1:
+        # Сплошной текст без пробелов (CJK): режем по символам
+        return [(text[i:i + max_tokens], "") for i in range(0, len(text), max_tokens)]
+    return _chunk_pieces(words, max_tokens, count_tokens)
+
+def split_segment(sentence, max_tokens, count_tokens):
+    """Дробит слишком длинное предложение по запятым, а затем по словам"""
+    # Каждый токен покрывает хотя бы один символ, короткие строки не считаем
+    if len(sentence) <= max_tokens or count_tokens(sentence) <= max_tokens:
+        return [(sentence, "")]
+    clauses = []
+    start = 0
+    for m in CLAUSE_RE.finditer(sentence):
+        if m.start() > start:
+            clauses.append((sentence[start:m.start()], m.group(1)))
+        start = m.end()
+    if start < len(sentence):
+        clauses.append((sentence[start:], ""))
+    result = []
+    for clause, sep in _chunk_pieces(clauses, max_tokens, count_tokens):
+        if len(clause) > max_tokens and count_tokens(clause) > max_tokens:
+            pieces = _split_words(clause, max_tokens, count_tokens)
+            pieces[-1] = (pieces[-1][0], pieces[-1][1] + sep)
+            result.extend(pieces)
+        else:
+            result.append((clause, sep))
+    return result
+
+def segment_line(line, max_tokens, count_tokens):
+    """Возвращает (ведущие пробелы, [(кусок, разделитель)], хвостовые пробелы)"""
+    stripped = line.strip()
+    lead = line[:len(line) - len(line.lstrip())]
+    trail = line[len(line.rstrip()):]
+    pieces = []
+    for sentence, sep in split_sentences(stripped):
+        sub = split_segment(sentence, max_tokens, count_tokens)
+        sub[-1] = (sub[-1][0], sub[-1][1] + sep)
+        pieces.extend(sub)
+    return lead, pieces, trail
+
+def segment_markup_line(line, max_tokens, count_tokens):
+    """Как segment_line, но код, теги, ссылки и подстановки уходят в разделители, а не в модель"""
+    lead, pieces, pending = "", [], ""
+    for translate, text in markup.split_line(line):
+        if not translate:
+            pending += text
+            continue
+        l, p, t = segment_line(text, max_tokens, count_tokens)
+        if pieces: pieces[-1] = (pieces[-1][0], pieces[-1][1] + pending + l)
+        else: lead = pending + l
+        pieces.extend(p)
+        pending = t
+    # Переводить нечего - строка остается как есть
+    if not pieces: return line, [], ""
+    return lead, pieces, pending
+
+def join_segments(lead, translated, seps, trail, target_lang_code):
+    """Собирает строку обратно из переведенных кусков и исходных разделителей"""
+    out = [lead]
+    for i, (text, sep) in enumerate(zip(translated, seps)):
+        out.append(text)
+        if i == len(translated) - 1: break
+        # Для CJK-источника разделителя нет, а в латинице/кириллице нужен пробел
+        if not sep and target_lang_code not in CJK_LANGS and text and not text[-1].isspace():
+            sep = " "
+        out.append(sep)
+    out.append(trail)
+    return "".join(out)
+
+class LoadedModel:
+    """Модель в памяти: CT2-переводчик, токенизатор и адаптер формата подсказки"""
+    def __init__(self, name, path, translator, sp, fingerprint=None):
+        self.name, self.path = name, path
+        self.spec = MODELS[name]
+        self.prompt = make_prompt(self.spec)
+        self.translator, self.sp = translator, sp
+        self.fingerprint = fingerprint
+        self.size = model_size(path) if path else 0
+        # Словарные списки (vmap.txt) CTranslate2 читает при загрузке модели
+        self.vmap_tag = vmap_tag(path)
+
 class TranslatorEngine:
     def __init__(self):
-        self.translator = None
-        self.sp = None
+        # Загруженные модели в порядке LRU; основная (primary) не выгружается
+        self.models = OrderedDict()
+        self.primary = None
+        self.models_lock = threading.RLock()
+        self.config = {}
+        self.model_paths = {}
+        self.ram_budget_mb = DEFAULT_RAM_BUDGET_MB
+        self.short_model = None
+        self.short_text_chars = DEFAULT_SHORT_TEXT_CHARS
+        self.max_batch_size = DEFAULT_MAX_BATCH_SIZE
+        self.batch_type = DEFAULT_BATCH_TYPE
+        self.max_segment_tokens = DEFAULT_MAX_SEGMENT_TOKENS
+        self.cache = None
+        # Нечеткая память переводов: сегменты, отличающиеся числами, ссылками, идентификаторами
+        self.tm = None
+        self.skip_same_language = True
+        # Код, теги, ссылки и подстановки не отдавать модели (markup.py)
+        self.protect_markup = True
+        # Декодировать только по словарным спискам модели (если у нее есть vmap.txt)
+        self.use_vmap = True
+        self.adaptive_min_score = DEFAULT_ADAPTIVE_MIN_SCORE
+        self.loading = None
+        self.load_lock = threading.Lock()
+        self.metrics = Metrics()
+        # Прогрев и выгрузка при простое (ResidencyManager подключает себя сам)
+        self.residency = None
+        # Флаг private у потока: переводы не пишутся в кэш и память переводов
+        self.local = threading.local()
+        # Реплики основной модели для параллельных запросов (0 - без пула)
+        self.pool = None
+        self.pool_replicas = 0
+        self.pool_threads = 0
+
+    # Основная модель - для проверок готовности и старого кода
+    @property
+    def model(self):
+        return self.models.get(self.primary)
+
+    @property
+    def translator(self):
+        return self.model.translator if self.model else None
+
+    @property
+    def sp(self):
+        return self.model.sp if self.model else None
+
+    @property
+    def fingerprint(self):
+        return self.model.fingerprint if self.model else None
 
-    def load(self, model_path):
+    def configure(self, config):
+        self.config = config
+        self.max_batch_size = int(config.get("max_batch_size", DEFAULT_MAX_BATCH_SIZE))
+        self.batch_type = config.get("batch_type", DEFAULT_BATCH_TYPE)
+        self.max_segment_tokens = int(config.get("max_segment_tokens", DEFAULT_MAX_SEGMENT_TOKENS))
+        self.model_paths = dict(config.get("models", {}))
+        self.ram_budget_mb = int(config.get("ram_budget_mb", DEFAULT_RAM_BUDGET_MB))
+        self.short_model = config.get("short_model")
+        self.short_text_chars = int(config.get("short_text_chars", DEFAULT_SHORT_TEXT_CHARS))
+        self.skip_same_language = bool(config.get("skip_same_language", True))
+        self.protect_markup = bool(config.get("protect_markup", True))
+        self.use_vmap = bool(config.get("use_vmap", True))
+        self.adaptive_min_score = float(config.get("adaptive_min_score", DEFAULT_ADAPTIVE_MIN_SCORE))
+        self.pool_replicas = int(config.get("pool_replicas", 0))
+        self.pool_threads = int(config.get("pool_threads", 0))
+        if self.residency: self.residency.configure(config)
+        if config.get("cache_enabled", True):
+            if not self.cache:
+                self.cache = TranslationCache(
+                    memory_entries=int(config.get("cache_memory_entries", DEFAULT_MEMORY_ENTRIES)),
+                    disk_entries=int(config.get("cache_disk_entries", DEFAULT_DISK_ENTRIES)))
+        else:
+            self.cache = None
+        if config.get("tm_enabled", True):
+            if not self.tm:
+                self.tm = TranslationMemory(max_entries=int(config.get("tm_entries", DEFAULT_TM_ENTRIES)))
+            self.tm.threshold = float(config.get("tm_threshold", DEFAULT_TM_THRESHOLD))
+        else:
+            self.tm = None
+
+    def attach(self, translator, sp, fingerprint=None, name=DEFAULT_MODEL):
+        """Подключает готовые translator/токенизатор (например, заглушку для бенчмарка)"""
+        with self.models_lock:
+            self.models[name] = LoadedModel(name, None, translator, sp, fingerprint)
+            self.primary = name
+
+    def _open_model(self, name, model_path):
+        import sentencepiece as spm
+        import ctranslate2
+        sp = spm.SentencePieceProcessor()
+        sp.load(os.path.join(model_path, MODELS[name]["tokenizer"]))
+        fingerprint = model_fingerprint(model_path)
+        # Ручные настройки или результат автонастройки для этой модели
+        options = resolve_tuning(self.config, fingerprint)
+        print(f"Параметры CTranslate2: {options}")
+        translator = ctranslate2.Translator(model_path, device="cpu", **options)
+        return LoadedModel(name, model_path, translator, sp, fingerprint)
+
+    def _open_replica(self, model, threads):
+        import ctranslate2
+        options = resolve_tuning(self.config, model.fingerprint)
+        # Параллельность дает сам пул: у каждой реплики один батч за раз
+        options.update(intra_threads=threads, inter_threads=1)
+        return ctranslate2.Translator(model.path, device="cpu", **options)
+
+    def start_pool(self, replicas=None, threads=None, factory=None, pin=True, cores=None):
+        """Запускает пул реплик основной модели; replicas=0 - по числу ядер"""
+        self.stop_pool()
+        model = self.model
+        if not model: return None
+        cpu_sets = plan_cores(self.pool_replicas if replicas is None else replicas,
+                              self.pool_threads if threads is None else threads, cores)
+        if model.size:
+            # У каждой реплики свои веса: сколько влезает в бюджет рядом с загруженными моделями
+            free = self.ram_budget_mb * 1024 * 1024 - sum(m.size for m in self.models.values())
+            fit = max(0, free // model.size)
+            if not fit:
+                print(f"Пул реплик не запущен: копия модели не влезает в бюджет {self.ram_budget_mb} МБ")
+                return None
+            if fit < len(cpu_sets): print(f"Пул реплик: в бюджет памяти влезает {fit} из {len(cpu_sets)}")
+            cpu_sets = cpu_sets[:fit]
+        self.pool = EnginePool(self, model, cpu_sets, factory or self._open_replica, pin)
+        print(f"Пул реплик: {len(cpu_sets)} x {len(cpu_sets[0])} потоков")
+        return self.pool
+
+    def stop_pool(self):
+        pool, self.pool = self.pool, None
+        if pool: pool.stop()
+
+    def _make_room(self, need, keep):
+        """Выгружает давно не использованные модели, пока новая не влезет в бюджет памяти"""
+        budget = self.ram_budget_mb * 1024 * 1024
+        total = sum(m.size for m in self.models.values())
+        for name in list(self.models):
+            if total + need <= budget: break
+            if name in (keep, self.primary): continue
+            total -= self.models.pop(name).size
+            if self.residency: self.residency.forget(name)
+            print(f"Модель {name} выгружена (бюджет {self.ram_budget_mb} МБ)")
+
+    def load(self, model_path, name=None):
+        """Загружает модель из папки и делает ее основной"""
         print(f"Загрузка движка из: {model_path}")
-        sp_path = os.path.join(model_path, "sentencepiece.model")
-        model_bin = os.path.join(model_path, "model.bin")
-        
-        if not os.path.exists(sp_path) or not os.path.exists(model_bin):
+        name = name or detect_model(model_path)
+        if missing_files(name, model_path):
             return False, "Файлы не найдены!"
 
         try:
-            self.sp = spm.SentencePieceProcessor()
-            self.sp.load(sp_path)
-            self.translator = ctranslate2.Translator(model_path, device="cpu", intra_threads=4)
-            print("CTranslate2 готов.")
+            import sentencepiece
+            import ctranslate2
+        except ImportError as e:
+            print(f"CRITICAL: {e}")
+            return False, f"Не установлен {e.name}"
+
+        try:
+            m = self._open_model(name, model_path)
+            # Реплики старой основной модели больше не нужны
+            self.stop_pool()
+            with self.models_lock:
+                self._make_room(m.size, name)
+                self.models[name] = m
+                self.primary = name
+            if self.residency: self.residency.register(m)
+            self.model_paths.setdefault(name, model_path)
+            print(f"CTranslate2 готов ({MODELS[name]['title']}).")
             return True, "Готово"
         except Exception as e:
             print(f"Ошибка движка: {e}")
             return False, str(e)
 
-    def translate(self, text, target_lang_code, beam_size=1):
+    def get_model(self, name):
+        """Возвращает модель из памяти или подгружает ее по пути из настроек"""
+        with self.models_lock:
+            if name in self.models:
+                self.models.move_to_end(name)
+                return self.models[name]
+            path = self.model_paths.get(name)
+            if not path or name not in MODELS or missing_files(name, path): return None
+            print(f"Подгружаем модель {name}...")
+            m = self._open_model(name, path)
+            self._make_room(m.size, name)
+            self.models[name] = m
+            if self.residency: self.residency.register(m)
+            return m
+
+    def pick_model(self, text_chars):
+        """Политика выбора: короткие фрагменты - на быструю модель, остальное - на основную"""
+        if self.short_model and self.short_model != self.primary and text_chars <= self.short_text_chars:
+            try:
+                m = self.get_model(self.short_model)
+                if m: return m
+            except Exception as e:
+                print(f"Быстрая модель недоступна: {e}")
+        with self.models_lock:
+            if self.primary in self.models: self.models.move_to_end(self.primary)
+        return self.model
+
+    def load_async(self, model_path, force=False):
+        """Грузит модель в фоновом потоке; повторный вызов для того же пути отдает тот же Future.
+
+        force - перезагрузить уже загруженную модель (новые compute_type, потоки,
+        автонастройка); идущую загрузку того же пути все равно не дублируем.
+        """
+        with self.load_lock:
+            if self.loading and self.loading[0] == model_path:
+                future = self.loading[1]
+                if not future.done(): return future
+                # После неудачи даем попробовать снова
+                if not force and future.result()[0]: return future
+            future = Future()
+            def run():
+                try:
+                    result = self.load(model_path)
+                except Exception as e:
+                    print(traceback.format_exc())
+                    result = (False, str(e))
+                # Готовность сообщаем сразу, прогрев идет следом в этом же потоке
+                future.set_result(result)
+                if result[0] and self.residency: self.residency.warm_up(self.model)
+                if result[0] and self.pool_replicas > 1: self.start_pool()
+            threading.Thread(target=run, name="model-loader", daemon=True).start()
+            self.loading = (model_path, future)
+            return future
+
+    def translate(self, text, target_lang_code, beam_size=1, model=None):
         if not self.translator: return "Ошибка: движок не готов"
         try:
             # Разбиваем на строки, чтобы сохранить форматирование
             lines = text.split('\n')
-            results = []
-            for line in lines:
-                if not line.strip():
-                    results.append("")
-                    continue
-                
-                input_text = f"<2{target_lang_code}> {line}"
-                source_tokens = self.sp.encode_as_pieces(input_text)
-                res = self.translator.translate_batch(
-                    [source_tokens], beam_size=beam_size, max_decoding_length=300
-                )
-                results.append(self.sp.decode(res[0].hypotheses[0]))
-            
-            return "\n".join(results)
+            return "\n".join(self.translate_lines(lines, target_lang_code, beam_size, model))
         except Exception as e:
             print(f"Ошибка перевода: {e}")
             return f"Error: {e}"
 
-# Глобальный экземпляр движка
-engine = TranslatorEngine()
+    def count_tokens(self, text, model=None):
+        return len((model or self.model).sp.encode(text, out_type=str))
 
-# === ПОТОКИ ===
-class LoaderThread(QThread):
-    finished_signal = Signal(bool, str)
-    def __init__(self, path):
-        super().__init__()
-        self.path = path
-    def run(self):
-        try:
-            s, m = engine.load(self.path)
-            self.finished_signal.emit(s, m)
-        except Exception as e:
-            print(traceback.format_exc())
-            self.finished_signal.emit(False, str(e))
-
-class TranslateThread(QThread):
-    result_signal = Signal(str, float)
-    def __init__(self, text, code, beam):
-        super().__init__()
-        self.text, self.code, self.beam = text, code, beam
-    def run(self):
-        t = time.time()
-        print(f"Translate -> {self.code}")
-        try:
-            res = engine.translate(self.text, self.code, self.beam)
-            self.result_signal.emit(res, time.time() - t)
-        except:
-            print(traceback.format_exc())
-            self.result_signal.emit("Error", 0)
-
-class DownloaderThread(QThread):
-    finished_signal = Signal(bool, str)
-    def __init__(self, target_folder):
-        super().__init__()
-        self.target_folder = target_folder
-    def run(self):
-        print("Начинаем скачивание...")
-        os.environ["HF_HUB_DISABLE_PROGRESS_BARS"] = "1"
-        try:
-            snapshot_download(repo_id=DEFAULT_MODEL_REPO, local_dir=self.target_folder, local_dir_use_symlinks=False, resume_download=True, tqdm_class=None)
-            print("Скачивание завершено.")
-            self.finished_signal.emit(True, "OK")
-        except Exception as e:
-            print(f"Ошибка скачивания: {e}")
-            self.finished_signal.emit(False, str(e))
\ No newline at end of file
+    def translate_lines(self, lines, target_lang_code, beam_size=1, model=None):
+        """Переводит список строк одним батчем, длинные строки режутся на предложения"""
+        return self.translate_line_groups([lines], target_lang_code, beam_size, model)[0]
+
+    def translate_line_groups(self, groups, target_lang_code, beam_size=1, model=None):
+        """Переводит несколько независимых текстов (списков строк) одним батчем.
+
+        Разметка размечается по каждому тексту отдельно: незакрытый блок кода
+        в конце одного запроса или файла не задевает следующий.
+        """
+        model = model or self.pick_model(sum(len(l) for lines in groups for l in lines))
+        layouts, segments = [], []
+        for lines in groups:
+            layout, own = self.segment_lines(lines, model)
+            layouts.append((layout, len(segments)))
+            segments.extend(own)
+        translated = self.translate_cached(segments, target_lang_code, beam_size, model) if segments else []
+        out = []
+        for lines, (layout, offset) in zip(groups, layouts):
+            results = [""] * len(lines)
+            for i, lead, seps, trail, start in layout:
+                start += offset
+                results[i] = join_segments(lead, translated[start:start + len(seps)], seps, trail, target_lang_code)
+            out.append(results)
+        return out
+
+    def translate_multi(self, text, target_lang_codes, beam_size=1, model=None):
+        """Один текст сразу на несколько языков: {код: перевод}.
+
+        Сегменты и токены общие для всех языков, языки перевода смешиваются
+        в одних батчах, так что N языков стоят почти как один прогон.
+        """
+        codes = list(dict.fromkeys(target_lang_codes))
+        lines = text.split('\n')
+        model = model or self.pick_model(len(text))
+        layout, segments = self.segment_lines(lines, model)
+        translated = self.translate_cached_multi(segments, codes, beam_size, model)
+        out = {}
+        for code in codes:
+            results = [""] * len(lines)
+            for i, lead, seps, trail, start in layout:
+                results[i] = join_segments(lead, translated[code][start:start + len(seps)], seps, trail, code)
+            out[code] = "\n".join(results)
+        return out
+
+    def segment_lines(self, lines, model=None):
+        """Режет строки на сегменты; layout хранит, как собрать каждую непустую строку обратно"""
+        layout, segments = [], []
+        count_tokens = lambda text: self.count_tokens(text, model)
+        split = segment_markup_line if self.protect_markup else segment_line
+        # Блоки кода и трассировки стека остаются как есть: кусков для модели у них нет
+        protected = markup.protected_lines(lines) if self.protect_markup else ()
+        for i, line in enumerate(lines):
+            if not line.strip(): continue
+            if i in protected: lead, pieces, trail = line, [], ""
+            else: lead, pieces, trail = split(line, self.max_segment_tokens, count_tokens)
+            layout.append((i, lead, [sep for _, sep in pieces], trail, len(segments)))
+            segments.extend(p for p, _ in pieces)
+        return layout, segments
+
+    def translate_stream(self, text, target_lang_code, beam_size=1, partial=False, model=None):
+        """Генератор (текст строки, готова ли строка) строго по порядку строк.
+
+        Первый сегмент идет отдельно (при partial=True - по токенам), дальше
+        батчи растут вдвое, так что первая строка появляется почти сразу.
+        """
+        lines = text.split('\n')
+        model = model or self.pick_model(len(text))
+        layout, segments = self.segment_lines(lines, model)
+        translated = []
+        next_line, next_entry = 0, 0
+
+        def finished_lines():
+            nonlocal next_line, next_entry
+            while next_line < len(lines):
+                if next_entry < len(layout) and layout[next_entry][0] == next_line:
+                    i, lead, seps, trail, start = layout[next_entry]
+                    if start + len(seps) > len(translated): return
+                    yield join_segments(lead, translated[start:start + len(seps)], seps, trail, target_lang_code), True
+                    next_entry += 1
+                else:
+                    yield "", True
+                next_line += 1
+
+        # Строки без сегментов (код, пустые) до первого сегмента отдаем сразу
+        yield from finished_lines()
+        if segments and partial and beam_size == 1 and hasattr(model.translator, "generate_tokens"):
+            lead = next(entry[1] for entry in layout if entry[2])
+            out = None
+            for out in self.translate_tokens(segments[0], target_lang_code, model):
+                yield lead + out, False
+            if out is not None: translated.append(out)
+
+        chunk = 1
+        while len(translated) < len(segments):
+            part = segments[len(translated):len(translated) + chunk]
+            translated.extend(self.translate_cached(part, target_lang_code, beam_size, model))
+            yield from finished_lines()
+            chunk = min(chunk * 2, STREAM_MAX_CHUNK)
+        yield from finished_lines()
+
+    def translate_tokens(self, segment, target_lang_code, model=None):
+        """Жадное декодирование одного сегмента с выдачей частичной гипотезы на каждом токене"""
+        model = model or self.model
+        if self.is_same_language(segment, target_lang_code):
+            self.metrics.inc("same_language_total")
+            yield segment
+            return
+        cache = self.cache
+        key = None
+        cache_id = self.cache_id(model)
+        if cache and cache_id:
+            key = cache.make_key(cache_id, target_lang_code, 1, segment)
+            found = cache.get_many([key])
+            if key in found:
+                self.metrics.inc("cache_hits_total")
+                yield found[key]
+                return
+            self.metrics.inc("cache_misses_total")
+        tm_ctx = TranslationMemory.make_ctx(cache_id, target_lang_code, 1) if self.tm and cache_id else None
+        if tm_ctx:
+            reused = self.tm.lookup(tm_ctx, segment)
+            if reused is not None:
+                self.metrics.inc("tm_hits_total")
+                if key and self.persisting(): cache.put_many([(key, reused)])
+                yield reused
+                return
+        prompt = model.prompt
+        t = time.perf_counter()
+        source = prompt.source(model.sp.encode(segment, out_type=str), segment, target_lang_code)
+        self.metrics.observe("encode_seconds", time.perf_counter() - t)
+        pieces = []
+        # Время детокенизации черновиков вычитаем из декодирования
+        t, detokenize = time.perf_counter(), 0.0
+        with self.using(model):
+            for step in model.translator.generate_tokens(source, prompt.target_prefix(target_lang_code),
+                                                         max_decoding_length=decoding_limit(len(source)),
+                                                         **self.vmap_options(model)):
+                if step.token == "</s>": break
+                pieces.append(step.token)
+                out = prompt.clean(pieces, target_lang_code)
+                if out:
+                    d = time.perf_counter()
+                    text = model.sp.decode(out)
+                    detokenize += time.perf_counter() - d
+                    yield text
+        self.metrics.observe_batch([len(source)], len(pieces), time.perf_counter() - t - detokenize, detokenize)
+        text = model.sp.decode(prompt.clean(pieces, target_lang_code))
+        if not self.persisting(): return
+        if key: cache.put_many([(key, text)])
+        if tm_ctx: self.tm.add_many(tm_ctx, [(segment, text)])
+
+    def vmap_options(self, model):
+        return {"use_vmap": True} if self.use_vmap and model.vmap_tag else {}
+
+    def cache_id(self, model):
+        """Отпечаток модели для ключей кэша: перевод со словарными списками хранится отдельно"""
+        if not model.fingerprint: return None
+        return f"{model.fingerprint}-{model.vmap_tag}" if self.vmap_options(model) else model.fingerprint
+
+    @contextmanager
+    def private(self):
+        """Переводы внутри блока (в этом потоке) читают кэш и память переводов, но ничего в них не пишут"""
+        saved, self.local.private = self.persisting(), True
+        try: yield
+        finally: self.local.private = not saved
+
+    def persisting(self):
+        return not getattr(self.local, "private", False)
+
+    def using(self, model):
+        """Обертка вызова модели: вернет выгруженные веса и отметит использование"""
+        return self.residency.use(model) if self.residency else nullcontext()
+
+    def is_same_language(self, segment, target_lang_code):
+        return self.skip_same_language and \
+            detect_lang(segment, min_confidence=SAME_LANGUAGE_CONFIDENCE) == target_lang_code
+
+    def translate_cached(self, segments, target_lang_code, beam_size=1, model=None):
+        """Отдает модели только сегменты, которых нет в кэше и которые еще не на языке перевода"""
+        return self.translate_cached_multi(segments, [target_lang_code], beam_size, model)[target_lang_code]
+
+    def translate_cached_multi(self, segments, target_lang_codes, beam_size=1, model=None):
+        """{код: переводы segments}; все, чего нет в кэше, уходит в модель одним смешанным вызовом"""
+        model = model or self.model
+        results, todo = {}, []
+        for code in target_lang_codes:
+            results[code] = list(segments)
+            todo += [(code, i) for i, s in enumerate(segments) if not self.is_same_language(s, code)]
+        skipped = len(segments) * len(results) - len(todo)
+        if skipped: self.metrics.inc("same_language_total", skipped)
+        if todo:
+            translated = self._translate_cached([(code, segments[i]) for code, i in todo], beam_size, model)
+            for (code, i), out in zip(todo, translated): results[code][i] = out
+        return results
+
+    def _translate_cached(self, items, beam_size, model):
+        cache, tm = self.cache, self.tm
+        cache_id = self.cache_id(model)
+        if not (cache or tm) or not cache_id:
+            return self.translate_mixed(items, beam_size, model)
+        keys = [TranslationCache.make_key(cache_id, code, beam_size, s) for code, s in items]
+        found = cache.get_many(keys) if cache else {}
+        if cache:
+            hits = sum(1 for k in keys if k in found)
+            if hits: self.metrics.inc("cache_hits_total", hits)
+            if hits < len(keys): self.metrics.inc("cache_misses_total", len(keys) - hits)
+        # Одинаковые сегменты внутри запроса тоже переводим один раз
+        missing = {}
+        for k, item in zip(keys, items):
+            if k not in found and k not in missing: missing[k] = item
+        fresh = []
+        if missing and tm:
+            # После точного кэша - память переводов: в модель идут только действительно новые сегменты
+            for k, (code, s) in list(missing.items()):
+                reused = tm.lookup(TranslationMemory.make_ctx(cache_id, code, beam_size), s)
+                if reused is None: continue
+                fresh.append((k, reused))
+                del missing[k]
+            if fresh: self.metrics.inc("tm_hits_total", len(fresh))
+        persist = self.persisting()
+        if missing:
+            fresh += self._translate_new(missing, beam_size, model, cache_id if tm and persist else None)
+        if fresh:
+            if cache and persist: cache.put_many(fresh)
+            found.update(fresh)
+        return [found[k] for k in keys]
+
+    def _translate_new(self, missing, beam_size, model, tm_id):
+        """Переводит {ключ: (язык, сегмент)} моделью; повторы шаблона ждут перевода первого и берут его из памяти"""
+        if not tm_id:
+            return list(zip(missing.keys(), self.translate_mixed(list(missing.values()), beam_size, model)))
+        first, later, groups = {}, {}, set()
+        for k, (code, s) in missing.items():
+            group = (code, reuse_key(normalize_segment(s), code))
+            (later if group in groups else first)[k] = (code, s)
+            groups.add(group)
+        translated = self.translate_mixed(list(first.values()), beam_size, model)
+        self._remember(tm_id, beam_size, first.values(), translated)
+        out = list(zip(first.keys(), translated))
+        rest = {}
+        for k, (code, s) in later.items():
+            reused = self.tm.lookup(TranslationMemory.make_ctx(tm_id, code, beam_size), s)
+            if reused is None: rest[k] = (code, s)
+            else: out.append((k, reused))
+        if len(rest) < len(later): self.metrics.inc("tm_hits_total", len(later) - len(rest))
+        if rest:
+            translated = self.translate_mixed(list(rest.values()), beam_size, model)
+            self._remember(tm_id, beam_size, rest.values(), translated)
+            out += zip(rest.keys(), translated)
+        return out
+
+    def _remember(self, tm_id, beam_size, items, translated):
+        by_code = {}
+        for (code, s), out in zip(items, translated): by_code.setdefault(code, []).append((s, out))
+        for code, pairs in by_code.items():
+            self.tm.add_many(TranslationMemory.make_ctx(tm_id, code, beam_size), pairs)
+
+    def translate_segments(self, segments, target_lang_code, beam_size=1, model=None):
+        """Переводит непустые сегменты батчами, отсортированными по длине"""
+        return self.translate_mixed([(target_lang_code, s) for s in segments], beam_size, model)
+
+    def translate_mixed(self, items, beam_size=1, model=None):
+        """Переводит пары (язык перевода, сегмент); разные языки идут в одних батчах"""
+        model = model or self.model
+        if beam_size != BEAM_AUTO: return self._decode(items, beam_size, model)[0]
+        # Авто: все жадно с оценками, лучом заново - только неуверенные и подозрительные по длине
+        results, doubtful = self._decode(items, 1, model, check=True)
+        redo = [i for i, bad in enumerate(doubtful) if bad]
+        self.metrics.inc("adaptive_segments_total", len(items))
+        if redo:
+            self.metrics.inc("escalated_total", len(redo))
+            for i, out in zip(redo, self._decode([items[i] for i in redo], ESCALATION_BEAM, model)[0]):
+                results[i] = out
+        return results
+
+    def _decode(self, items, beam_size, model, check=False):
+        """(переводы, сомнительные ли они); check включает оценки модели и проверку длины"""
+        prompt = model.prompt
+        results = [""] * len(items)
+        doubtful = [False] * len(items)
+        metrics = self.metrics
+        # Токенизируем все сегменты разом и по разу, формат подсказки задает адаптер модели
+        started = time.perf_counter()
+        unique = list(dict.fromkeys(s for _, s in items))
+        tokens = dict(zip(unique, model.sp.encode(unique, out_type=str)))
+        sources = [prompt.source(tokens[s], s, code) for code, s in items]
+        prefixes = [prompt.target_prefix(code) for code, _ in items]
+        lengths = [len(t) for t in sources]
+        metrics.observe("encode_seconds", time.perf_counter() - started)
+
+        for batch in make_batches(lengths, self.max_batch_size, self.batch_type):
+            # NLLB задает язык через target_prefix, MADLAD - тегом <2xx> в источнике;
+            # со словарными списками батч декодируется по объединению списков своих языков
+            options = {"target_prefix": [prefixes[j] for j in batch]} if prefixes[batch[0]] else {}
+            options.update(self.vmap_options(model))
+            if check: options.update(return_scores=True, normalize_scores=True)
+            # Батчи собраны по длине, так что предел по самому длинному источнику подходит всем
+            limit = decoding_limit(max(lengths[j] for j in batch))
+            started = time.perf_counter()
+            with self.using(model):
+                res = model.translator.translate_batch(
+                    [sources[j] for j in batch], beam_size=beam_size,
+                    max_decoding_length=limit, **options
+                )
+            decode = time.perf_counter() - started
+            hypotheses = [prompt.clean(r.hypotheses[0], items[j][0]) for j, r in zip(batch, res)]
+            decoded = model.sp.decode(hypotheses)
+            metrics.observe_batch([lengths[j] for j in batch], sum(len(h) for h in hypotheses),
+                                  decode, time.perf_counter() - started - decode)
+            for j, out in zip(batch, decoded):
+                results[j] = out
+            if check:
+                for j, r, h in zip(batch, res, hypotheses):
+                    doubtful[j] = (r.scores[0] < self.adaptive_min_score or len(r.hypotheses[0]) >= limit
+                                   or lengths[j] >= MIN_LENGTH_CHECK_TOKENS and len(h) < lengths[j] * MIN_LENGTH_RATIO)
+        return results, doubtful
+
+
+# Глобальный экземпляр движка и очередь задач к нему
+engine = TranslatorEngine()
+scheduler = TranslationScheduler(engine)
+residency = ResidencyManager(engine)
@@ -0,0 +1,113 @@
+import os
+import re
+import sys
+import argparse
+from collections import Counter
+
+import lang_detect
+
+# Словарные списки для CTranslate2 (vocabulary map, vmap.txt рядом с моделью).
+# На каждом шаге декодер оценивает не весь словарь (у MADLAD - 400+ языков),
+# а только кандидатов, которые включают правила для токенов источника:
+#   "\tтокены"        - кандидаты для любого запроса (цифры, знаки препинания)
+#   "<2ru>\tтокены"   - список языка перевода (MADLAD пишет язык в источник)
+#   "токен\tтокен"    - токен источника можно скопировать (имена, код, ссылки)
+# Переводчик читает vmap.txt при загрузке модели, запросы включают его use_vmap.
+#   python vocab_map.py <папка модели> --to ru en [--corpus тексты.txt]
+
+VMAP_FILE = "vmap.txt"
+# Сколько самых частых (по оценке SentencePiece) токенов письменности брать в список
+DEFAULT_MAX_PIECES = 24000
+DEFAULT_TARGETS = ("ru", "en")
+# Служебные токены вида <2ru>, <0x41>: в выводе им не место
+TAG_RE = re.compile(r"<[^<>]+>")
+SCRIPTS = {**dict.fromkeys(lang_detect.CYRILLIC, "cyrillic"), **dict.fromkeys(lang_detect.LATIN, "latin"), "zh": "han"}
+
+def vmap_path(model_path):
+    return os.path.join(model_path, VMAP_FILE)
+
+def vmap_tag(model_path):
+    """Метка словарного списка для ключей кэша ('' - списка нет): с ним перевод может отличаться"""
+    if not model_path: return ""
+    p = vmap_path(model_path)
+    if not os.path.exists(p): return ""
+    st = os.stat(p)
+    return f"vmap{st.st_size:x}{int(st.st_mtime):x}"
+
+def piece_script(piece):
+    """Письменность токена: None - без букв (цифры, знаки), 'other' - прочие алфавиты"""
+    letters = [c for c in piece.lower() if c.isalpha()]
+    if not letters: return None
+    for name, r in lang_detect.SCRIPT_RES.items():
+        if all(r.match(c) for c in letters): return name
+    return "other"
+
+def sample_texts(corpus_path=None):
+    if corpus_path:
+        with open(corpus_path, 'r', encoding='utf-8') as f: return [l.strip() for l in f if l.strip()]
+    from bench_corpus import CORPUS
+    return [line for items in CORPUS.values() for _, text in items for line in text.split('\n') if line.strip()]
+
+def build_vmap(engine, model, targets=DEFAULT_TARGETS, texts=(), max_pieces=DEFAULT_MAX_PIECES):
+    """Строки vmap.txt для модели; texts переводятся моделью без списка, их токены попадают в списки"""
+    sp = model.sp
+    ids = [i for i in range(sp.get_piece_size()) if not (sp.is_control(i) or sp.is_unknown(i))]
+    pieces = {i: sp.id_to_piece(i) for i in ids}
+    words = [i for i in ids if not TAG_RE.fullmatch(pieces[i])]
+    fixed = [pieces[i] for i in words if piece_script(pieces[i]) is None]
+    # Более вероятные токены (больше оценка unigram-модели) идут первыми
+    by_score = sorted(words, key=sp.get_score, reverse=True)
+
+    shortlists = {}
+    for code in targets:
+        script = SCRIPTS.get(code)
+        short = [pieces[i] for i in by_score if piece_script(pieces[i]) == script][:max_pieces]
+        seen = Counter()
+        if texts:
+            # Реальный вывод модели: латиница в русском переводе, редкие формы слов
+            outputs = engine.translate_segments(list(texts), code, 1, model)
+            own = [t for t in texts if lang_detect.detect(t) == code]
+            for pieces_out in sp.encode(outputs + own, out_type=str): seen.update(pieces_out)
+        shortlists[code] = list(dict.fromkeys(short + [p for p, _ in seen.most_common()]))
+        print(f"Список {code}: {len(shortlists[code])} токенов (письменность {script}, из текстов {len(seen)})")
+
+    lines = [f"{p}\t{p}" for p in pieces.values()]
+    shared = list(fixed)
+    for code, short in shortlists.items():
+        key = model.prompt.vmap_key(code)
+        # Язык перевода не виден в источнике (NLLB) - списки объединяются в общий
+        if key: lines.append(f"{key}\t{' '.join(short)}")
+        else: shared += short
+    lines.insert(0, "\t" + " ".join(dict.fromkeys(shared)))
+    print(f"Словарь модели: {sp.get_piece_size()} токенов, всегда доступно: {len(dict.fromkeys(shared))}")
+    return lines
+
+def write_vmap(model_path, lines):
+    p = vmap_path(model_path)
+    tmp = p + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f: f.write("\n".join(lines) + "\n")
+    os.replace(tmp, p)
+    return p
+
+def main(argv=None):
+    import translator_engine as te
+    ap = argparse.ArgumentParser(description="Построение словарных списков (vmap.txt) для модели")
+    ap.add_argument("model", help="папка с моделью CT2")
+    ap.add_argument("--to", nargs="+", default=list(DEFAULT_TARGETS), choices=sorted(SCRIPTS), help="языки перевода")
+    ap.add_argument("--corpus", help="файл с примерами текстов, по одному на строку (по умолчанию корпус бенчмарка)")
+    ap.add_argument("--max-pieces", type=int, default=DEFAULT_MAX_PIECES)
+    args = ap.parse_args(argv)
+
+    engine = te.TranslatorEngine()
+    # Примеры переводим полным словарем, даже если старый vmap.txt уже есть
+    engine.use_vmap = False
+    ok, msg = engine.load(args.model)
+    if not ok:
+        print(f"Не удалось загрузить модель: {msg}")
+        return 1
+    lines = build_vmap(engine, engine.model, args.to, sample_texts(args.corpus), args.max_pieces)
+    print(f"Записан {write_vmap(args.model, lines)}; список подключится при следующей загрузке модели")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+import time
+import ctypes
+from ctypes import wintypes
+
+import pyperclip
+
+from logger import log_debug
+from hotkey_backends import HotkeyBackend
+
+# Реализация HotkeyBackend для Windows: SendInput, GetGUIThreadInfo и MSAA (COM).
+# Импортируется только на Windows (ctypes.WINFUNCTYPE и windll есть только там).
+
+# ==========================================
+# === WinAPI & MSAA (COM) DEFINITIONS ======
+# ==========================================
+
+VK_SHIFT = 0x10
+VK_MENU = 0x12    # Alt
+VK_CONTROL = 0x11 # Ctrl
+VK_C = 0x43       # C
+VK_V = 0x56       # V
+KEYEVENTF_KEYUP = 0x0002
+INPUT_KEYBOARD = 1
+
+OBJID_CARET = -8
+S_OK = 0
+STATE_SYSTEM_INVISIBLE = 0x00008000
+CHILDID_SELF = 0
+VT_I4 = 3
+
+# --- SendInput: вся комбинация уходит одним атомарным вызовом, без пауз ---
+ULONG_PTR = ctypes.c_size_t
+
+class KEYBDINPUT(ctypes.Structure):
+    _fields_ = [("wVk", wintypes.WORD), ("wScan", wintypes.WORD), ("dwFlags", wintypes.DWORD),
+                ("time", wintypes.DWORD), ("dwExtraInfo", ULONG_PTR)]
+
+class MOUSEINPUT(ctypes.Structure):
+    _fields_ = [("dx", wintypes.LONG), ("dy", wintypes.LONG), ("mouseData", wintypes.DWORD),
+                ("dwFlags", wintypes.DWORD), ("time", wintypes.DWORD), ("dwExtraInfo", ULONG_PTR)]
+
+class INPUT(ctypes.Structure):
+    # Размер объединения задает самая большая структура (MOUSEINPUT)
+    class _U(ctypes.Union):
+        _fields_ = [("ki", KEYBDINPUT), ("mi", MOUSEINPUT)]
+    _fields_ = [("type", wintypes.DWORD), ("_u", _U)]
+
+# --- VARIANT Structure for COM ---
+class VARIANT(ctypes.Structure):
+    class _U(ctypes.Union):
+        _fields_ = [("lVal", ctypes.c_long),
+                    ("vt", ctypes.c_ushort)]
+    _fields_ = [("vt", ctypes.c_ushort),
+                ("wReserved1", ctypes.c_ushort),
+                ("wReserved2", ctypes.c_ushort),
+                ("wReserved3", ctypes.c_ushort),
+                ("_u", _U)]
+
+# --- IAccessible Interface Definition ---
+COMMETHOD = ctypes.WINFUNCTYPE
+
+class IAccessibleVtbl(ctypes.Structure):
+    _fields_ = [
+        # IUnknown
+        ("QueryInterface", ctypes.c_void_p),
+        ("AddRef", ctypes.c_void_p),
+        ("Release", COMMETHOD(ctypes.c_ulong, ctypes.c_void_p)),
+        # IDispatch
+        ("GetTypeInfoCount", ctypes.c_void_p),
+        ("GetTypeInfo", ctypes.c_void_p),
+        ("GetIDsOfNames", ctypes.c_void_p),
+        ("Invoke", ctypes.c_void_p),
+        # IAccessible
+        ("get_accParent", ctypes.c_void_p),
+        ("get_accChildCount", ctypes.c_void_p),
+        ("get_accChild", ctypes.c_void_p),
+        ("get_accName", ctypes.c_void_p),
+        ("get_accValue", ctypes.c_void_p),
+        ("get_accDescription", ctypes.c_void_p),
+        ("get_accRole", ctypes.c_void_p),
+        # Index 14: get_accState
+        ("get_accState", COMMETHOD(ctypes.HRESULT, ctypes.c_void_p, VARIANT, ctypes.POINTER(VARIANT))),
+    ]
+
+class IAccessible(ctypes.Structure):
+    _fields_ = [("lpVtbl", ctypes.POINTER(IAccessibleVtbl))]
+
+class GUID(ctypes.Structure):
+    _fields_ = [("Data1", ctypes.c_ulong),
+                ("Data2", ctypes.c_ushort),
+                ("Data3", ctypes.c_ushort),
+                ("Data4", ctypes.c_ubyte * 8)]
+
+IID_IAccessible = GUID(
+    0x618736e0, 0x3c3d, 0x11cf,
+    (ctypes.c_ubyte * 8)(0x81, 0x0c, 0x00, 0xaa, 0x00, 0x38, 0x9b, 0x71)
+)
+
+class GUITHREADINFO(ctypes.Structure):
+    _fields_ = [
+        ("cbSize", wintypes.DWORD),
+        ("flags", wintypes.DWORD),
+        ("hwndActive", wintypes.HWND),
+        ("hwndFocus", wintypes.HWND),
+        ("hwndCapture", wintypes.HWND),
+        ("hwndMenuOwner", wintypes.HWND),
+        ("hwndMoveSize", wintypes.HWND),
+        ("hwndCaret", wintypes.HWND),
+        ("rcCaret", wintypes.RECT)
+    ]
+
+KNOWN_EDIT_CLASSES = [
+    "Edit", "RichEdit", "RichEdit20A", "RichEdit20W", "TEdit", "TMemo",
+    "ConsoleWindowClass", "TextBox", "Scintilla"
+]
+
+user32 = ctypes.windll.user32
+
+def get_window_class(hwnd):
+    length = 256
+    buff = ctypes.create_unicode_buffer(length)
+    user32.GetClassNameW(hwnd, buff, length)
+    return buff.value
+
+def get_window_title(hwnd):
+    length = 256
+    buff = ctypes.create_unicode_buffer(length)
+    user32.GetWindowTextW(hwnd, buff, length)
+    return buff.value
+
+def key_input(vk, up=False):
+    i = INPUT(type=INPUT_KEYBOARD)
+    i._u.ki = KEYBDINPUT(wVk=vk, dwFlags=KEYEVENTF_KEYUP if up else 0)
+    return i
+
+def send_keys(events):
+    arr = (INPUT * len(events))(*[key_input(vk, up) for vk, up in events])
+    return user32.SendInput(len(events), arr, ctypes.sizeof(INPUT))
+
+class WindowsBackend(HotkeyBackend):
+    name = "windows"
+
+    def thread_init(self):
+        # MSAA работает через COM: его нужно инициализировать в каждом потоке
+        ctypes.windll.ole32.CoInitialize(None)
+
+    def wait_modifiers_released(self, timeout):
+        # Пользователь еще держит Alt от хоткея: ждем отпускания, но не дольше timeout
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            if not any(user32.GetAsyncKeyState(vk) & 0x8000 for vk in (VK_MENU, VK_CONTROL, VK_SHIFT)): break
+            time.sleep(0.005)
+        self.release_modifiers()
+
+    def release_modifiers(self):
+        send_keys([(VK_MENU, True), (VK_CONTROL, True), (VK_SHIFT, True)])
+
+    def send_copy(self):
+        send_keys([(VK_CONTROL, False), (VK_C, False), (VK_C, True), (VK_CONTROL, True)])
+
+    def send_paste(self):
+        send_keys([(VK_CONTROL, False), (VK_V, False), (VK_V, True), (VK_CONTROL, True)])
+
+    def clipboard_sequence(self):
+        return user32.GetClipboardSequenceNumber()
+
+    def get_clipboard(self):
+        return pyperclip.paste()
+
+    def set_clipboard(self, text):
+        pyperclip.copy(text)
+
+    # === ДЕТАЛЬНАЯ ПРОВЕРКА КУРСОРА (WINAPI + MSAA STATE) ===
+    def has_text_caret(self):
+        try:
+            foreground_hwnd = user32.GetForegroundWindow()
+            if not foreground_hwnd: return False
+
+            log_debug("DEBUG: Active Window: '%s' | Class: '%s'",
+                      get_window_title(foreground_hwnd), get_window_class(foreground_hwnd))
+
+            # --- СПОСОБ 1: Стандартный WinAPI ---
+            foreground_thread_id = user32.GetWindowThreadProcessId(foreground_hwnd, None)
+            current_thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+
+            attached = False
+            if foreground_thread_id != current_thread_id:
+                attached = user32.AttachThreadInput(current_thread_id, foreground_thread_id, True)
+
+            try:
+                gui_info = GUITHREADINFO()
+                gui_info.cbSize = ctypes.sizeof(GUITHREADINFO)
+                success = user32.GetGUIThreadInfo(foreground_thread_id, ctypes.byref(gui_info))
+
+                if success:
+                    if gui_info.hwndCaret:
+                        log_debug("DEBUG: Native Caret FOUND (HWND: %s)", gui_info.hwndCaret)
+                        return True
+
+                    if gui_info.hwndFocus:
+                        focus_class = get_window_class(gui_info.hwndFocus)
+                        for cls in KNOWN_EDIT_CLASSES:
+                            if cls.lower() in focus_class.lower():
+                                log_debug("DEBUG: Detected input by class '%s'", focus_class)
+                                return True
+            finally:
+                if attached:
+                    user32.AttachThreadInput(current_thread_id, foreground_thread_id, False)
+
+            # --- СПОСОБ 2: MSAA с проверкой STATE ---
+            ptr = ctypes.POINTER(IAccessible)()
+            res = ctypes.windll.oleacc.AccessibleObjectFromWindow(
+                foreground_hwnd,
+                OBJID_CARET,
+                ctypes.byref(IID_IAccessible),
+                ctypes.byref(ptr)
+            )
+
+            if res == S_OK and ptr:
+                try:
+                    varChild = VARIANT()
+                    varChild.vt = VT_I4
+                    varChild._u.lVal = CHILDID_SELF
+
+                    varState = VARIANT()
+                    hr = ptr.contents.lpVtbl.contents.get_accState(ptr, varChild, ctypes.byref(varState))
+
+                    if hr == S_OK and varState.vt == VT_I4:
+                        state = varState._u.lVal
+                        log_debug("DEBUG: MSAA Caret State: %s (Hex: %#x)", state, state)
+
+                        if state & STATE_SYSTEM_INVISIBLE:
+                            log_debug("DEBUG: Caret exists but is INVISIBLE -> Not an input field.")
+                            return False
+                        else:
+                            log_debug("DEBUG: Caret exists and is VISIBLE -> Input field detected.")
+                            return True
+                finally:
+                    ptr.contents.lpVtbl.contents.Release(ptr)
+            else:
+                log_debug("DEBUG: MSAA Caret check failed or no object.")
+
+            return False
+
+        except Exception as e:
+            log_debug("DEBUG: Exception in has_text_caret: %s", e)
+            return False